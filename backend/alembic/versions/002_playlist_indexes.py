@@ -0,0 +1,28 @@
+"""Add indexes used by playlist compilation
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_campaign_areas_area_id', 'campaign_areas', ['area_id'])
+    op.create_index('ix_campaign_areas_campaign_id', 'campaign_areas', ['campaign_id'])
+    op.create_index('ix_media_campaign_id', 'media', ['campaign_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_campaign_id', table_name='media')
+    op.drop_index('ix_campaign_areas_campaign_id', table_name='campaign_areas')
+    op.drop_index('ix_campaign_areas_area_id', table_name='campaign_areas')
@@ -0,0 +1,28 @@
+"""Add client event IDs to playback logs
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('playback_logs', sa.Column('event_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_unique_constraint('uq_playback_logs_event_id', 'playback_logs', ['event_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_playback_logs_event_id', 'playback_logs', type_='unique')
+    op.drop_column('playback_logs', 'event_id')
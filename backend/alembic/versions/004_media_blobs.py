@@ -0,0 +1,42 @@
+"""Add content-addressed media blobs
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'media_blobs',
+        sa.Column('content_hash', sa.String(64), primary_key=True),
+        sa.Column('storage_path', sa.String(500), nullable=False),
+        sa.Column('file_size', sa.BigInteger(), nullable=False),
+        sa.Column('mime_type', sa.String(100), nullable=True),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    # Existing media keep their per-campaign files; content_hash stays NULL for them
+    op.add_column('media', sa.Column('content_hash', sa.String(64), nullable=True))
+    op.create_foreign_key(
+        'fk_media_content_hash', 'media', 'media_blobs', ['content_hash'], ['content_hash'],
+    )
+    op.create_index('ix_media_content_hash', 'media', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_content_hash', table_name='media')
+    op.drop_constraint('fk_media_content_hash', 'media', type_='foreignkey')
+    op.drop_column('media', 'content_hash')
+    op.drop_table('media_blobs')
@@ -0,0 +1,52 @@
+"""Add hourly and daily playback rollups
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'playback_hourly',
+        sa.Column('hour', sa.DateTime(), primary_key=True),
+        sa.Column('device_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('campaign_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('media_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('play_count', sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        'playback_daily',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('device_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('campaign_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('play_count', sa.Integer(), nullable=False),
+    )
+    rollup_watermarks = op.create_table(
+        'rollup_watermarks',
+        sa.Column('name', sa.String(50), primary_key=True),
+        sa.Column('rolled_up_until', sa.DateTime(), nullable=True),
+    )
+    op.bulk_insert(rollup_watermarks, [{'name': 'playback_logs', 'rolled_up_until': None}])
+
+    # The compactor and the report tail select logs by creation time
+    op.create_index('ix_playback_logs_created_at', 'playback_logs', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_playback_logs_created_at', table_name='playback_logs')
+    op.drop_table('rollup_watermarks')
+    op.drop_table('playback_daily')
+    op.drop_table('playback_hourly')
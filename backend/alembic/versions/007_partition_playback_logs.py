@@ -0,0 +1,107 @@
+"""Partition playback logs by month of played_at
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17 00:00:00.000000
+
+Rebuilds playback_logs as a range-partitioned table and copies the
+existing rows over, so run it in a maintenance window on large tables.
+Partitions are created for every month that has logs and up to three
+months ahead; app.utils.partitions keeps creating them from then on.
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, device_id, media_id, campaign_id, played_at, synced_at, created_at, event_id"
+INDEXES = {
+    'ix_playback_logs_played_at': 'played_at',
+    'ix_playback_logs_device_id': 'device_id',
+    'ix_playback_logs_campaign_id': 'campaign_id',
+    'ix_playback_logs_created_at': 'created_at',
+}
+MONTHS_AHEAD = 3
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _rename_existing(suffix: str) -> None:
+    op.execute(f"ALTER TABLE playback_logs RENAME TO playback_logs_{suffix}")
+    op.execute(f"ALTER TABLE playback_logs_{suffix} RENAME CONSTRAINT playback_logs_pkey TO playback_logs_{suffix}_pkey")
+    op.execute(
+        f"ALTER TABLE playback_logs_{suffix} "
+        f"RENAME CONSTRAINT uq_playback_logs_event_id TO uq_playback_logs_{suffix}_event_id"
+    )
+    for name in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_{suffix}")
+
+
+def _create_table(partition_by: str, primary_key: str, event_key: str) -> None:
+    op.execute(f"""
+        CREATE TABLE playback_logs (
+            id UUID NOT NULL,
+            device_id UUID NOT NULL REFERENCES devices (id),
+            media_id UUID NOT NULL REFERENCES media (id),
+            campaign_id UUID NOT NULL REFERENCES campaigns (id),
+            played_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            synced_at TIMESTAMP WITHOUT TIME ZONE,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            event_id UUID,
+            CONSTRAINT playback_logs_pkey PRIMARY KEY ({primary_key}),
+            CONSTRAINT uq_playback_logs_event_id UNIQUE ({event_key})
+        ) {partition_by}
+    """)
+
+
+def _create_indexes() -> None:
+    for name, column in INDEXES.items():
+        op.create_index(name, 'playback_logs', [column])
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    months = {
+        row[0].date() for row in bind.execute(
+            sa.text("SELECT DISTINCT date_trunc('month', played_at) FROM playback_logs")
+        )
+    }
+    this_month = date.today().replace(day=1)
+    months.update(_add_months(this_month, offset) for offset in range(MONTHS_AHEAD + 1))
+
+    _rename_existing('unpartitioned')
+    _create_table("PARTITION BY RANGE (played_at)", "id, played_at", "event_id, played_at")
+
+    for month in sorted(months):
+        op.execute(
+            f"CREATE TABLE playback_logs_p{month.year:04d}_{month.month:02d} PARTITION OF playback_logs "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+    # Catches logs played beyond the created months (e.g. wrong device clocks)
+    op.execute("CREATE TABLE playback_logs_default PARTITION OF playback_logs DEFAULT")
+
+    _create_indexes()
+    op.execute(f"INSERT INTO playback_logs ({COLUMNS}) SELECT {COLUMNS} FROM playback_logs_unpartitioned")
+    op.execute("DROP TABLE playback_logs_unpartitioned")
+
+
+def downgrade() -> None:
+    _rename_existing('partitioned')
+    _create_table("", "id", "event_id")
+    _create_indexes()
+    # Keeps the first row of an event_id stored under several played_at values
+    op.execute(
+        f"INSERT INTO playback_logs ({COLUMNS}) SELECT {COLUMNS} FROM playback_logs_partitioned "
+        "ON CONFLICT DO NOTHING"
+    )
+    op.execute("DROP TABLE playback_logs_partitioned")
@@ -0,0 +1,40 @@
+"""Add daily unique-device sketches per campaign and store
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17 00:00:00.000000
+
+Sketches are filled by the rollup compactor for logs rolled up from now
+on; python -m scripts.backfill_reach_sketches adds the older logs.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'campaign_reach_daily',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('campaign_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('sketch', sa.LargeBinary(), nullable=False),
+    )
+    op.create_table(
+        'store_reach_daily',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('store_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('sketch', sa.LargeBinary(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('store_reach_daily')
+    op.drop_table('campaign_reach_daily')
@@ -0,0 +1,26 @@
+"""Stamp playback log creation times in the database
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17 00:00:00.000000
+
+created_at becomes the start of the inserting transaction (UTC), which the
+rollup compactor relies on to not skip logs committed late.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE playback_logs ALTER COLUMN created_at SET DEFAULT timezone('utc', now())")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE playback_logs ALTER COLUMN created_at DROP DEFAULT")
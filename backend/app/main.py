@@ -1,22 +1,21 @@
-from pathlib import Path
-from fastapi import FastAPI, Request
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.config import settings
+from app.middleware import MediaCORSMiddleware
+from app.utils.storage import get_storage
+from app.utils.presence import get_presence_tracker, run_presence_flusher, flush_presence
+from app.utils.playlist_events import get_playlist_broker, run_playlist_rollover
+from app.utils.log_queue import get_log_queue, run_log_writer, flush_log_queue
+from app.utils.log_ingest import get_recent_event_filter
+from app.utils.executors import executor_stats, shutdown_executors
+from app.utils.media_files import get_media_files
+from app.utils.rollups import get_rollup_compactor, run_rollup_compactor
+from app.utils.partitions import run_partition_maintenance
+from app.utils.report_cache import get_report_cache
 
-
-class StaticFilesCORSMiddleware(BaseHTTPMiddleware):
-    """Add CORS headers to static file responses."""
-
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        if request.url.path.startswith("/media"):
-            response.headers["Access-Control-Allow-Origin"] = "*"
-            response.headers["Access-Control-Allow-Methods"] = "GET, OPTIONS"
-            response.headers["Access-Control-Allow-Headers"] = "*"
-        return response
 from app.routers import (
     auth_router,
     stores_router,
@@ -28,12 +27,38 @@ from app.routers import (
     reports_router,
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    presence_flusher = asyncio.create_task(run_presence_flusher())
+    playlist_rollover = asyncio.create_task(run_playlist_rollover())
+    rollup_compactor = asyncio.create_task(run_rollup_compactor())
+    partition_maintenance = asyncio.create_task(run_partition_maintenance())
+    log_writer = (
+        asyncio.create_task(run_log_writer())
+        if settings.playback_log_queue_enabled else None
+    )
+    yield
+    partition_maintenance.cancel()
+    rollup_compactor.cancel()
+    playlist_rollover.cancel()
+    presence_flusher.cancel()
+    if log_writer is not None:
+        log_writer.cancel()
+        # Write playback logs that were accepted but not yet written
+        flush_log_queue()
+    # Write back last-seen times recorded since the last periodic flush
+    flush_presence()
+    shutdown_executors()
+
+
 app = FastAPI(
     title=settings.app_name,
     description="Digital Signage Advertisement Delivery System",
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -45,9 +70,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add CORS headers to static files (local storage mode)
+# Add CORS headers to media files (local storage mode)
 if settings.use_local_storage:
-    app.add_middleware(StaticFilesCORSMiddleware)
+    app.add_middleware(MediaCORSMiddleware)
 
 # Include routers
 app.include_router(auth_router, prefix=settings.api_v1_prefix)
@@ -59,11 +84,9 @@ app.include_router(media_router, prefix=settings.api_v1_prefix)
 app.include_router(player_router, prefix=settings.api_v1_prefix)
 app.include_router(reports_router, prefix=settings.api_v1_prefix)
 
-# Mount static files for local storage (development)
+# Serve media files for local storage (development)
 if settings.use_local_storage:
-    media_path = Path(settings.local_storage_path)
-    media_path.mkdir(parents=True, exist_ok=True)
-    app.mount("/media", StaticFiles(directory=str(media_path)), name="media")
+    app.mount("/media", get_media_files(), name="media")
 
 
 @app.get("/")
@@ -78,3 +101,21 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+async def metrics():
+    storage = get_storage()
+    return {
+        "signed_url_cache": storage.url_cache.stats() if storage.url_cache else None,
+        "device_presence": get_presence_tracker().stats(),
+        "playlist_stream": get_playlist_broker().stats(),
+        "playback_log_dedup": get_recent_event_filter().stats(),
+        "executors": executor_stats(),
+        "media_files": get_media_files().stats() if settings.use_local_storage else None,
+        "playback_log_queue": (
+            get_log_queue().stats() if settings.playback_log_queue_enabled else None
+        ),
+        "playback_rollup": get_rollup_compactor().stats(),
+        "report_cache": get_report_cache().stats(),
+    }
@@ -0,0 +1,60 @@
+from typing import List, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class ResponseHeadersMiddleware:
+    """Pure ASGI middleware that sets headers on responses.
+
+    Headers are set on the http.response.start message and every other
+    message is passed through as is, so streamed, ranged and zero-copy
+    responses are neither buffered nor relayed through an extra task the
+    way BaseHTTPMiddleware does. Subclasses choose the headers per request;
+    requests getting none are handed to the app untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def response_headers(self, scope: Scope) -> List[Tuple[str, str]]:
+        """Get the headers to set on the response to a request."""
+        return []
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        extra_headers = self.response_headers(scope)
+        if not extra_headers:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in extra_headers:
+                    headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class MediaCORSMiddleware(ResponseHeadersMiddleware):
+    """Allow media files (local storage mode) to be fetched from any origin."""
+
+    headers = [
+        ("Access-Control-Allow-Origin", "*"),
+        ("Access-Control-Allow-Methods", "GET, OPTIONS"),
+        ("Access-Control-Allow-Headers", "*"),
+    ]
+
+    def __init__(self, app: ASGIApp, path_prefix: str = "/media"):
+        super().__init__(app)
+        self.path_prefix = path_prefix
+
+    def response_headers(self, scope: Scope) -> List[Tuple[str, str]]:
+        if scope["path"].startswith(self.path_prefix):
+            return self.headers
+        return []
@@ -4,7 +4,12 @@ from app.models.area import Area
 from app.models.device import Device
 from app.models.campaign import Campaign, CampaignArea
 from app.models.media import Media
+from app.models.media_blob import MediaBlob
+from app.models.media_rendition import MediaRendition
 from app.models.playback_log import PlaybackLog
+from app.models.playback_rollup import (
+    PlaybackHourly, PlaybackDaily, CampaignReachDaily, StoreReachDaily, RollupWatermark,
+)
 
 __all__ = [
     "User",
@@ -14,5 +19,12 @@ __all__ = [
     "Campaign",
     "CampaignArea",
     "Media",
+    "MediaBlob",
+    "MediaRendition",
     "PlaybackLog",
+    "PlaybackHourly",
+    "PlaybackDaily",
+    "CampaignReachDaily",
+    "StoreReachDaily",
+    "RollupWatermark",
 ]
@@ -32,8 +32,8 @@ class CampaignArea(Base):
     __tablename__ = "campaign_areas"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    campaign_id = Column(UUID(as_uuid=True), ForeignKey("campaigns.id"), nullable=False)
-    area_id = Column(UUID(as_uuid=True), ForeignKey("areas.id"), nullable=False)
+    campaign_id = Column(UUID(as_uuid=True), ForeignKey("campaigns.id"), nullable=False, index=True)
+    area_id = Column(UUID(as_uuid=True), ForeignKey("areas.id"), nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
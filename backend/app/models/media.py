@@ -17,7 +17,7 @@ class Media(Base):
     __tablename__ = "media"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    campaign_id = Column(UUID(as_uuid=True), ForeignKey("campaigns.id"), nullable=False)
+    campaign_id = Column(UUID(as_uuid=True), ForeignKey("campaigns.id"), nullable=False, index=True)
     type = Column(Enum(MediaType, values_callable=lambda x: [e.value for e in x]), nullable=False)
     filename = Column(String(255), nullable=False)
     gcs_path = Column(String(500), nullable=False)
@@ -25,6 +25,7 @@ class Media(Base):
     duration_seconds = Column(Integer, nullable=False, default=10)  # Default 10 seconds
     file_size = Column(BigInteger, nullable=True)
     mime_type = Column(String(100), nullable=True)
+    content_hash = Column(String(64), ForeignKey("media_blobs.content_hash"), nullable=True, index=True)  # NULL for files stored per campaign
     sort_order = Column(Integer, default=0, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger
+from sqlalchemy.orm import relationship
+
+from app.database import Base
+
+
+class MediaBlob(Base):
+    """A stored media file, shared by every media row with the same content."""
+    __tablename__ = "media_blobs"
+
+    content_hash = Column(String(64), primary_key=True)  # SHA-256, hex
+    storage_path = Column(String(500), nullable=False)
+    file_size = Column(BigInteger, nullable=False)
+    mime_type = Column(String(100), nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relationships
+    renditions = relationship("MediaRendition", back_populates="blob", cascade="all, delete-orphan")
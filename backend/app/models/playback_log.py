@@ -1,22 +1,53 @@
 import uuid
-from datetime import datetime
-from sqlalchemy import Column, DateTime, ForeignKey
+from sqlalchemy import Column, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.expression import FunctionElement
 
 from app.database import Base
 
 
+class utcnow(FunctionElement):
+    """Current UTC time as a timestamp without time zone, on the database clock.
+
+    On PostgreSQL this is the start time of the transaction.
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is UTC
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    return "timezone('utc', now())"
+
+
 class PlaybackLog(Base):
     __tablename__ = "playback_logs"
+    # Monthly range partitions on played_at (PostgreSQL), maintained by
+    # app.utils.partitions; unique keys must include the partition key.
+    __table_args__ = (
+        UniqueConstraint("event_id", "played_at", name="uq_playback_logs_event_id"),
+        {"postgresql_partition_by": "RANGE (played_at)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     device_id = Column(UUID(as_uuid=True), ForeignKey("devices.id"), nullable=False)
     media_id = Column(UUID(as_uuid=True), ForeignKey("media.id"), nullable=False)
     campaign_id = Column(UUID(as_uuid=True), ForeignKey("campaigns.id"), nullable=False)
-    played_at = Column(DateTime, nullable=False)
+    played_at = Column(DateTime, primary_key=True)
     synced_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Stamped by the database when the row is inserted. The rollup
+    # compactor selects new logs by it and relies on a log never being
+    # stamped earlier than the start of its transaction.
+    created_at = Column(DateTime, server_default=utcnow(), nullable=False, index=True)
+    event_id = Column(UUID(as_uuid=True), nullable=True)  # Client-generated, makes uploads idempotent
 
     # Relationships
     device = relationship("Device", back_populates="playback_logs")
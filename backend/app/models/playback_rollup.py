@@ -0,0 +1,59 @@
+from sqlalchemy import Column, String, DateTime, Date, Integer, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.database import Base
+
+
+class PlaybackHourly(Base):
+    """Play counts per hour, device, campaign and media, rolled up from playback_logs."""
+    __tablename__ = "playback_hourly"
+
+    hour = Column(DateTime, primary_key=True)  # played_at truncated to the hour
+    device_id = Column(UUID(as_uuid=True), primary_key=True)
+    campaign_id = Column(UUID(as_uuid=True), primary_key=True)
+    media_id = Column(UUID(as_uuid=True), primary_key=True)
+    play_count = Column(Integer, nullable=False, default=0)
+
+
+class PlaybackDaily(Base):
+    """Play counts per day, device and campaign, rolled up from playback_logs."""
+    __tablename__ = "playback_daily"
+
+    day = Column(Date, primary_key=True)
+    device_id = Column(UUID(as_uuid=True), primary_key=True)
+    campaign_id = Column(UUID(as_uuid=True), primary_key=True)
+    play_count = Column(Integer, nullable=False, default=0)
+
+
+class CampaignReachDaily(Base):
+    """HyperLogLog sketch of the devices that played a campaign on a day (see app.utils.hll)."""
+    __tablename__ = "campaign_reach_daily"
+
+    day = Column(Date, primary_key=True)
+    campaign_id = Column(UUID(as_uuid=True), primary_key=True)
+    sketch = Column(LargeBinary, nullable=False)
+
+
+class StoreReachDaily(Base):
+    """HyperLogLog sketch of a store's devices that played anything on a day.
+
+    Devices are assigned to the store of their area when their logs are
+    rolled up.
+    """
+    __tablename__ = "store_reach_daily"
+
+    day = Column(Date, primary_key=True)
+    store_id = Column(UUID(as_uuid=True), primary_key=True)
+    sketch = Column(LargeBinary, nullable=False)
+
+
+class RollupWatermark(Base):
+    """How far a rollup has consumed its source table.
+
+    Source rows created before rolled_up_until are counted in the rollup
+    tables; later rows (the tail) are still only in the source table.
+    """
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String(50), primary_key=True)
+    rolled_up_until = Column(DateTime, nullable=True)  # NULL until the first run
@@ -1,4 +1,3 @@
-import io
 import base64
 from typing import List, Optional
 from uuid import UUID
@@ -7,7 +6,6 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.responses import Response
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, or_
-import qrcode
 
 from app.database import get_db
 from app.models.store import Store
@@ -20,6 +18,11 @@ from app.schemas.area import (
 )
 from app.dependencies import get_current_admin
 from app.config import settings
+from app.utils.playlist_cache import invalidate_areas
+from app.utils.presence import get_presence_tracker
+from app.utils.executors import run_cpu
+from app.utils.qr import render_qr_png
+from app.utils.report_cache import invalidate_reports
 
 router = APIRouter(tags=["areas"])
 
@@ -168,6 +171,7 @@ async def create_area(
     area = Area(store_id=store_id, **area_data.model_dump())
     db.add(area)
     db.commit()
+    invalidate_reports()
     db.refresh(area)
     return area
 
@@ -220,6 +224,8 @@ async def update_area(
         setattr(area, key, value)
 
     db.commit()
+    invalidate_areas([area_id])
+    invalidate_reports()
     db.refresh(area)
     return area
 
@@ -239,6 +245,9 @@ async def delete_area(
 
     db.delete(area)
     db.commit()
+    invalidate_areas([area_id])
+    invalidate_reports()
+    get_presence_tracker().forget_areas([area_id])
 
 
 @router.get("/areas/{area_id}/public", response_model=AreaResponse)
@@ -273,24 +282,11 @@ async def get_area_qrcode(
     # Format: {frontend_url}/register?area_id={area_id}
     qr_data = f"{settings.frontend_url}/register?area_id={area_id}"
 
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(qr_data)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color="black", back_color="white")
-
-    # Convert to bytes
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    buffer.seek(0)
+    # Rendering is CPU-bound; keep it off the event loop
+    png = await run_cpu(render_qr_png, qr_data)
 
     return Response(
-        content=buffer.getvalue(),
+        content=png,
         media_type="image/png",
         headers={
             "Content-Disposition": f"inline; filename=qr_area_{area_id}.png"
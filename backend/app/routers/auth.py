@@ -7,6 +7,7 @@ from app.schemas.user import UserLogin, Token, UserResponse, UserCreate
 from app.utils.security import verify_password, get_password_hash, create_access_token
 from app.dependencies import get_current_user, get_current_admin
 from app.config import settings
+from app.utils.executors import run_cpu
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -15,7 +16,8 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 async def login(credentials: UserLogin, response: Response, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == credentials.email).first()
 
-    if not user or not verify_password(credentials.password, user.password_hash):
+    # bcrypt is deliberately slow; run it in the CPU pool
+    if not user or not await run_cpu(verify_password, credentials.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
@@ -67,7 +69,7 @@ async def create_user(
 
     user = User(
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await run_cpu(get_password_hash, user_data.password),
         name=user_data.name,
         role=user_data.role,
         store_id=user_data.store_id,
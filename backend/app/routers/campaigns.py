@@ -16,6 +16,9 @@ from app.schemas.campaign import (
 )
 from app.schemas.area import AreaResponse
 from app.dependencies import get_current_admin
+from app.utils.playlist_cache import get_campaign_area_ids, invalidate_areas
+from app.utils.media_blobs import release_media_files
+from app.utils.report_cache import invalidate_reports
 
 router = APIRouter(prefix="/campaigns", tags=["campaigns"])
 
@@ -128,6 +131,7 @@ async def create_campaign(
     campaign = Campaign(**campaign_data.model_dump())
     db.add(campaign)
     db.commit()
+    invalidate_reports()
     db.refresh(campaign)
     return campaign
 
@@ -176,6 +180,8 @@ async def update_campaign(
         setattr(campaign, key, value)
 
     db.commit()
+    invalidate_areas(get_campaign_area_ids(db, campaign_id))
+    invalidate_reports()
     db.refresh(campaign)
     return campaign
 
@@ -193,8 +199,15 @@ async def delete_campaign(
             detail="Campaign not found",
         )
 
+    area_ids = get_campaign_area_ids(db, campaign_id)
+    media_items = list(campaign.media)
+
     db.delete(campaign)
-    db.commit()
+    db.flush()
+    # Commits the deletion together with the released blob references
+    await release_media_files(db, media_items)
+    invalidate_areas(area_ids)
+    invalidate_reports()
 
 
 @router.get("/{campaign_id}/areas", response_model=List[AreaResponse])
@@ -249,6 +262,8 @@ async def update_campaign_areas(
                 detail=f"Area '{area.name}' does not belong to the same store as this campaign",
             )
 
+    previous_area_ids = get_campaign_area_ids(db, campaign_id)
+
     # Delete existing campaign areas
     db.query(CampaignArea).filter(CampaignArea.campaign_id == campaign_id).delete()
 
@@ -258,5 +273,6 @@ async def update_campaign_areas(
         db.add(campaign_area)
 
     db.commit()
+    invalidate_areas(set(previous_area_ids) | set(area_data.area_ids))
 
     return areas
@@ -3,14 +3,17 @@ from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db
 from app.models.device import Device, DeviceStatus
 from app.models.area import Area
 from app.models.user import User, UserRole
 from app.schemas.device import DeviceCreate, DeviceUpdate, DeviceResponse, DeviceRegister
 from app.dependencies import get_current_user, get_current_admin, get_current_staff_or_admin
+from app.utils.presence import get_presence_tracker
+from app.utils.report_cache import invalidate_reports
 
 router = APIRouter(prefix="/devices", tags=["devices"])
 
@@ -21,10 +24,10 @@ async def list_devices(
     area_id: Optional[UUID] = Query(None),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_staff_or_admin)
 ):
-    query = db.query(Device)
+    query = select(Device)
 
     # Staff can only see devices in their store
     if current_user.role == UserRole.STAFF:
@@ -34,25 +37,25 @@ async def list_devices(
                 detail="Staff user not assigned to a store",
             )
         # Join with Area to filter by store
-        query = query.join(Area).filter(Area.store_id == current_user.store_id)
+        query = query.join(Area).where(Area.store_id == current_user.store_id)
     elif store_id:
-        query = query.join(Area).filter(Area.store_id == store_id)
+        query = query.join(Area).where(Area.store_id == store_id)
 
     if area_id:
-        query = query.filter(Device.area_id == area_id)
+        query = query.where(Device.area_id == area_id)
 
-    devices = query.offset(skip).limit(limit).all()
+    devices = (await db.scalars(query.offset(skip).limit(limit))).all()
     return devices
 
 
 @router.post("/register", response_model=DeviceResponse, status_code=status.HTTP_201_CREATED)
 async def register_device(
     device_data: DeviceRegister,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_staff_or_admin)
 ):
     # Check area exists
-    area = db.query(Area).filter(Area.id == device_data.area_id).first()
+    area = await db.scalar(select(Area).where(Area.id == device_data.area_id))
     if not area:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -71,7 +74,7 @@ async def register_device(
     device_code = device_data.device_code or f"DEV-{uuid.uuid4().hex[:8].upper()}"
 
     # Check if device code already exists
-    existing = db.query(Device).filter(Device.device_code == device_code).first()
+    existing = await db.scalar(select(Device).where(Device.device_code == device_code))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -85,19 +88,20 @@ async def register_device(
         registered_at=datetime.utcnow(),
     )
     db.add(device)
-    db.commit()
-    db.refresh(device)
+    await db.commit()
+    invalidate_reports()
+    await db.refresh(device)
     return device
 
 
 @router.post("/register/qr", response_model=DeviceResponse, status_code=status.HTTP_201_CREATED)
 async def register_device_via_qr(
     device_data: DeviceRegister,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Public endpoint for device registration via QR code (no authentication required)."""
     # Check area exists and is active
-    area = db.query(Area).filter(Area.id == device_data.area_id, Area.is_active == True).first()
+    area = await db.scalar(select(Area).where(Area.id == device_data.area_id, Area.is_active == True))
     if not area:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -108,7 +112,7 @@ async def register_device_via_qr(
     device_code = device_data.device_code or f"DEV-{uuid.uuid4().hex[:8].upper()}"
 
     # Check if device code already exists
-    existing = db.query(Device).filter(Device.device_code == device_code).first()
+    existing = await db.scalar(select(Device).where(Device.device_code == device_code))
     if existing:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -122,18 +126,19 @@ async def register_device_via_qr(
         registered_at=datetime.utcnow(),
     )
     db.add(device)
-    db.commit()
-    db.refresh(device)
+    await db.commit()
+    invalidate_reports()
+    await db.refresh(device)
     return device
 
 
 @router.get("/{device_id}", response_model=DeviceResponse)
 async def get_device(
     device_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_staff_or_admin)
 ):
-    device = db.query(Device).filter(Device.id == device_id).first()
+    device = await db.scalar(select(Device).where(Device.id == device_id))
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -142,7 +147,7 @@ async def get_device(
 
     # Staff can only view devices in their store
     if current_user.role == UserRole.STAFF:
-        area = db.query(Area).filter(Area.id == device.area_id).first()
+        area = await db.scalar(select(Area).where(Area.id == device.area_id))
         if area and area.store_id != current_user.store_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -156,10 +161,10 @@ async def get_device(
 async def update_device(
     device_id: UUID,
     device_data: DeviceUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_staff_or_admin)
 ):
-    device = db.query(Device).filter(Device.id == device_id).first()
+    device = await db.scalar(select(Device).where(Device.id == device_id))
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -167,7 +172,7 @@ async def update_device(
         )
 
     # Get current area's store
-    current_area = db.query(Area).filter(Area.id == device.area_id).first()
+    current_area = await db.scalar(select(Area).where(Area.id == device.area_id))
 
     # Staff can only update devices in their store
     if current_user.role == UserRole.STAFF:
@@ -181,7 +186,7 @@ async def update_device(
 
     # If changing area, validate the new area
     if "area_id" in update_data:
-        new_area = db.query(Area).filter(Area.id == update_data["area_id"]).first()
+        new_area = await db.scalar(select(Area).where(Area.id == update_data["area_id"]))
         if not new_area:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -198,8 +203,11 @@ async def update_device(
     for key, value in update_data.items():
         setattr(device, key, value)
 
-    db.commit()
-    db.refresh(device)
+    await db.commit()
+    invalidate_reports()
+    if "area_id" in update_data:
+        get_presence_tracker().move(device_id, update_data["area_id"])
+    await db.refresh(device)
     return device
 
 
@@ -207,7 +215,7 @@ async def update_device(
 async def update_device_area(
     device_id: UUID,
     area_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_staff_or_admin)
 ):
     """Convenience endpoint for staff to move device to another area."""
@@ -218,29 +226,31 @@ async def update_device_area(
 @router.delete("/{device_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_device(
     device_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_admin)
 ):
-    device = db.query(Device).filter(Device.id == device_id).first()
+    device = await db.scalar(select(Device).where(Device.id == device_id))
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Device not found",
         )
 
-    db.delete(device)
-    db.commit()
+    await db.delete(device)
+    await db.commit()
+    invalidate_reports()
+    get_presence_tracker().forget([device_id])
 
 
 @router.get("/{device_id}/public", response_model=DeviceResponse)
 async def get_device_public(
     device_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Public endpoint to verify if a device exists (no authentication required).
     Used by the registration page to check if a locally stored device ID is still valid.
     """
-    device = db.query(Device).filter(Device.id == device_id).first()
+    device = await db.scalar(select(Device).where(Device.id == device_id))
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -254,12 +264,12 @@ async def get_device_public(
 async def update_device_area_via_qr(
     device_id: UUID,
     area_id: UUID = Query(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Public endpoint to move a device to a new area via QR code scan (no authentication required).
     Used when a device scans a QR code for a different area than currently registered.
     """
-    device = db.query(Device).filter(Device.id == device_id).first()
+    device = await db.scalar(select(Device).where(Device.id == device_id))
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -267,7 +277,7 @@ async def update_device_area_via_qr(
         )
 
     # Check new area exists and is active
-    new_area = db.query(Area).filter(Area.id == area_id, Area.is_active == True).first()
+    new_area = await db.scalar(select(Area).where(Area.id == area_id, Area.is_active == True))
     if not new_area:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -275,6 +285,8 @@ async def update_device_area_via_qr(
         )
 
     device.area_id = area_id
-    db.commit()
-    db.refresh(device)
+    await db.commit()
+    invalidate_reports()
+    get_presence_tracker().move(device_id, area_id)
+    await db.refresh(device)
     return device
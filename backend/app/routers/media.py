@@ -1,22 +1,112 @@
-import uuid
-from typing import List
+from typing import AsyncIterator, List
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Path, Request
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.campaign import Campaign
 from app.models.media import Media, MediaType
+from app.models.media_blob import MediaBlob
 from app.models.user import User
-from app.schemas.media import MediaUpdate, MediaResponse, MediaReorderRequest
+from app.schemas.media import (
+    MediaUpdate, MediaResponse, MediaReorderRequest,
+    UploadSessionCreate, UploadSessionResponse, UploadSessionComplete, UploadPart,
+)
 from app.dependencies import get_current_admin
-from app.utils.storage import upload_file, get_file_url, delete_file
+from app.utils.storage import get_file_url, FileTooLargeError
+from app.utils.media_blobs import store_blob, release_blob, release_media_files
+from app.utils.renditions import create_renditions
+from app.utils.playlist_cache import get_campaign_area_ids, invalidate_areas
+from app.utils.executors import run_io
+from app.utils.upload_sessions import UploadSession, UploadSessionStore, get_upload_session_store
 
 router = APIRouter(tags=["media"])
 
 ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png", "image/gif", "image/webp"]
 ALLOWED_VIDEO_TYPES = ["video/mp4", "video/webm", "video/quicktime"]
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Multi-part upload sessions
+MAX_SESSION_FILE_SIZE = 2 * 1024 * 1024 * 1024  # 2GB
+MAX_PART_SIZE = 64 * 1024 * 1024  # 64MB
+MAX_PARTS = 10000
+
+
+async def iter_upload_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    """Read an uploaded file in chunks instead of loading it whole."""
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+def media_type_for(content_type: str) -> MediaType:
+    """Get the media type for an upload, rejecting unsupported content types."""
+    if content_type in ALLOWED_IMAGE_TYPES:
+        return MediaType.IMAGE
+    if content_type in ALLOWED_VIDEO_TYPES:
+        return MediaType.VIDEO
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Unsupported file type: {content_type}",
+    )
+
+
+async def prepare_blob(db: Session, blob: MediaBlob) -> str:
+    """Create display renditions for a stored upload and get its URL.
+
+    On failure the reference taken by store_blob is given back.
+    """
+    content_hash = blob.content_hash
+    try:
+        await create_renditions(db, blob)
+        return await run_io(get_file_url, blob.storage_path)
+    except Exception as e:
+        await release_blob(db, content_hash)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload file: {str(e)}",
+        )
+
+
+def create_media(
+    db: Session,
+    campaign_id: UUID,
+    filename: str,
+    content_type: str,
+    blob: MediaBlob,
+    file_url: str,
+    duration_seconds: int,
+) -> Media:
+    """Add an uploaded file to the end of the campaign's media.
+
+    Display renditions of images are created beforehand, see prepare_blob.
+    """
+    # Get next sort order
+    max_order = db.query(Media).filter(
+        Media.campaign_id == campaign_id
+    ).count()
+
+    # Create media record
+    media = Media(
+        campaign_id=campaign_id,
+        type=media_type_for(content_type),
+        filename=filename,
+        gcs_path=blob.storage_path,
+        gcs_url=file_url,
+        duration_seconds=duration_seconds,
+        file_size=blob.file_size,
+        mime_type=content_type,
+        content_hash=blob.content_hash,
+        sort_order=max_order,
+    )
+    db.add(media)
+    db.commit()
+    invalidate_areas(get_campaign_area_ids(db, campaign_id))
+    db.refresh(media)
+    return media
 
 
 @router.get("/campaigns/{campaign_id}/media", response_model=List[MediaResponse])
@@ -37,8 +127,9 @@ async def list_campaign_media(
     ).order_by(Media.sort_order).all()
 
     # Generate fresh URLs
-    for item in media_items:
-        item.gcs_url = get_file_url(item.gcs_path)
+    urls = await run_io(lambda: [get_file_url(item.gcs_path) for item in media_items])
+    for item, url in zip(media_items, urls):
+        item.gcs_url = url
 
     return media_items
 
@@ -60,65 +151,236 @@ async def upload_media(
 
     # Validate content type
     content_type = file.content_type
-    if content_type in ALLOWED_IMAGE_TYPES:
-        media_type = MediaType.IMAGE
-    elif content_type in ALLOWED_VIDEO_TYPES:
-        media_type = MediaType.VIDEO
-    else:
+    media_type_for(content_type)
+
+    # Reject early when the client sent the size
+    if file.size is not None and file.size > MAX_FILE_SIZE:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported file type: {content_type}",
+            detail=f"File too large. Maximum size is {MAX_FILE_SIZE / 1024 / 1024}MB",
         )
 
-    # Read file content
-    file_content = await file.read()
-    file_size = len(file_content)
-
-    if file_size > MAX_FILE_SIZE:
+    # Stream to content-addressed storage; the size limit is enforced while copying
+    try:
+        blob = await store_blob(
+            db, iter_upload_chunks(file), file.filename, content_type, max_size=MAX_FILE_SIZE,
+        )
+    except FileTooLargeError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File too large. Maximum size is {MAX_FILE_SIZE / 1024 / 1024}MB",
         )
-
-    # Generate unique filename
-    file_extension = file.filename.split(".")[-1] if "." in file.filename else ""
-    unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
-    gcs_path = f"campaigns/{campaign_id}/{unique_filename}"
-
-    # Upload to storage
-    try:
-        storage_path = upload_file(file_content, gcs_path, content_type)
-        file_url = get_file_url(storage_path)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to upload file: {str(e)}",
         )
+    file_url = await prepare_blob(db, blob)
+
+    return create_media(db, campaign_id, file.filename, content_type, blob, file_url, duration_seconds)
+
+
+def upload_session_response(store: UploadSessionStore, session: UploadSession) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        id=session.id,
+        campaign_id=session.campaign_id,
+        filename=session.filename,
+        content_type=session.content_type,
+        duration_seconds=session.duration_seconds,
+        max_part_size=MAX_PART_SIZE,
+        parts=[UploadPart(part_number=number, size=size) for number, size in store.list_parts(session)],
+        created_at=session.created_at,
+        expires_at=store.expires_at(session),
+    )
 
-    # Get next sort order
-    max_order = db.query(Media).filter(
-        Media.campaign_id == campaign_id
-    ).count()
 
-    # Create media record
-    media = Media(
-        campaign_id=campaign_id,
-        type=media_type,
-        filename=file.filename,
-        gcs_path=storage_path,
-        gcs_url=file_url,
-        duration_seconds=duration_seconds,
-        file_size=file_size,
-        mime_type=content_type,
-        sort_order=max_order,
+def get_campaign_upload_session(store: UploadSessionStore, campaign_id: UUID, upload_id: UUID) -> UploadSession:
+    session = store.get(upload_id)
+    if not session or session.campaign_id != campaign_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found",
+        )
+    return session
+
+
+@router.post(
+    "/campaigns/{campaign_id}/media/uploads",
+    response_model=UploadSessionResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_upload_session(
+    campaign_id: UUID,
+    session_data: UploadSessionCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    分割アップロードのセッションを作成する。
+    パートを PUT で送信（並列・再送可）した後、complete でメディアを作成する。
+    """
+    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found",
+        )
+
+    media_type_for(session_data.content_type)
+
+    store = get_upload_session_store()
+    session = await run_io(
+        store.create,
+        campaign_id,
+        session_data.filename,
+        session_data.content_type,
+        session_data.duration_seconds,
     )
-    db.add(media)
-    db.commit()
-    db.refresh(media)
+    return upload_session_response(store, session)
+
+
+@router.get("/campaigns/{campaign_id}/media/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    campaign_id: UUID,
+    upload_id: UUID,
+    current_user: User = Depends(get_current_admin)
+):
+    """受信済みのパートを返す（中断後の再開用）。"""
+    store = get_upload_session_store()
+    session = get_campaign_upload_session(store, campaign_id, upload_id)
+    return upload_session_response(store, session)
+
+
+@router.put(
+    "/campaigns/{campaign_id}/media/uploads/{upload_id}/parts/{part_number}",
+    response_model=UploadPart,
+)
+async def upload_part(
+    campaign_id: UUID,
+    upload_id: UUID,
+    request: Request,
+    part_number: int = Path(ge=1, le=MAX_PARTS),
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    パートのバイト列をリクエストボディとして受け取る。
+    同じ番号のパートを再送した場合は置き換える。
+    """
+    store = get_upload_session_store()
+    session = get_campaign_upload_session(store, campaign_id, upload_id)
+
+    # Keep the whole session within the file size limit
+    received = sum(size for number, size in store.list_parts(session) if number != part_number)
+    max_size = min(MAX_PART_SIZE, MAX_SESSION_FILE_SIZE - received)
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Part too large. Maximum size is {max_size / 1024 / 1024}MB",
+        )
+
+    try:
+        size = await store.write_part(session, part_number, request.stream(), max_size)
+    except FileTooLargeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Part too large. Maximum size is {max_size / 1024 / 1024}MB",
+        )
+
+    return UploadPart(part_number=part_number, size=size)
+
+
+@router.post(
+    "/campaigns/{campaign_id}/media/uploads/{upload_id}/complete",
+    response_model=MediaResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def complete_upload_session(
+    campaign_id: UUID,
+    upload_id: UUID,
+    complete_data: UploadSessionComplete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin)
+):
+    """
+    パート 1〜part_count を順に結合してストレージへ転送し、メディアを作成する。
+    """
+    store = get_upload_session_store()
+    session = get_campaign_upload_session(store, campaign_id, upload_id)
+
+    campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
+    if not campaign:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Campaign not found",
+        )
+
+    part_numbers = list(range(1, complete_data.part_count + 1))
+    received = [number for number, _ in store.list_parts(session)]
+    if received != part_numbers:
+        missing = sorted(set(part_numbers) - set(received))
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Expected parts 1-{complete_data.part_count}; missing {missing}, received {received}",
+        )
+
+    if not store.begin_completion(session):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload session is already being completed",
+        )
+    try:
+        try:
+            blob = await store_blob(
+                db,
+                store.iter_parts(session, part_numbers),
+                session.filename,
+                session.content_type,
+                max_size=MAX_SESSION_FILE_SIZE,
+            )
+        except FileTooLargeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File too large. Maximum size is {MAX_SESSION_FILE_SIZE / 1024 / 1024}MB",
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to upload file: {str(e)}",
+            )
+        file_url = await prepare_blob(db, blob)
+
+        media = create_media(
+            db, campaign_id, session.filename, session.content_type, blob, file_url, session.duration_seconds,
+        )
+        await run_io(store.delete, session.id)
+    finally:
+        store.end_completion(session)
 
     return media
 
 
+@router.delete("/campaigns/{campaign_id}/media/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload_session(
+    campaign_id: UUID,
+    upload_id: UUID,
+    current_user: User = Depends(get_current_admin)
+):
+    """アップロードを中止し、受信済みのパートを削除する。"""
+    store = get_upload_session_store()
+    session = get_campaign_upload_session(store, campaign_id, upload_id)
+    if not store.begin_completion(session):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload session is being completed",
+        )
+    try:
+        await run_io(store.delete, session.id)
+    finally:
+        store.end_completion(session)
+
+
 @router.get("/media/{media_id}", response_model=MediaResponse)
 async def get_media(
     media_id: UUID,
@@ -133,7 +395,7 @@ async def get_media(
         )
 
     # Generate fresh URL
-    media.gcs_url = get_file_url(media.gcs_path)
+    media.gcs_url = await run_io(get_file_url, media.gcs_path)
     return media
 
 
@@ -157,10 +419,11 @@ async def update_media(
         setattr(media, key, value)
 
     db.commit()
+    invalidate_areas(get_campaign_area_ids(db, media.campaign_id))
     db.refresh(media)
 
     # Generate fresh URL
-    media.gcs_url = get_file_url(media.gcs_path)
+    media.gcs_url = await run_io(get_file_url, media.gcs_path)
     return media
 
 
@@ -177,14 +440,13 @@ async def delete_media(
             detail="Media not found",
         )
 
-    # Delete from storage
-    try:
-        delete_file(media.gcs_path)
-    except Exception:
-        pass  # Continue even if storage delete fails
+    campaign_id = media.campaign_id
 
     db.delete(media)
-    db.commit()
+    db.flush()
+    # Commits; the stored file is deleted only with its last reference
+    await release_media_files(db, [media])
+    invalidate_areas(get_campaign_area_ids(db, campaign_id))
 
 
 @router.put("/campaigns/{campaign_id}/media/reorder", response_model=List[MediaResponse])
@@ -226,6 +488,7 @@ async def reorder_campaign_media(
         media.sort_order = index
 
     db.commit()
+    invalidate_areas(get_campaign_area_ids(db, campaign_id))
 
     # Return updated media list in new order
     updated_media = db.query(Media).filter(
@@ -233,7 +496,8 @@ async def reorder_campaign_media(
     ).order_by(Media.sort_order).all()
 
     # Generate fresh URLs
-    for item in updated_media:
-        item.gcs_url = get_file_url(item.gcs_path)
+    urls = await run_io(lambda: [get_file_url(item.gcs_path) for item in updated_media])
+    for item, url in zip(updated_media, urls):
+        item.gcs_url = url
 
     return updated_media
@@ -1,162 +1,343 @@
-import hashlib
-from typing import List
+import asyncio
+import json
+from typing import Optional
 from uuid import UUID
-from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-
-from app.database import get_db
-from app.models.device import Device, DeviceStatus
-from app.models.area import Area
-from app.models.campaign import Campaign, CampaignArea
-from app.models.media import Media
-from app.models.playback_log import PlaybackLog
-from app.schemas.playlist import PlaylistResponse, PlaylistItem
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_async_db
+from app.schemas.playlist import PlaylistResponse, PlaylistDeltaResponse
 from app.schemas.playback_log import PlaybackLogCreate
-from app.utils.storage import get_file_url
+from app.utils.playlist_cache import get_playlist_cache, get_area_playlist
+from app.utils.playlist_compiler import CompiledPlaylist
+from app.utils.presence import get_presence_tracker
+from app.utils.playlist_events import get_playlist_broker
+from app.utils.log_ingest import (
+    drop_unknown_references,
+    insert_playback_log_rows_async,
+    get_recent_event_filter,
+)
+from app.utils.log_queue import get_log_queue
+from app.utils.executors import run_io
+from app.utils.log_formats import (
+    COMPACT_LOG_MEDIA_TYPE,
+    LogBodyTooLarge,
+    LogFormatError,
+    LogValidationError,
+    iter_request_body,
+    iter_lines,
+    read_compact_logs,
+    read_json_logs,
+)
 
 router = APIRouter(prefix="/player", tags=["player"])
 
 
-@router.get("/playlist", response_model=PlaylistResponse)
+async def sync_device(db: AsyncSession, device_id: UUID) -> UUID:
+    """Record that a device was seen and return its area ID."""
+    tracker = get_presence_tracker()
+    area_id = await db.run_sync(tracker.get_area_id, device_id)
+    if area_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Device not found",
+        )
+
+    # Status and last_sync_at are written back in batches
+    tracker.touch(device_id)
+    return area_id
+
+
+async def render_playlist(
+    playlist: CompiledPlaylist,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+) -> PlaylistResponse:
+    """Render a playlist, signing its media URLs off the event loop the first time."""
+    if playlist.is_rendered(width, height):
+        return playlist.render(width, height)
+    return await run_io(playlist.render, width, height)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        # If-None-Match uses the weak comparison function
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+@router.get(
+    "/playlist",
+    response_model=PlaylistResponse,
+    responses={304: {"description": "Playlist not modified"}},
+)
 async def get_playlist(
+    response: Response,
     device_id: UUID = Query(...),
-    db: Session = Depends(get_db)
+    width: Optional[int] = Query(None, ge=1, description="Screen width in pixels"),
+    height: Optional[int] = Query(None, ge=1, description="Screen height in pixels"),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get playlist for a device.
     Called by player every 15 minutes to sync content.
+    Images are served as the smallest rendition that fills the declared screen size.
+    Returns 304 Not Modified when If-None-Match matches the current ETag.
     """
-    # Get device and its area
-    device = db.query(Device).filter(Device.id == device_id).first()
-    if not device:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Device not found",
+    area_id = await sync_device(db, device_id)
+    playlist = await db.run_sync(get_area_playlist, area_id)
+
+    etag = f'"{playlist.version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return await render_playlist(playlist, width, height)
+
+
+@router.get("/playlist/delta", response_model=PlaylistDeltaResponse)
+async def get_playlist_delta(
+    device_id: UUID = Query(...),
+    since: str = Query(..., description="Playlist version the device currently has"),
+    width: Optional[int] = Query(None, ge=1, description="Screen width in pixels"),
+    height: Optional[int] = Query(None, ge=1, description="Screen height in pixels"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the changes to a device's playlist since a given version.
+    Falls back to the full playlist when the base version is no longer known.
+    """
+    area_id = await sync_device(db, device_id)
+    playlist = await db.run_sync(get_area_playlist, area_id)
+
+    base = get_playlist_cache().get_version(area_id, since)
+
+    # Unchanged media URLs are not resent, so a base from an older URL
+    # epoch cannot be used either.
+    if base is None or base.url_epoch != playlist.url_epoch:
+        rendered = await render_playlist(playlist, width, height)
+        return PlaylistDeltaResponse(
+            version=playlist.version,
+            full=True,
+            items=rendered.items,
+            generated_at=rendered.generated_at,
+        )
+
+    if base.version == playlist.version:
+        return PlaylistDeltaResponse(
+            version=playlist.version,
+            base_version=base.version,
+            full=False,
+            generated_at=datetime.utcnow(),
         )
 
-    # Update device status
-    device.status = DeviceStatus.ONLINE
-    device.last_sync_at = datetime.utcnow()
-    db.commit()
-
-    area_id = device.area_id
-    today = date.today()
-
-    # Get active campaigns for this area
-    campaign_areas = db.query(CampaignArea).filter(
-        CampaignArea.area_id == area_id
-    ).all()
-
-    campaign_ids = [ca.campaign_id for ca in campaign_areas]
-
-    # Filter to only active campaigns within date range
-    # Sort by weight descending (higher weight = higher priority)
-    active_campaigns = db.query(Campaign).filter(
-        Campaign.id.in_(campaign_ids),
-        Campaign.is_active == True,
-        Campaign.start_date <= today,
-        Campaign.end_date >= today,
-    ).order_by(Campaign.weight.desc()).all()
-
-    # Build playlist items in deterministic order:
-    # - Campaigns sorted by weight (descending)
-    # - Media within each campaign sorted by sort_order (ascending)
-    playlist_items = []
-
-    for campaign in active_campaigns:
-        # Get media for this campaign, sorted by sort_order
-        media_items = db.query(Media).filter(
-            Media.campaign_id == campaign.id
-        ).order_by(Media.sort_order).all()
-
-        for media in media_items:
-            # Generate fresh URL
-            media_url = get_file_url(media.gcs_path)
-
-            playlist_items.append(PlaylistItem(
-                media_id=media.id,
-                campaign_id=campaign.id,
-                url=media_url,
-                type=media.type,
-                duration_seconds=media.duration_seconds,
-                filename=media.filename,
-            ))
-
-    # Generate version hash for cache invalidation
-    # Use content-based hash for stable versions when content hasn't changed
-    content_data = "-".join([str(item.media_id) for item in playlist_items])
-    version = hashlib.md5(content_data.encode()).hexdigest()[:8]
-
-    return PlaylistResponse(
-        version=version,
-        items=playlist_items,
-        generated_at=datetime.utcnow(),
+    rendered = await render_playlist(playlist, width, height)
+    base_entries = {e.media_id: e for e in base.entries}
+    current_ids = {e.media_id for e in playlist.entries}
+
+    added = [
+        item
+        for entry, item in zip(playlist.entries, rendered.items)
+        if base_entries.get(entry.media_id) != entry
+    ]
+    removed = [e.media_id for e in base.entries if e.media_id not in current_ids]
+
+    order = [e.media_id for e in playlist.entries]
+    if order == [e.media_id for e in base.entries]:
+        order = None
+
+    return PlaylistDeltaResponse(
+        version=playlist.version,
+        base_version=base.version,
+        full=False,
+        added=added,
+        removed=removed,
+        order=order,
+        generated_at=rendered.generated_at,
+    )
+
+
+@router.get("/stream")
+async def stream_playlist_events(
+    device_id: UUID = Query(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Server-Sent Events stream of playlist changes for a device.
+    Sends a "playlist" event with the current version on connect and
+    whenever the area's playlist changes. Players only need to poll
+    /playlist at the suggested safety interval while connected.
+    """
+    area_id = await sync_device(db, device_id)
+    version = (await db.run_sync(get_area_playlist, area_id)).version
+    # The stream can stay open for hours; do not hold a pooled connection
+    await db.close()
+
+    tracker = get_presence_tracker()
+    broker = get_playlist_broker()
+
+    def playlist_event(version: str) -> str:
+        data = json.dumps({
+            "version": version,
+            "poll_interval_seconds": settings.player_stream_poll_interval_seconds,
+        })
+        return f"event: playlist\ndata: {data}\n\n"
+
+    async def event_stream():
+        current_area_id = area_id
+        queue = broker.subscribe(current_area_id, version)
+        try:
+            yield playlist_event(version)
+            while True:
+                try:
+                    new_version = await asyncio.wait_for(
+                        queue.get(), timeout=settings.player_stream_keepalive_seconds
+                    )
+                    yield playlist_event(new_version)
+                except asyncio.TimeoutError:
+                    # A connected player is alive, so it needs no heartbeats
+                    tracker.touch(device_id)
+                    yield ": keepalive\n\n"
+
+                # Follow the device if it has been moved to another area
+                moved_area_id = tracker.peek_area_id(device_id)
+                if moved_area_id is not None and moved_area_id != current_area_id:
+                    broker.unsubscribe(current_area_id, queue)
+                    current_area_id = moved_area_id
+                    new_version = await broker.current_version(current_area_id)
+                    queue = broker.subscribe(current_area_id, new_version)
+                    yield playlist_event(new_version)
+        finally:
+            broker.unsubscribe(current_area_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
-@router.post("/logs", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/logs",
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        202: {"description": "Logs queued for writing"},
+        429: {"description": "Log queue is full; retry after Retry-After seconds"},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": PlaybackLogCreate.model_json_schema()},
+                },
+                COMPACT_LOG_MEDIA_TYPE: {
+                    "schema": {"type": "string"},
+                    "example": (
+                        '{"device_id": "...", "media": ["..."], "campaigns": ["..."]}\n'
+                        '[0, 0, 1760659200, "..."]\n'
+                    ),
+                },
+            },
+        },
+    },
+)
 async def submit_playback_logs(
-    logs: List[PlaybackLogCreate],
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Submit batch of playback logs from device.
     Called periodically to sync playback data.
+    Accepts a JSON array of logs, or the compact application/x-ndjson format
+    (a header line with device_id and media/campaign ID tables, then one
+    [media index, campaign index, played_at, event_id] array per line).
+    Both may be sent with Content-Encoding: gzip.
+    With PLAYBACK_LOG_QUEUE_ENABLED the logs are queued and written in the
+    background (202), and 429 is returned while the queue is full.
     """
-    if not logs:
+    synced_at = datetime.utcnow()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    body = iter_request_body(request, settings.playback_log_max_body_bytes)
+    try:
+        if content_type == COMPACT_LOG_MEDIA_TYPE:
+            device_id, rows = await read_compact_logs(iter_lines(body), synced_at)
+        else:
+            # Logs for other devices than the first log's are skipped
+            device_id, rows = await read_json_logs(body, synced_at)
+    except LogBodyTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except LogValidationError as e:
+        raise RequestValidationError(e.errors)
+    except LogFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if not rows:
         return {"message": "No logs to process"}
 
-    # Validate device exists (use first log's device_id)
-    device_id = logs[0].device_id
-    device = db.query(Device).filter(Device.id == device_id).first()
-    if not device:
+    # Validate device exists
+    if await db.run_sync(get_presence_tracker().get_area_id, device_id) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Device not found",
         )
 
-    # Create playback log records
-    synced_at = datetime.utcnow()
-    created_count = 0
-
-    for log_data in logs:
-        # Validate all logs are for the same device
-        if log_data.device_id != device_id:
-            continue
-
-        playback_log = PlaybackLog(
-            device_id=log_data.device_id,
-            media_id=log_data.media_id,
-            campaign_id=log_data.campaign_id,
-            played_at=log_data.played_at,
-            synced_at=synced_at,
-        )
-        db.add(playback_log)
-        created_count += 1
+    # Retried uploads: logs whose event_id was stored recently are dropped here,
+    # older ones are skipped by the unique constraint on insert.
+    event_filter = get_recent_event_filter()
+    rows = event_filter.drop_seen(rows)
+
+    if settings.playback_log_queue_enabled:
+        # Not checked against the database here; the writer drops rows
+        # referencing deleted media or campaigns when it inserts them
+        if not get_log_queue().put(rows):
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Playback log queue is full",
+                headers={"Retry-After": str(settings.playback_log_queue_retry_after_seconds)},
+            )
+        event_filter.remember(rows)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": f"Accepted {len(rows)} logs"}
 
-    db.commit()
+    # Logs of deleted media or campaigns cannot be stored; skip them rather
+    # than failing the whole batch
+    received = len(rows)
+    rows = await drop_unknown_references(db, rows) if rows else rows
+    skipped = received - len(rows)
+    note = f"; skipped {skipped} with unknown media or campaign" if skipped else ""
 
-    return {"message": f"Processed {created_count} logs"}
+    created_count = await insert_playback_log_rows_async(db, rows)
+    await db.commit()
+    event_filter.remember(rows)
+
+    return {"message": f"Processed {created_count} logs{note}"}
 
 
 @router.post("/heartbeat")
 async def heartbeat(
     device_id: UUID = Query(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Simple heartbeat endpoint to update device status.
     """
-    device = db.query(Device).filter(Device.id == device_id).first()
-    if not device:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Device not found",
-        )
-
-    device.status = DeviceStatus.ONLINE
-    device.last_sync_at = datetime.utcnow()
-    db.commit()
+    await sync_device(db, device_id)
 
     return {"status": "ok", "timestamp": datetime.utcnow().isoformat()}
@@ -1,13 +1,12 @@
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 from uuid import UUID
-from datetime import datetime, date, timedelta
+from datetime import date, timedelta
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import BigInteger, case, cast, column, func, literal, select, table
+from sqlalchemy.dialects.postgresql import REGCLASS
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from app.database import get_db
-from app.models.playback_log import PlaybackLog
 from app.models.campaign import Campaign
 from app.models.media import Media
 from app.models.device import Device
@@ -15,9 +14,16 @@ from app.models.area import Area
 from app.models.store import Store
 from app.models.user import User
 from app.dependencies import get_current_admin
+from app.utils.rollups import REACH_CHUNK_ROWS, ReachEstimator, playback_counts, reach_sketches
+from app.utils.report_cache import cached_report
+from app.utils.report_export import (
+    ExportColumn, export_response, in_chunks, playback_log_export_query, statement_columns, stream_statement,
+)
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
+_pg_class = table("pg_class", column("oid"), column("reltuples"))
+
 
 class CampaignReport(BaseModel):
     campaign_id: UUID
@@ -47,7 +53,7 @@ async def get_campaign_reports(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     campaign_id: Optional[UUID] = Query(None),
-    db: Session = Depends(get_db),
+    approximate: bool = Query(False, description="Estimate unique devices from HyperLogLog sketches"),
     current_user: User = Depends(get_current_admin)
 ):
     """Get playback statistics grouped by campaign."""
@@ -57,27 +63,164 @@ async def get_campaign_reports(
     if not start_date:
         start_date = end_date - timedelta(days=30)
 
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
+    return await cached_report(
+        "campaigns", (start_date, end_date, campaign_id, approximate), end_date,
+        lambda db: _build_campaign_reports(db, start_date, end_date, campaign_id, approximate),
+    )
+
+
+@router.get("/stores", response_model=List[StoreReport])
+async def get_store_reports(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    store_id: Optional[UUID] = Query(None),
+    approximate: bool = Query(False, description="Estimate device counts from HyperLogLog sketches"),
+    current_user: User = Depends(get_current_admin)
+):
+    """Get playback statistics grouped by store."""
+    if not end_date:
+        end_date = date.today()
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+
+    return await cached_report(
+        "stores", (start_date, end_date, store_id, approximate), end_date,
+        lambda db: _build_store_reports(db, start_date, end_date, store_id, approximate),
+    )
+
+
+@router.get("/devices", response_model=List[DeviceReport])
+async def get_device_reports(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    store_id: Optional[UUID] = Query(None),
+    area_id: Optional[UUID] = Query(None),
+    current_user: User = Depends(get_current_admin)
+):
+    """Get playback statistics grouped by device."""
+    if not end_date:
+        end_date = date.today()
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+
+    return await cached_report(
+        "devices", (start_date, end_date, store_id, area_id), end_date,
+        lambda db: _build_device_reports(db, start_date, end_date, store_id, area_id),
+    )
+
+
+@router.get("/summary")
+async def get_summary(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    exact: bool = Query(False, description="Count inventory rows instead of using planner estimates"),
+    current_user: User = Depends(get_current_admin)
+):
+    """Get overall summary statistics."""
+    if not end_date:
+        end_date = date.today()
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+
+    return await cached_report(
+        "summary", (start_date, end_date, exact), end_date,
+        lambda db: _build_summary(db, start_date, end_date, exact),
+    )
+
+
+@router.get("/export/playback-logs")
+async def export_playback_logs(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    store_id: Optional[UUID] = Query(None),
+    area_id: Optional[UUID] = Query(None),
+    campaign_id: Optional[UUID] = Query(None),
+    format: Literal["csv", "parquet"] = Query("csv"),
+    current_user: User = Depends(get_current_admin)
+):
+    """Stream raw playback logs with store, area, device, campaign and media names."""
+    if not end_date:
+        end_date = date.today()
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+
+    stmt = playback_log_export_query(start_date, end_date, store_id, area_id, campaign_id)
+    return export_response(
+        statement_columns(stmt), stream_statement(stmt), format,
+        f"playback_logs_{start_date}_{end_date}",
+    )
+
 
-    query = db.query(
-        PlaybackLog.campaign_id,
-        func.count(PlaybackLog.id).label("play_count"),
-        func.count(func.distinct(PlaybackLog.device_id)).label("unique_devices")
-    ).filter(
-        PlaybackLog.played_at >= start_datetime,
-        PlaybackLog.played_at <= end_datetime,
+@router.get("/export/{report}")
+async def export_report(
+    report: Literal["campaigns", "stores", "devices"],
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    format: Literal["csv", "parquet"] = Query("csv"),
+    current_user: User = Depends(get_current_admin)
+):
+    """Download a whole report as CSV or Parquet."""
+    if not end_date:
+        end_date = date.today()
+    if not start_date:
+        start_date = end_date - timedelta(days=30)
+
+    # Same cache entries as the unfiltered JSON reports
+    if report == "campaigns":
+        model = CampaignReport
+        reports = await cached_report(
+            "campaigns", (start_date, end_date, None, False), end_date,
+            lambda db: _build_campaign_reports(db, start_date, end_date, None),
+        )
+    elif report == "stores":
+        model = StoreReport
+        reports = await cached_report(
+            "stores", (start_date, end_date, None, False), end_date,
+            lambda db: _build_store_reports(db, start_date, end_date, None),
+        )
+    else:
+        model = DeviceReport
+        reports = await cached_report(
+            "devices", (start_date, end_date, None, None), end_date,
+            lambda db: _build_device_reports(db, start_date, end_date, None, None),
+        )
+
+    columns = [
+        ExportColumn(name, "int" if field.annotation is int else "string")
+        for name, field in model.model_fields.items()
+    ]
+    rows = [tuple(getattr(r, column.name) for column in columns) for r in reports]
+    return export_response(columns, in_chunks(rows), format, f"{report}_{start_date}_{end_date}")
+
+
+async def _build_campaign_reports(
+    db: AsyncSession,
+    start_date: date,
+    end_date: date,
+    campaign_id: Optional[UUID],
+    approximate: bool = False,
+) -> List[CampaignReport]:
+    """Build the campaign report."""
+    counts = playback_counts(start_date, end_date)
+    unique_devices = literal(0) if approximate else func.count(func.distinct(counts.c.device_id))
+    query = select(
+        counts.c.campaign_id,
+        func.sum(counts.c.play_count).label("play_count"),
+        unique_devices.label("unique_devices")
     )
 
     if campaign_id:
-        query = query.filter(PlaybackLog.campaign_id == campaign_id)
+        query = query.where(counts.c.campaign_id == campaign_id)
 
-    query = query.group_by(PlaybackLog.campaign_id)
-    results = query.all()
+    query = query.group_by(counts.c.campaign_id)
+    results = (await db.execute(query)).all()
+    if approximate:
+        reach = await _estimate_reach(db, "campaign", start_date, end_date, campaign_id)
+        results = [(r[0], r[1], reach.get(r[0], 0)) for r in results]
 
     # Get campaign names
     campaign_ids = [r[0] for r in results]
-    campaigns = {c.id: c for c in db.query(Campaign).filter(Campaign.id.in_(campaign_ids)).all()}
+    campaigns = {c.id: c for c in await db.scalars(select(Campaign).where(Campaign.id.in_(campaign_ids)))}
 
     reports = []
     for campaign_id, play_count, unique_devices in results:
@@ -93,45 +236,38 @@ async def get_campaign_reports(
     return sorted(reports, key=lambda x: x.play_count, reverse=True)
 
 
-@router.get("/stores", response_model=List[StoreReport])
-async def get_store_reports(
-    start_date: Optional[date] = Query(None),
-    end_date: Optional[date] = Query(None),
-    store_id: Optional[UUID] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
-):
-    """Get playback statistics grouped by store."""
-    if not end_date:
-        end_date = date.today()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
-
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-
+async def _build_store_reports(
+    db: AsyncSession,
+    start_date: date,
+    end_date: date,
+    store_id: Optional[UUID],
+    approximate: bool = False,
+) -> List[StoreReport]:
+    """Build the store report."""
     # Join through Device -> Area -> Store
-    query = db.query(
+    counts = playback_counts(start_date, end_date)
+    device_count = literal(0) if approximate else func.count(func.distinct(counts.c.device_id))
+    query = select(
         Store.id,
         Store.name,
-        func.count(PlaybackLog.id).label("play_count"),
-        func.count(func.distinct(PlaybackLog.device_id)).label("device_count")
+        func.sum(counts.c.play_count).label("play_count"),
+        device_count.label("device_count")
     ).join(
         Area, Area.store_id == Store.id
     ).join(
         Device, Device.area_id == Area.id
     ).join(
-        PlaybackLog, PlaybackLog.device_id == Device.id
-    ).filter(
-        PlaybackLog.played_at >= start_datetime,
-        PlaybackLog.played_at <= end_datetime,
+        counts, counts.c.device_id == Device.id
     )
 
     if store_id:
-        query = query.filter(Store.id == store_id)
+        query = query.where(Store.id == store_id)
 
     query = query.group_by(Store.id, Store.name)
-    results = query.all()
+    results = (await db.execute(query)).all()
+    if approximate:
+        reach = await _estimate_reach(db, "store", start_date, end_date, store_id)
+        results = [(r[0], r[1], r[2], reach.get(r[0], 0)) for r in results]
 
     reports = []
     for store_id, store_name, play_count, device_count in results:
@@ -145,52 +281,55 @@ async def get_store_reports(
     return sorted(reports, key=lambda x: x.play_count, reverse=True)
 
 
-@router.get("/devices", response_model=List[DeviceReport])
-async def get_device_reports(
-    start_date: Optional[date] = Query(None),
-    end_date: Optional[date] = Query(None),
-    store_id: Optional[UUID] = Query(None),
-    area_id: Optional[UUID] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
-):
-    """Get playback statistics grouped by device."""
-    if not end_date:
-        end_date = date.today()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
-
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-
-    query = db.query(
+async def _estimate_reach(
+    db: AsyncSession,
+    by: str,
+    start_date: date,
+    end_date: date,
+    key_id: Optional[UUID],
+) -> Dict[UUID, int]:
+    """Estimate unique devices per campaign or store from the daily reach sketches."""
+    estimator = ReachEstimator()
+    result = await db.stream(reach_sketches(by, start_date, end_date, key_id))
+    async for rows in result.partitions(REACH_CHUNK_ROWS):
+        estimator.add(rows)
+    return estimator.estimates()
+
+
+async def _build_device_reports(
+    db: AsyncSession,
+    start_date: date,
+    end_date: date,
+    store_id: Optional[UUID],
+    area_id: Optional[UUID],
+) -> List[DeviceReport]:
+    """Build the device report."""
+    counts = playback_counts(start_date, end_date)
+    query = select(
         Device.id,
         Device.device_code,
         Device.name,
         Store.name.label("store_name"),
         Area.name.label("area_name"),
-        func.count(PlaybackLog.id).label("play_count")
+        func.sum(counts.c.play_count).label("play_count")
     ).join(
         Area, Device.area_id == Area.id
     ).join(
         Store, Area.store_id == Store.id
     ).join(
-        PlaybackLog, PlaybackLog.device_id == Device.id
-    ).filter(
-        PlaybackLog.played_at >= start_datetime,
-        PlaybackLog.played_at <= end_datetime,
+        counts, counts.c.device_id == Device.id
     )
 
     if store_id:
-        query = query.filter(Store.id == store_id)
+        query = query.where(Store.id == store_id)
     if area_id:
-        query = query.filter(Area.id == area_id)
+        query = query.where(Area.id == area_id)
 
     query = query.group_by(
         Device.id, Device.device_code, Device.name,
         Store.name, Area.name
     )
-    results = query.all()
+    results = (await db.execute(query)).all()
 
     reports = []
     for device_id, device_code, device_name, store_name, area_name, play_count in results:
@@ -206,45 +345,36 @@ async def get_device_reports(
     return sorted(reports, key=lambda x: x.play_count, reverse=True)
 
 
-@router.get("/summary")
-async def get_summary(
-    start_date: Optional[date] = Query(None),
-    end_date: Optional[date] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin)
-):
-    """Get overall summary statistics."""
-    if not end_date:
-        end_date = date.today()
-    if not start_date:
-        start_date = end_date - timedelta(days=30)
-
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-
-    # Total play count
-    total_plays = db.query(func.count(PlaybackLog.id)).filter(
-        PlaybackLog.played_at >= start_datetime,
-        PlaybackLog.played_at <= end_datetime,
-    ).scalar() or 0
-
-    # Active devices
-    active_devices = db.query(func.count(func.distinct(PlaybackLog.device_id))).filter(
-        PlaybackLog.played_at >= start_datetime,
-        PlaybackLog.played_at <= end_datetime,
-    ).scalar() or 0
-
-    # Active campaigns
-    active_campaigns = db.query(func.count(func.distinct(PlaybackLog.campaign_id))).filter(
-        PlaybackLog.played_at >= start_datetime,
-        PlaybackLog.played_at <= end_datetime,
-    ).scalar() or 0
-
-    # Total stores, areas, devices
-    total_stores = db.query(func.count(Store.id)).scalar() or 0
-    total_areas = db.query(func.count(Area.id)).scalar() or 0
-    total_devices = db.query(func.count(Device.id)).scalar() or 0
-    total_campaigns = db.query(func.count(Campaign.id)).scalar() or 0
+def _row_count(model, estimate: bool):
+    """Count a table's rows, or read PostgreSQL's estimate from pg_class."""
+    exact_count = select(func.count()).select_from(model).scalar_subquery()
+    if not estimate:
+        return exact_count
+    reltuples = select(_pg_class.c.reltuples).where(
+        _pg_class.c.oid == cast(literal(model.__tablename__), REGCLASS)
+    ).scalar_subquery()
+    # reltuples is -1 until the table has been vacuumed or analyzed
+    return case((reltuples >= 0, cast(reltuples, BigInteger)), else_=exact_count)
+
+
+async def _build_summary(
+    db: AsyncSession,
+    start_date: date,
+    end_date: date,
+    exact: bool,
+) -> dict:
+    """Build the summary in a single statement."""
+    estimate = not exact and (await db.connection()).dialect.name == "postgresql"
+    counts = playback_counts(start_date, end_date)
+    summary = (await db.execute(select(
+        func.coalesce(func.sum(counts.c.play_count), 0).label("total_plays"),
+        func.count(func.distinct(counts.c.device_id)).label("active_devices"),
+        func.count(func.distinct(counts.c.campaign_id)).label("active_campaigns"),
+        _row_count(Store, estimate).label("total_stores"),
+        _row_count(Area, estimate).label("total_areas"),
+        _row_count(Device, estimate).label("total_devices"),
+        _row_count(Campaign, estimate).label("total_campaigns"),
+    ))).one()
 
     return {
         "period": {
@@ -252,14 +382,15 @@ async def get_summary(
             "end_date": end_date.isoformat(),
         },
         "playback": {
-            "total_plays": total_plays,
-            "active_devices": active_devices,
-            "active_campaigns": active_campaigns,
+            "total_plays": int(summary.total_plays),
+            "active_devices": summary.active_devices,
+            "active_campaigns": summary.active_campaigns,
         },
         "inventory": {
-            "total_stores": total_stores,
-            "total_areas": total_areas,
-            "total_devices": total_devices,
-            "total_campaigns": total_campaigns,
+            "total_stores": summary.total_stores,
+            "total_areas": summary.total_areas,
+            "total_devices": summary.total_devices,
+            "total_campaigns": summary.total_campaigns,
+            "exact": not estimate,
         },
     }
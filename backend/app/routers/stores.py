@@ -8,6 +8,8 @@ from app.models.store import Store
 from app.models.user import User
 from app.schemas.store import StoreCreate, StoreUpdate, StoreResponse
 from app.dependencies import get_current_admin
+from app.utils.presence import get_presence_tracker
+from app.utils.report_cache import invalidate_reports
 
 router = APIRouter(prefix="/stores", tags=["stores"])
 
@@ -40,6 +42,7 @@ async def create_store(
     store = Store(**store_data.model_dump())
     db.add(store)
     db.commit()
+    invalidate_reports()
     db.refresh(store)
     return store
 
@@ -91,6 +94,7 @@ async def update_store(
         setattr(store, key, value)
 
     db.commit()
+    invalidate_reports()
     db.refresh(store)
     return store
 
@@ -108,5 +112,9 @@ async def delete_store(
             detail="Store not found",
         )
 
+    area_ids = [area.id for area in store.areas]
+
     db.delete(store)
     db.commit()
+    invalidate_reports()
+    get_presence_tracker().forget_areas(area_ids)
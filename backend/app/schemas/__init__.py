@@ -3,9 +3,12 @@ from app.schemas.store import StoreCreate, StoreUpdate, StoreResponse
 from app.schemas.area import AreaCreate, AreaUpdate, AreaResponse
 from app.schemas.device import DeviceCreate, DeviceUpdate, DeviceResponse, DeviceRegister
 from app.schemas.campaign import CampaignCreate, CampaignUpdate, CampaignResponse, CampaignAreaUpdate
-from app.schemas.media import MediaCreate, MediaUpdate, MediaResponse
+from app.schemas.media import (
+    MediaCreate, MediaUpdate, MediaResponse,
+    UploadSessionCreate, UploadSessionResponse, UploadSessionComplete, UploadPart,
+)
 from app.schemas.playback_log import PlaybackLogCreate, PlaybackLogResponse
-from app.schemas.playlist import PlaylistResponse, PlaylistItem
+from app.schemas.playlist import PlaylistResponse, PlaylistItem, PlaylistDeltaResponse
 
 __all__ = [
     "UserCreate", "UserUpdate", "UserResponse", "UserLogin", "Token",
@@ -14,6 +17,7 @@ __all__ = [
     "DeviceCreate", "DeviceUpdate", "DeviceResponse", "DeviceRegister",
     "CampaignCreate", "CampaignUpdate", "CampaignResponse", "CampaignAreaUpdate",
     "MediaCreate", "MediaUpdate", "MediaResponse",
+    "UploadSessionCreate", "UploadSessionResponse", "UploadSessionComplete", "UploadPart",
     "PlaybackLogCreate", "PlaybackLogResponse",
-    "PlaylistResponse", "PlaylistItem",
+    "PlaylistResponse", "PlaylistItem", "PlaylistDeltaResponse",
 ]
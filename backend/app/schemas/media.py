@@ -33,6 +33,7 @@ class MediaResponse(MediaBase):
     gcs_url: Optional[str] = None
     file_size: Optional[int] = None
     mime_type: Optional[str] = None
+    content_hash: Optional[str] = None  # SHA-256 of the file; shared by identical uploads
     created_at: datetime
     updated_at: datetime
 
@@ -43,3 +44,31 @@ class MediaResponse(MediaBase):
 class MediaReorderRequest(BaseModel):
     """メディアの並び順更新リクエスト"""
     media_ids: List[UUID]
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    content_type: str
+    duration_seconds: int = Field(default=10, ge=1)
+
+
+class UploadPart(BaseModel):
+    part_number: int
+    size: int
+
+
+class UploadSessionResponse(BaseModel):
+    id: UUID
+    campaign_id: UUID
+    filename: str
+    content_type: str
+    duration_seconds: int
+    max_part_size: int
+    parts: List[UploadPart] = []
+    created_at: datetime
+    expires_at: datetime
+
+
+class UploadSessionComplete(BaseModel):
+    """Number of parts the client sent; parts 1..part_count must all have been received."""
+    part_count: int = Field(ge=1)
@@ -12,6 +12,8 @@ class PlaybackLogBase(BaseModel):
 
 class PlaybackLogCreate(PlaybackLogBase):
     device_id: UUID
+    # Generated by the device once per playback; retried uploads are ignored
+    event_id: Optional[UUID] = None
 
 
 class PlaybackLogBatchCreate(BaseModel):
@@ -23,6 +25,7 @@ class PlaybackLogResponse(PlaybackLogBase):
     device_id: UUID
     synced_at: Optional[datetime] = None
     created_at: datetime
+    event_id: Optional[UUID] = None
 
     class Config:
         from_attributes = True
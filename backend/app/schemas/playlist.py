@@ -1,7 +1,7 @@
 from datetime import datetime
 from uuid import UUID
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
 from app.models.media import MediaType
 
@@ -13,9 +13,21 @@ class PlaylistItem(BaseModel):
     type: MediaType
     duration_seconds: int
     filename: str
+    content_hash: Optional[str] = None  # Same hash means same file, even across campaigns
 
 
 class PlaylistResponse(BaseModel):
     version: str  # Timestamp or hash for cache invalidation
     items: List[PlaylistItem]
     generated_at: datetime
+
+
+class PlaylistDeltaResponse(BaseModel):
+    version: str
+    base_version: Optional[str] = None  # None when a full playlist is returned
+    full: bool  # True when the base version is unknown and items holds the full playlist
+    items: Optional[List[PlaylistItem]] = None
+    added: List[PlaylistItem] = []  # New or changed items
+    removed: List[UUID] = []  # Media IDs no longer in the playlist
+    order: Optional[List[UUID]] = None  # Media IDs in playback order, only when it changed
+    generated_at: datetime
@@ -0,0 +1,175 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+class BoundedExecutor:
+    """Runs blocking calls in a dedicated pool, off the event loop.
+
+    At most max_concurrency calls are submitted to the pool at once; further
+    callers wait on the event loop without holding a worker. There are three
+    pools: short IO calls (file access, URL signing), CPU-heavy work, and
+    streamed uploads, which hold a thread for as long as the client takes to
+    send the file. A burst of logins or slow uploads therefore queues behind
+    itself instead of delaying player requests.
+    """
+
+    def __init__(self, name: str, pool: Executor, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self._pool = pool
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run fn(*args, **kwargs) in the pool and return its result."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        queued = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        started = time.perf_counter()
+        with self._lock:
+            self.active += 1
+            self.max_wait_seconds = max(self.max_wait_seconds, started - queued)
+        ok = False
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+            ok = True
+            return result
+        finally:
+            self._semaphore.release()
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.active -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.total_seconds += elapsed
+                self.max_seconds = max(self.max_seconds, elapsed)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        """Get pool counters."""
+        with self._lock:
+            calls = self.completed + self.failed
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self.active,
+                "waiting": self.waiting,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_seconds": self.total_seconds / calls if calls else 0.0,
+                "max_seconds": self.max_seconds,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+
+# Singleton executor instances
+_io_executor: Optional[BoundedExecutor] = None
+_cpu_executor: Optional[BoundedExecutor] = None
+_upload_executor: Optional[BoundedExecutor] = None
+
+
+def get_io_executor() -> BoundedExecutor:
+    """Get the thread pool for blocking file, network and URL signing calls."""
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = BoundedExecutor(
+            "io",
+            ThreadPoolExecutor(max_workers=settings.io_executor_workers, thread_name_prefix="io"),
+            max_concurrency=settings.io_executor_workers,
+        )
+    return _io_executor
+
+
+def get_cpu_executor() -> BoundedExecutor:
+    """Get the process pool for CPU-heavy work such as password hashing and images.
+
+    Functions and arguments must be picklable. Workers are spawned rather than
+    forked so they do not inherit the server's threads and connections.
+    """
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = BoundedExecutor(
+            "cpu",
+            ProcessPoolExecutor(
+                max_workers=settings.cpu_executor_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            ),
+            max_concurrency=settings.cpu_executor_workers,
+        )
+    return _cpu_executor
+
+
+def get_upload_executor() -> BoundedExecutor:
+    """Get the thread pool for streamed uploads, which block while waiting for the client."""
+    global _upload_executor
+    if _upload_executor is None:
+        _upload_executor = BoundedExecutor(
+            "upload",
+            ThreadPoolExecutor(max_workers=settings.upload_executor_workers, thread_name_prefix="upload"),
+            max_concurrency=settings.upload_executor_workers,
+        )
+    return _upload_executor
+
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking IO call in the IO thread pool."""
+    return await get_io_executor().run(fn, *args, **kwargs)
+
+
+async def run_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a CPU-bound call in the process pool."""
+    return await get_cpu_executor().run(fn, *args, **kwargs)
+
+
+async def run_upload(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking upload that reads from the client in the upload thread pool."""
+    return await get_upload_executor().run(fn, *args, **kwargs)
+
+
+def executor_stats() -> dict:
+    """Get counters of the pools that have been started."""
+    return {
+        "io": _io_executor.stats() if _io_executor else None,
+        "cpu": _cpu_executor.stats() if _cpu_executor else None,
+        "upload": _upload_executor.stats() if _upload_executor else None,
+    }
+
+
+def shutdown_executors() -> None:
+    """Wait for running calls and stop the pools."""
+    global _io_executor, _cpu_executor, _upload_executor
+    for executor in (_io_executor, _cpu_executor, _upload_executor):
+        if executor is not None:
+            executor.shutdown()
+    _io_executor = None
+    _cpu_executor = None
+    _upload_executor = None
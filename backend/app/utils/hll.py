@@ -0,0 +1,88 @@
+import math
+from typing import Iterable, Sequence
+from uuid import UUID
+
+import numpy as np
+
+# HyperLogLog sketches for counting distinct devices.
+#
+# A sketch is PRECISION=12 bits, i.e. 4096 one-byte registers (4 KiB), and
+# estimates the number of distinct IDs added to it with a relative standard
+# error of 1.04 / sqrt(4096) = 1.6%: about 2 in 3 estimates are within
+# 1.6% of the true count, 95% within 3.3% and 99.7% within 4.9%. Counts
+# below about 10,000 use linear counting and are more accurate. Sketches of
+# disjoint or overlapping sets merge by taking the register-wise maximum,
+# which gives exactly the sketch of their union, so daily sketches can be
+# combined over any date range.
+#
+# Functions work on uint8 register arrays of shape (..., REGISTERS) so many
+# sketches are built, merged and estimated with single NumPy operations.
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+RELATIVE_ERROR = 1.04 / math.sqrt(REGISTERS)
+
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+# Hash bits left for the rank once PRECISION bits pick the register; they
+# fit a float64 mantissa, so frexp gives their bit length exactly.
+_RANK_BITS = 64 - PRECISION
+_RANK_MASK = np.uint64((1 << _RANK_BITS) - 1)
+
+
+def hash_uuids(ids: Sequence[UUID]) -> np.ndarray:
+    """Hash UUIDs to uniformly distributed uint64 values (splitmix64 finalizer)."""
+    if not ids:
+        return np.empty(0, dtype=np.uint64)
+    halves = np.frombuffer(b"".join(i.bytes for i in ids), dtype=">u8").astype(np.uint64).reshape(-1, 2)
+    z = halves[:, 0] ^ (halves[:, 1] * np.uint64(0x9E3779B97F4A7C15))
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def empty(count: int = 1) -> np.ndarray:
+    """Get `count` empty sketches."""
+    return np.zeros((count, REGISTERS), dtype=np.uint8)
+
+
+def add_hashes(sketches: np.ndarray, sketch_index: np.ndarray, hashes: np.ndarray) -> None:
+    """Add hashed IDs to sketches in place; hashes[i] goes to sketches[sketch_index[i]]."""
+    register = (hashes >> np.uint64(_RANK_BITS)).astype(np.intp)
+    rest = (hashes & _RANK_MASK).astype(np.float64)
+    # Rank = position of the first 1 bit in the remaining bits (1-based)
+    bit_length = np.frexp(rest)[1]
+    rank = (_RANK_BITS + 1 - bit_length).astype(np.uint8)
+    np.maximum.at(sketches, (sketch_index, register), rank)
+
+
+def merge(sketches: np.ndarray, groups: np.ndarray, group_count: int) -> np.ndarray:
+    """Merge sketches by group; sketches[i] is merged into result[groups[i]]."""
+    merged = empty(group_count)
+    np.maximum.at(merged, groups, sketches)
+    return merged
+
+
+def estimate(sketches: np.ndarray) -> np.ndarray:
+    """Estimate the number of distinct IDs in each sketch."""
+    sketches = np.atleast_2d(sketches)
+    raw = _ALPHA * REGISTERS * REGISTERS / np.ldexp(1.0, -sketches.astype(np.int64)).sum(axis=1)
+    zeros = (sketches == 0).sum(axis=1)
+    # Small cardinalities: linear counting over the empty registers
+    with np.errstate(divide="ignore"):
+        linear = REGISTERS * np.log(REGISTERS / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * REGISTERS) & (zeros > 0), linear, raw)
+
+
+def to_bytes(sketch: np.ndarray) -> bytes:
+    return sketch.astype(np.uint8).tobytes()
+
+
+def from_bytes(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def sketch_of(ids: Iterable[UUID]) -> np.ndarray:
+    """Build a single sketch of some IDs."""
+    hashes = hash_uuids(list(ids))
+    sketches = empty(1)
+    add_hashes(sketches, np.zeros(len(hashes), dtype=np.intp), hashes)
+    return sketches[0]
@@ -0,0 +1,286 @@
+import codecs
+import json
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+from uuid import UUID
+
+from pydantic import ValidationError
+from starlette.requests import Request
+
+from app.schemas.playback_log import PlaybackLogCreate
+from app.utils.log_ingest import PlaybackLogRow, build_playback_log_rows
+
+# Compact upload format: one JSON header line, then one JSON array per log.
+#
+#   {"device_id": "<uuid>", "media": ["<uuid>", ...], "campaigns": ["<uuid>", ...]}
+#   [<media index>, <campaign index>, <played_at>, "<event_id>"]
+#
+# played_at is Unix seconds or an ISO 8601 string; event_id may be omitted.
+COMPACT_LOG_MEDIA_TYPE = "application/x-ndjson"
+
+_DECODE_CHUNK_SIZE = 64 * 1024
+# Longest single log accepted in a JSON array upload; an entry is re-parsed
+# from its start whenever a chunk ends inside it
+_MAX_JSON_LOG_CHARS = 64 * 1024
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = " \t\n\r"
+
+
+class LogFormatError(ValueError):
+    """Raised when an upload body cannot be decoded."""
+
+
+class LogBodyTooLarge(LogFormatError):
+    """Raised when a decoded upload body exceeds the size limit."""
+
+
+class LogValidationError(ValueError):
+    """Raised when a log in a JSON array upload fails validation.
+
+    errors are pydantic error dicts located by the log's index in the array.
+    """
+
+    def __init__(self, errors: list):
+        super().__init__("Invalid playback log")
+        self.errors = errors
+
+
+async def iter_request_body(request: Request, max_bytes: int) -> AsyncIterator[bytes]:
+    """Yield the request body in chunks, decompressing Content-Encoding: gzip.
+
+    The decoded size is checked while reading so a compressed body cannot
+    expand past max_bytes in memory.
+    """
+    encoding = request.headers.get("content-encoding", "identity").strip().lower()
+    if encoding not in ("identity", "gzip"):
+        raise LogFormatError(f"Unsupported Content-Encoding: {encoding}")
+
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == "gzip" else None
+    total = 0
+    async for chunk in request.stream():
+        if decoder is None:
+            pieces = [chunk]
+        else:
+            pieces = []
+            pending = chunk
+            while pending:
+                try:
+                    pieces.append(decoder.decompress(pending, _DECODE_CHUNK_SIZE))
+                except zlib.error as e:
+                    raise LogFormatError(f"Invalid gzip body: {e}") from e
+                pending = decoder.unconsumed_tail
+
+        for piece in pieces:
+            total += len(piece)
+            if total > max_bytes:
+                raise LogBodyTooLarge(f"Decoded body exceeds {max_bytes} bytes")
+            if piece:
+                yield piece
+
+    if decoder is not None:
+        tail = decoder.flush()
+        if not decoder.eof:
+            raise LogFormatError("Truncated gzip body")
+        if len(tail) + total > max_bytes:
+            raise LogBodyTooLarge(f"Decoded body exceeds {max_bytes} bytes")
+        if tail:
+            yield tail
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a chunked body into non-empty lines."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+def _parse_uuid(value, what: str) -> UUID:
+    try:
+        return UUID(value)
+    except (TypeError, ValueError, AttributeError):
+        raise LogFormatError(f"Invalid {what}: {value!r}")
+
+
+def _header_list(header: dict, key: str) -> list:
+    value = header.get(key) or []
+    if not isinstance(value, list):
+        raise LogFormatError(f"Header {key} must be a list")
+    return value
+
+
+def _parse_played_at(value) -> datetime:
+    # Out-of-range timestamps (including NaN and Infinity, which json.loads
+    # accepts) raise OverflowError, OSError or ValueError
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
+        except (OverflowError, OSError, ValueError):
+            raise LogFormatError(f"Invalid played_at: {value!r}")
+    if isinstance(value, str):
+        try:
+            played_at = datetime.fromisoformat(value)
+            if played_at.tzinfo is not None:
+                played_at = played_at.astimezone(timezone.utc).replace(tzinfo=None)
+        except (OverflowError, ValueError):
+            raise LogFormatError(f"Invalid played_at: {value!r}")
+        return played_at
+    raise LogFormatError(f"Invalid played_at: {value!r}")
+
+
+async def read_compact_logs(
+    lines: AsyncIterator[bytes],
+    synced_at: datetime,
+) -> Tuple[Optional[UUID], List[PlaybackLogRow]]:
+    """Decode a compact log upload into a device ID and insert rows."""
+    device_id = None
+    media_ids: List[UUID] = []
+    campaign_ids: List[UUID] = []
+    rows: List[PlaybackLogRow] = []
+
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        try:
+            value = json.loads(line)
+        except ValueError:
+            raise LogFormatError(f"Line {line_number}: invalid JSON")
+
+        if device_id is None:
+            if not isinstance(value, dict):
+                raise LogFormatError("First line must be the header object")
+            device_id = _parse_uuid(value.get("device_id"), "device_id")
+            media_ids = [_parse_uuid(v, "media ID") for v in _header_list(value, "media")]
+            campaign_ids = [_parse_uuid(v, "campaign ID") for v in _header_list(value, "campaigns")]
+            continue
+
+        if not isinstance(value, list) or len(value) not in (3, 4):
+            raise LogFormatError(f"Line {line_number}: expected [media, campaign, played_at, event_id?]")
+        media_index, campaign_index = value[0], value[1]
+        # bool is a subclass of int, but true/false are not indexes
+        if isinstance(media_index, bool) or not (isinstance(media_index, int) and 0 <= media_index < len(media_ids)):
+            raise LogFormatError(f"Line {line_number}: media index out of range")
+        if isinstance(campaign_index, bool) or not (
+            isinstance(campaign_index, int) and 0 <= campaign_index < len(campaign_ids)
+        ):
+            raise LogFormatError(f"Line {line_number}: campaign index out of range")
+        event_id = value[3] if len(value) == 4 else None
+
+        rows.append(PlaybackLogRow(
+            uuid.uuid4(),
+            device_id,
+            media_ids[media_index],
+            campaign_ids[campaign_index],
+            _parse_played_at(value[2]),
+            synced_at,
+            _parse_uuid(event_id, "event_id") if event_id is not None else None,
+        ))
+
+    return device_id, rows
+
+
+async def read_json_logs(
+    chunks: AsyncIterator[bytes],
+    synced_at: datetime,
+) -> Tuple[Optional[UUID], List[PlaybackLogRow]]:
+    """Decode a JSON array of logs into a device ID and insert rows.
+
+    The array is parsed as the body arrives, one log at a time, so neither
+    the whole body nor all the validated logs are held at once. The device
+    is taken from the first log; logs of other devices are skipped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = finished = False
+    device_id = None
+    rows: List[PlaybackLogRow] = []
+    index = 0
+
+    async def more() -> bool:
+        nonlocal buffer, position
+        try:
+            chunk = await chunks.__anext__()
+        except StopAsyncIteration:
+            return False
+        try:
+            text = decoder.decode(chunk)
+        except UnicodeDecodeError:
+            raise LogFormatError("Body is not valid UTF-8")
+        buffer = buffer[position:] + text
+        position = 0
+        return True
+
+    async def next_token() -> Optional[str]:
+        # Skip whitespace, reading on as needed; None at the end of the body
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in _JSON_WHITESPACE:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if not await more():
+                return None
+
+    while True:
+        token = await next_token()
+        if finished:
+            if token is not None:
+                raise LogFormatError("Unexpected data after the JSON array")
+            break
+        if not started:
+            if token != "[":
+                raise LogFormatError("Body must be a JSON array")
+            started = True
+            position += 1
+            if await next_token() == "]":
+                position += 1
+                finished = True
+            continue
+        if token is None:
+            raise LogFormatError("Truncated JSON array")
+        if index > 0:
+            if token == "]":
+                position += 1
+                finished = True
+                continue
+            if token != ",":
+                raise LogFormatError(f"Log {index}: expected ',' or ']'")
+            position += 1
+            await next_token()
+
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(buffer, position)
+                break
+            except ValueError:
+                if len(buffer) - position > _MAX_JSON_LOG_CHARS:
+                    raise LogFormatError(f"Log {index}: too long or invalid JSON")
+                if not await more():
+                    raise LogFormatError(f"Log {index}: invalid JSON")
+        position = end
+
+        try:
+            log = PlaybackLogCreate.model_validate(value)
+        except ValidationError as e:
+            raise LogValidationError([
+                {**error, "loc": (index, *error["loc"])} for error in e.errors()
+            ])
+        if device_id is None:
+            device_id = log.device_id
+        rows.extend(build_playback_log_rows([log], device_id, synced_at))
+        index += 1
+
+    try:
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise LogFormatError("Body is not valid UTF-8")
+    return device_id, rows
@@ -0,0 +1,250 @@
+import csv
+import io
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional
+from uuid import UUID
+
+from sqlalchemy import insert, literal, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.campaign import Campaign
+from app.models.media import Media
+from app.models.playback_log import PlaybackLog
+from app.schemas.playback_log import PlaybackLogCreate
+
+
+class PlaybackLogRow(NamedTuple):
+    """A playback_logs row in column order, ready for bulk insertion.
+
+    created_at is left out; the database stamps it on insert.
+    """
+    id: UUID
+    device_id: UUID
+    media_id: UUID
+    campaign_id: UUID
+    played_at: datetime
+    synced_at: datetime
+    event_id: Optional[UUID]
+
+
+PLAYBACK_LOG_COLUMNS = PlaybackLogRow._fields
+
+# Per-connection staging table for COPY when rows may conflict on event_id
+_STAGING_TABLE = "playback_logs_incoming"
+# Unique key of a stored event; includes played_at, the partition key
+_EVENT_KEY = ["event_id", "played_at"]
+
+
+def build_playback_log_rows(
+    logs: Iterable[PlaybackLogCreate],
+    device_id: UUID,
+    synced_at: datetime,
+) -> List[PlaybackLogRow]:
+    """Build insert rows for a device's logs, skipping logs of other devices."""
+    return [
+        PlaybackLogRow(
+            uuid.uuid4(), device_id, log.media_id, log.campaign_id,
+            log.played_at, synced_at, log.event_id,
+        )
+        for log in logs
+        if log.device_id == device_id
+    ]
+
+
+async def drop_unknown_references(db: AsyncSession, rows: List[PlaybackLogRow]) -> List[PlaybackLogRow]:
+    """Remove rows whose media or campaign does not exist.
+
+    Client IDs are not validated otherwise, and a row referencing deleted
+    media would fail its whole batch on the foreign keys.
+    """
+    media_ids = {row.media_id for row in rows}
+    campaign_ids = {row.campaign_id for row in rows}
+    result = await db.execute(union_all(
+        select(literal("media"), Media.id).where(Media.id.in_(media_ids)),
+        select(literal("campaign"), Campaign.id).where(Campaign.id.in_(campaign_ids)),
+    ))
+    known = {tuple(row) for row in result}
+    return [
+        row for row in rows
+        if ("media", row.media_id) in known and ("campaign", row.campaign_id) in known
+    ]
+
+
+def insert_playback_log_rows(db: Session, rows: List[PlaybackLogRow]) -> int:
+    """Insert playback log rows in bulk within the session's transaction.
+
+    Uses COPY on PostgreSQL (psycopg2) and a single executemany INSERT on
+    other engines. Rows whose event_id is already stored are skipped.
+    Returns the number of rows inserted. The caller commits.
+    """
+    if not rows:
+        return 0
+
+    connection = db.connection()
+    dialect = connection.dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2":
+        try:
+            if any(row.event_id is not None for row in rows):
+                return _copy_rows_ignoring_duplicates(connection, rows)
+            _copy_rows(connection, PlaybackLog.__tablename__, rows)
+        except dialect.dbapi.IntegrityError as e:
+            # Raw cursor errors are not wrapped by SQLAlchemy; raise what
+            # the INSERT path would so callers can handle both the same way
+            raise IntegrityError("COPY playback_logs", None, e) from e
+        return len(rows)
+
+    if dialect.name == "postgresql":
+        stmt = postgresql.insert(PlaybackLog.__table__).on_conflict_do_nothing(index_elements=_EVENT_KEY)
+    elif dialect.name == "sqlite":
+        stmt = sqlite.insert(PlaybackLog.__table__).on_conflict_do_nothing(index_elements=_EVENT_KEY)
+    else:
+        stmt = insert(PlaybackLog.__table__)
+    result = db.execute(stmt, [row._asdict() for row in rows])
+    return result.rowcount if result.rowcount >= 0 else len(rows)
+
+
+async def insert_playback_log_rows_async(db: AsyncSession, rows: List[PlaybackLogRow]) -> int:
+    """Async version of insert_playback_log_rows; uses binary COPY on asyncpg."""
+    if not rows:
+        return 0
+
+    connection = await db.connection()
+    if connection.dialect.driver != "asyncpg":
+        return await db.run_sync(insert_playback_log_rows, rows)
+
+    raw = (await connection.get_raw_connection()).driver_connection
+    if not raw.is_in_transaction():
+        # SQLAlchemy sends BEGIN with its first statement, and raw driver
+        # calls skip that. Without it every call below would commit on its
+        # own, and ON COMMIT DELETE ROWS would empty the staging table
+        # between the COPY and the INSERT.
+        await connection.exec_driver_sql("SELECT 1")
+    if not any(row.event_id is not None for row in rows):
+        await raw.copy_records_to_table(
+            PlaybackLog.__tablename__, records=rows, columns=PLAYBACK_LOG_COLUMNS,
+        )
+        return len(rows)
+
+    columns = ", ".join(PLAYBACK_LOG_COLUMNS)
+    await raw.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {_STAGING_TABLE} "
+        f"(LIKE {PlaybackLog.__tablename__} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    )
+    await raw.copy_records_to_table(_STAGING_TABLE, records=rows, columns=PLAYBACK_LOG_COLUMNS)
+    status = await raw.execute(
+        f"INSERT INTO {PlaybackLog.__tablename__} ({columns}) "
+        f"SELECT {columns} FROM {_STAGING_TABLE} "
+        "ON CONFLICT (event_id, played_at) DO NOTHING"
+    )
+    await raw.execute(f"DELETE FROM {_STAGING_TABLE}")
+    # Command status is "INSERT 0 <rows>"
+    return int(status.rsplit(" ", 1)[-1])
+
+
+def _copy_rows(connection, table: str, rows: List[PlaybackLogRow]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+    buffer.seek(0)
+
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(PLAYBACK_LOG_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+    finally:
+        cursor.close()
+
+
+def _copy_rows_ignoring_duplicates(connection, rows: List[PlaybackLogRow]) -> int:
+    # COPY cannot skip conflicting rows, so stage them and move them over
+    # with INSERT ... ON CONFLICT DO NOTHING.
+    columns = ", ".join(PLAYBACK_LOG_COLUMNS)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {_STAGING_TABLE} "
+            f"(LIKE {PlaybackLog.__tablename__} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        _copy_rows(connection, _STAGING_TABLE, rows)
+        cursor.execute(
+            f"INSERT INTO {PlaybackLog.__tablename__} ({columns}) "
+            f"SELECT {columns} FROM {_STAGING_TABLE} "
+            "ON CONFLICT (event_id, played_at) DO NOTHING"
+        )
+        inserted = cursor.rowcount
+        # Several batches can be inserted in one transaction
+        cursor.execute(f"DELETE FROM {_STAGING_TABLE}")
+    finally:
+        cursor.close()
+    return inserted
+
+
+class RecentEventFilter:
+    """Remembers recently stored event IDs to drop retried uploads early.
+
+    Bounded LRU set; an ID that has been evicted is still rejected by the
+    unique constraint on insert, this only saves the round trip.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._ids: "OrderedDict[UUID, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def drop_seen(self, rows: List[PlaybackLogRow]) -> List[PlaybackLogRow]:
+        """Remove rows whose event ID was stored recently or repeats in the batch."""
+        kept = []
+        batch_ids = set()
+        with self._lock:
+            for row in rows:
+                event_id = row.event_id
+                if event_id is not None:
+                    if event_id in self._ids:
+                        self._ids.move_to_end(event_id)
+                        self.dropped += 1
+                        continue
+                    if event_id in batch_ids:
+                        self.dropped += 1
+                        continue
+                    batch_ids.add(event_id)
+                kept.append(row)
+        return kept
+
+    def remember(self, rows: List[PlaybackLogRow]) -> None:
+        """Record the event IDs of rows that have been stored or queued."""
+        with self._lock:
+            for row in rows:
+                if row.event_id is None:
+                    continue
+                self._ids[row.event_id] = None
+                self._ids.move_to_end(row.event_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Get filter counters."""
+        with self._lock:
+            return {"size": len(self._ids), "dropped": self.dropped}
+
+
+# Singleton filter instance
+_recent_event_filter: Optional[RecentEventFilter] = None
+
+
+def get_recent_event_filter() -> RecentEventFilter:
+    """Get the process-wide recent event ID filter."""
+    global _recent_event_filter
+    if _recent_event_filter is None:
+        _recent_event_filter = RecentEventFilter(settings.playback_log_recent_event_ids)
+    return _recent_event_filter
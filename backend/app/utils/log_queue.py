@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.utils.log_ingest import PlaybackLogRow, insert_playback_log_rows
+
+logger = logging.getLogger(__name__)
+
+_MAX_RETRY_DELAY_SECONDS = 60.0
+
+
+class PlaybackLogQueue:
+    """Bounded in-process buffer of playback log rows awaiting insertion.
+
+    Requests only append validated rows; a background writer drains them into
+    the database in large batches. put() refuses a batch once the buffer holds
+    max_rows rows, which the endpoint reports as 429 so devices back off and
+    keep their logs until the database catches up.
+
+    A batch that violates a constraint is split until the offending rows
+    are found; those are logged and dropped. Rows that fail for other
+    reasons are retried up to max_retries times and then dropped the same
+    way, so one bad batch cannot block all later logs.
+    """
+
+    def __init__(self, max_rows: int, batch_rows: int, max_retries: int):
+        self.max_rows = max_rows
+        self.batch_rows = batch_rows
+        self.max_retries = max_retries
+        self._rows: Deque[PlaybackLogRow] = deque()
+        self._lock = threading.Lock()
+        # Only one flush at a time, so re-queued rows keep their order
+        self._flush_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self.accepted_rows = 0
+        self.rejected_batches = 0
+        self.flush_count = 0
+        self.flushed_rows = 0
+        self.failed_flushes = 0
+        # Failed attempts of the batch at the front of the queue
+        self.failed_attempts = 0
+        self.dropped_rows = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    def put(self, rows: List[PlaybackLogRow]) -> bool:
+        """Queue a batch of rows; returns False if the queue is full."""
+        with self._lock:
+            if len(self._rows) + len(rows) > self.max_rows:
+                self.rejected_batches += 1
+                return False
+            self._rows.extend(rows)
+            self.accepted_rows += len(rows)
+            depth = len(self._rows)
+
+        # Wake the writer early once a full batch is waiting
+        if self._wakeup is not None and depth >= self.batch_rows:
+            self._wakeup.set()
+        return True
+
+    def depth(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def _take(self) -> List[PlaybackLogRow]:
+        with self._lock:
+            count = min(len(self._rows), self.batch_rows)
+            return [self._rows.popleft() for _ in range(count)]
+
+    def flush(self, db: Session) -> int:
+        """Write all queued rows in batches of batch_rows, one commit per batch."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                rows = self._take()
+                if not rows:
+                    break
+
+                started = time.perf_counter()
+                # Sub-batches still to write, last one first; a batch that
+                # violates a constraint is split in halves until the bad rows
+                # are found, so the rest of it is still written
+                pending = [rows]
+                inserted = dropped = 0
+                while pending:
+                    batch = pending.pop()
+                    try:
+                        insert_playback_log_rows(db, batch)
+                        db.commit()
+                    except IntegrityError as e:
+                        db.rollback()
+                        if len(batch) == 1:
+                            logger.error("Dropping playback log %s: %s", batch[0], e.orig)
+                            dropped += 1
+                        else:
+                            middle = len(batch) // 2
+                            pending.extend([batch[middle:], batch[:middle]])
+                        continue
+                    except Exception:
+                        db.rollback()
+                        self._fail([row for rest in [batch] + pending[::-1] for row in rest], inserted, dropped)
+                        raise
+                    inserted += len(batch)
+                elapsed = time.perf_counter() - started
+
+                written += inserted
+                with self._lock:
+                    self.failed_attempts = 0
+                    self.dropped_rows += dropped
+                    self.flush_count += 1
+                    self.flushed_rows += inserted
+                    self.last_flush_seconds = elapsed
+                    self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        return written
+
+    def _fail(self, rows: List[PlaybackLogRow], inserted: int, dropped: int) -> None:
+        # Rows already committed by this flush are counted. The rest go back
+        # to the front even if that exceeds max_rows (put() then rejects new
+        # batches until they are written), or are dropped after max_retries.
+        with self._lock:
+            self.flushed_rows += inserted
+            self.dropped_rows += dropped
+            self.failed_flushes += 1
+            self.failed_attempts += 1
+            give_up = self.failed_attempts >= self.max_retries
+            if give_up:
+                self.failed_attempts = 0
+                self.dropped_rows += len(rows)
+            else:
+                self._rows.extendleft(reversed(rows))
+        if give_up:
+            logger.error("Dropping %d playback logs after %d failed writes", len(rows), self.max_retries)
+
+    async def wait(self, timeout: float) -> None:
+        """Wait until a full batch is queued or the timeout passes."""
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    def stats(self) -> dict:
+        """Get queue counters."""
+        with self._lock:
+            return {
+                "depth_rows": len(self._rows),
+                "max_rows": self.max_rows,
+                "accepted_rows": self.accepted_rows,
+                "rejected_batches": self.rejected_batches,
+                "flush_count": self.flush_count,
+                "flushed_rows": self.flushed_rows,
+                "failed_flushes": self.failed_flushes,
+                "dropped_rows": self.dropped_rows,
+                "last_flush_seconds": self.last_flush_seconds,
+                "max_flush_seconds": self.max_flush_seconds,
+            }
+
+
+# Singleton queue instance
+_log_queue: Optional[PlaybackLogQueue] = None
+
+
+def get_log_queue() -> PlaybackLogQueue:
+    """Get the process-wide playback log queue."""
+    global _log_queue
+    if _log_queue is None:
+        _log_queue = PlaybackLogQueue(
+            max_rows=settings.playback_log_queue_max_rows,
+            batch_rows=settings.playback_log_queue_batch_rows,
+            max_retries=settings.playback_log_queue_max_retries,
+        )
+    return _log_queue
+
+
+def flush_log_queue() -> int:
+    """Write all queued playback logs using a new session."""
+    db = SessionLocal()
+    try:
+        return get_log_queue().flush(db)
+    finally:
+        db.close()
+
+
+async def run_log_writer() -> None:
+    """Drain the playback log queue until cancelled."""
+    queue = get_log_queue()
+    while True:
+        await queue.wait(settings.playback_log_queue_flush_interval_seconds)
+        try:
+            await run_in_threadpool(flush_log_queue)
+        except Exception:
+            logger.exception("Failed to write queued playback logs")
+            # Back off exponentially before retrying the re-queued rows
+            interval = settings.playback_log_queue_flush_interval_seconds
+            await asyncio.sleep(min(interval * 2 ** max(queue.failed_attempts - 1, 0), _MAX_RETRY_DELAY_SECONDS))
@@ -0,0 +1,194 @@
+import hashlib
+import uuid
+from collections import Counter
+from typing import AsyncIterator, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.media import Media
+from app.models.media_blob import MediaBlob
+from app.utils.executors import run_io
+from app.utils.storage import upload_stream, move_file, delete_file
+
+BLOB_PREFIX = "blobs"
+STAGING_PREFIX = "staging"
+
+
+def blob_path_for(content_hash: str, filename: str) -> str:
+    """Get a new content-addressed storage path for a file.
+
+    The extension of the first upload is kept so local static serving
+    still picks the right content type. Every stored copy gets its own
+    suffix: a release deletes its blob's file after committing, and must
+    not remove a copy that an upload of the same content stored meanwhile.
+    """
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    stem = f"{content_hash}-{uuid.uuid4().hex[:8]}"
+    name = f"{stem}.{extension}" if extension else stem
+    return f"{BLOB_PREFIX}/{content_hash[:2]}/{name}"
+
+
+def set_lock_timeout(db: Session) -> None:
+    """Bound lock waits for the rest of the transaction (PostgreSQL).
+
+    Blob rows are locked from request handlers running on the event loop,
+    so a wait on another worker's lock must not be unbounded.
+    """
+    if db.connection().dialect.name == "postgresql":
+        db.execute(
+            text("SELECT set_config('lock_timeout', :timeout, true)"),
+            {"timeout": f"{int(settings.media_blob_lock_timeout_seconds * 1000)}ms"},
+        )
+
+
+def lock_blob(db: Session, content_hash: str) -> Optional[MediaBlob]:
+    return db.query(MediaBlob).filter(
+        MediaBlob.content_hash == content_hash
+    ).with_for_update().first()
+
+
+def _take_reference(
+    db: Session,
+    content_hash: str,
+    storage_path: Optional[str],
+    file_size: int,
+    content_type: Optional[str],
+) -> Optional[MediaBlob]:
+    """Add a reference to the blob with this content and commit.
+
+    Creates the blob from storage_path if there is none; returns None when
+    there is none and no file was stored yet. Nothing in here awaits, so
+    the row lock is never held while other requests run on the loop.
+    """
+    set_lock_timeout(db)
+    blob = lock_blob(db, content_hash)
+    if blob is None:
+        if storage_path is None:
+            db.rollback()
+            return None
+        blob = MediaBlob(
+            content_hash=content_hash,
+            storage_path=storage_path,
+            file_size=file_size,
+            mime_type=content_type,
+            ref_count=0,
+        )
+        try:
+            with db.begin_nested():
+                db.add(blob)
+        except IntegrityError:
+            # Same content stored concurrently; use that copy
+            blob = lock_blob(db, content_hash)
+    blob.ref_count += 1
+    db.commit()
+    return blob
+
+
+async def store_blob(
+    db: Session,
+    chunks: AsyncIterator[bytes],
+    filename: str,
+    content_type: Optional[str] = None,
+    max_size: Optional[int] = None,
+) -> MediaBlob:
+    """Stream an upload into content-addressed storage and take a reference to it.
+
+    The file is hashed (SHA-256) while it streams to a staging path. If a
+    blob with the same hash already exists the staged copy is discarded;
+    otherwise it is moved to a new blob path first. Then the blob's
+    reference count is incremented and committed, with the session's
+    pending changes. If the media row cannot be created afterwards, give
+    the reference back with release_blob.
+    Raises FileTooLargeError like upload_stream.
+    """
+    digest = hashlib.sha256()
+
+    async def hashed_chunks() -> AsyncIterator[bytes]:
+        async for chunk in chunks:
+            digest.update(chunk)
+            yield chunk
+
+    staging_path, file_size = await upload_stream(
+        hashed_chunks(), f"{STAGING_PREFIX}/{uuid.uuid4().hex}", content_type, max_size=max_size,
+    )
+    content_hash = digest.hexdigest()
+
+    staged = True
+    storage_path = None
+    blob = None
+    try:
+        while blob is None:
+            blob = _take_reference(db, content_hash, storage_path, file_size, content_type)
+            if blob is None:
+                # No stored copy of this content yet
+                storage_path = await run_io(move_file, staging_path, blob_path_for(content_hash, filename))
+                staged = False
+    finally:
+        if staged:
+            await run_io(delete_file, staging_path)
+        if storage_path is not None and (blob is None or blob.storage_path != storage_path):
+            # A concurrent upload of the same content created the blob first
+            await run_io(delete_file, storage_path)
+
+    return blob
+
+
+def _drop_references(db: Session, references: Counter) -> List[str]:
+    """Drop blob references, deleting blobs without any; returns the files to delete."""
+    set_lock_timeout(db)
+    storage_paths = []
+    # Lock in a fixed order so concurrent releases cannot deadlock
+    for content_hash in sorted(references):
+        blob = lock_blob(db, content_hash)
+        if blob is None:
+            continue
+        blob.ref_count -= references[content_hash]
+        if blob.ref_count <= 0:
+            storage_paths.append(blob.storage_path)
+            storage_paths.extend(rendition.storage_path for rendition in blob.renditions)
+            db.delete(blob)
+    return storage_paths
+
+
+async def _delete_files(storage_paths: Iterable[str]) -> None:
+    for storage_path in storage_paths:
+        try:
+            await run_io(delete_file, storage_path)
+        except Exception:
+            pass  # Continue even if storage delete fails
+
+
+async def release_media_files(db: Session, media_items: Iterable[Media]) -> None:
+    """Release the stored files of deleted media rows and commit.
+
+    Call after the rows' deletion has been flushed; it is committed together
+    with the blob changes. Each row drops one reference to its blob, and
+    blobs without references are deleted. Files are deleted after the commit,
+    so no blob lock is held meanwhile. Files stored per campaign before
+    content addressing (no content_hash) are deleted directly.
+    """
+    storage_paths = []
+    references = Counter()
+    for media in media_items:
+        if media.content_hash is None:
+            storage_paths.append(media.gcs_path)
+        else:
+            references[media.content_hash] += 1
+
+    storage_paths.extend(_drop_references(db, references))
+    db.commit()
+    await _delete_files(storage_paths)
+
+
+async def release_blob(db: Session, content_hash: str) -> None:
+    """Give back a reference taken by store_blob when no media row was created.
+
+    Rolls back the session's pending changes first.
+    """
+    db.rollback()
+    storage_paths = _drop_references(db, Counter([content_hash]))
+    db.commit()
+    await _delete_files(storage_paths)
@@ -0,0 +1,247 @@
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+from app.utils.executors import run_io
+
+CHUNK_SIZE = 1024 * 1024
+ETAG_CACHE_SIZE = 4096
+# Stored files never change once written: content-addressed blobs and their
+# renditions are named after the content, older uploads after a random UUID.
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# blobs/ab/<sha256>-<suffix>.<ext> and renditions
+# blobs/ab/<sha256>-<suffix>-<w>x<h>.<ext>, where <suffix> is 8 random hex
+# digits per stored copy (blobs stored before those were added lack it)
+_CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{64}(-[0-9a-f]{8})?(-\d+x\d+)?$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range Range header into an inclusive (start, end).
+
+    Returns None when the header should be ignored (malformed or several
+    ranges) and raises ValueError when the range cannot be satisfied.
+    """
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise ValueError("Range starts past the end of the file")
+    return start, min(end, size - 1)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaFiles:
+    """ASGI app serving local storage with long-lived caching.
+
+    Replaces a plain StaticFiles mount. Responses carry an immutable
+    Cache-Control header and a strong ETag derived from the content (taken
+    from content-addressed file names, otherwise hashed once and cached),
+    and honour If-None-Match, Range and If-Range so players can seek in
+    videos and resume downloads. When the server offers the ASGI
+    zero-copy send extension the file is handed to it instead of being
+    read in chunks.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory).resolve()
+        self._etags: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.not_modified = 0
+        self.partial = 0
+        self.zero_copy = 0
+        self.bytes_sent = 0
+
+    def _resolve(self, path: str) -> Optional[Path]:
+        relative = path.lstrip("/")
+        parts = relative.split("/")
+        # Hide temp files and uploads still being staged
+        if not relative or parts[0] == "staging" or any(p.startswith(".") for p in parts):
+            return None
+        full_path = (self.directory / relative).resolve()
+        if self.directory not in full_path.parents:
+            return None
+        return full_path
+
+    async def _etag(self, full_path: Path, st: os.stat_result) -> str:
+        if _CONTENT_ADDRESSED_NAME.match(full_path.stem):
+            return f'"{full_path.stem}"'
+        key = (str(full_path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            etag = self._etags.get(key)
+            if etag is not None:
+                self._etags.move_to_end(key)
+                return etag
+        etag = f'"{await run_io(_hash_file, str(full_path))}"'
+        with self._lock:
+            self._etags[key] = etag
+            while len(self._etags) > ETAG_CACHE_SIZE:
+                self._etags.popitem(last=False)
+        return etag
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        with self._lock:
+            self.requests += 1
+
+        if scope["method"] not in ("GET", "HEAD"):
+            await self._send_empty(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+
+        full_path = self._resolve(scope["path"][len(scope.get("root_path", "")):])
+        try:
+            st = await run_io(os.stat, full_path) if full_path else None
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            await self._send_empty(send, 404, [(b"content-type", b"text/plain; charset=utf-8")], b"Not Found")
+            return
+
+        request_headers = Headers(scope=scope)
+        size = st.st_size
+        etag = await self._etag(full_path, st)
+        content_type = mimetypes.guess_type(full_path.name)[0] or "application/octet-stream"
+        headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", CACHE_CONTROL.encode()),
+            (b"accept-ranges", b"bytes"),
+        ]
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and (
+            if_none_match.strip() == "*"
+            or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        ):
+            with self._lock:
+                self.not_modified += 1
+            await self._send_empty(send, 304, headers)
+            return
+
+        status = 200
+        start, end = 0, size - 1
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        # A Range is only honoured while the client's copy is still current
+        if range_header and (if_range is None or if_range.strip() == etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                headers.append((b"content-range", f"bytes */{size}".encode()))
+                await self._send_empty(send, 416, headers)
+                return
+            if byte_range is not None:
+                status = 206
+                start, end = byte_range
+                headers.append((b"content-range", f"bytes {start}-{end}/{size}".encode()))
+                with self._lock:
+                    self.partial += 1
+
+        length = end - start + 1 if size else 0
+        headers += [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(length).encode()),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        if scope["method"] == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await self._send_file(scope, send, str(full_path), start, length)
+
+    async def _send_file(self, scope: Scope, send: Send, path: str, offset: int, count: int) -> None:
+        f = await run_io(open, path, "rb", buffering=0)
+        try:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                with self._lock:
+                    self.zero_copy += 1
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": False,
+                })
+            else:
+                remaining = count
+                while remaining:
+                    chunk = await run_io(os.pread, f.fileno(), min(CHUNK_SIZE, remaining), offset)
+                    if not chunk:
+                        break
+                    offset += len(chunk)
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining:
+                    # File shrank while being sent; end the response
+                    await send({"type": "http.response.body", "body": b""})
+        finally:
+            f.close()
+        with self._lock:
+            self.bytes_sent += count
+
+    @staticmethod
+    async def _send_empty(send: Send, status: int, headers: list, body: bytes = b"") -> None:
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": headers + [(b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> dict:
+        """Get serving counters."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "not_modified": self.not_modified,
+                "partial": self.partial,
+                "zero_copy": self.zero_copy,
+                "bytes_sent": self.bytes_sent,
+                "etag_cache_size": len(self._etags),
+            }
+
+
+# Singleton media file server
+_media_files: Optional[MediaFiles] = None
+
+
+def get_media_files() -> MediaFiles:
+    """Get the app serving local storage under /media."""
+    global _media_files
+    if _media_files is None:
+        Path(settings.local_storage_path).mkdir(parents=True, exist_ok=True)
+        _media_files = MediaFiles(settings.local_storage_path)
+    return _media_files
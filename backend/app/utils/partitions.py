@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.config import settings
+from app.database import engine
+from app.models.playback_log import PlaybackLog
+from app.utils.executors import run_io
+from app.utils.rollups import PLAYBACK_WATERMARK
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = PlaybackLog.__tablename__
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+RETENTION_ACTIONS = ("detach", "drop")
+# Serializes partition changes between workers
+_ADVISORY_LOCK_ID = 0x5344504C
+
+_BOUNDS = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+class Partition(NamedTuple):
+    """A monthly playback_logs partition covering played_at in [start, end)."""
+    name: str
+    start: date
+    end: date
+
+
+def add_months(month: date, months: int) -> date:
+    """Get the first day of the month `months` after the month of `month`."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """Whether playback_logs is a partitioned table (PostgreSQL only)."""
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"
+    ), {"table": PARENT_TABLE}).first())
+
+
+def list_partitions(connection: Connection) -> List[Partition]:
+    """List the monthly partitions attached to playback_logs, oldest first."""
+    rows = connection.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass)"
+    ), {"table": PARENT_TABLE}).all()
+
+    partitions = []
+    for name, bound in rows:
+        match = _BOUNDS.search(bound)
+        if match is None:
+            continue  # The default partition
+        start, end = (datetime.fromisoformat(value).date() for value in match.groups())
+        partitions.append(Partition(name, start, end))
+    return sorted(partitions, key=lambda p: p.start)
+
+
+def create_partition(connection: Connection, month: date) -> Partition:
+    """Create the partition for a month if it does not exist.
+
+    Logs of the month that were stored in the default partition before the
+    partition existed are moved into it; PostgreSQL refuses to create it
+    while the default partition holds them.
+    """
+    start = month.replace(day=1)
+    partition = Partition(partition_name(start), start, add_months(start, 1))
+    bounds = {"start": partition.start, "end": partition.end}
+    create = text(
+        f"CREATE TABLE IF NOT EXISTS {partition.name} PARTITION OF {PARENT_TABLE} "
+        f"FOR VALUES FROM ('{partition.start.isoformat()}') TO ('{partition.end.isoformat()}')"
+    )
+
+    has_default_rows = connection.execute(text(
+        f"SELECT 1 FROM {PARENT_TABLE} WHERE tableoid = to_regclass(:default) "
+        "AND played_at >= :start AND played_at < :end LIMIT 1"
+    ), {"default": DEFAULT_PARTITION, **bounds}).first()
+    if not has_default_rows:
+        connection.execute(create)
+        return partition
+
+    connection.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    connection.execute(create)
+    moved = connection.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        "WHERE played_at >= :start AND played_at < :end RETURNING *) "
+        f"INSERT INTO {PARENT_TABLE} SELECT * FROM moved"
+    ), bounds).rowcount
+    connection.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    logger.info("Moved %d logs from %s to %s", moved, DEFAULT_PARTITION, partition.name)
+    return partition
+
+
+def missing_partitions(connection: Connection, today: date, months_ahead: int) -> List[date]:
+    """List the months from this month to `months_ahead` months ahead that have no partition."""
+    existing = {p.start for p in list_partitions(connection)}
+    month = today.replace(day=1)
+    months = [add_months(month, offset) for offset in range(months_ahead + 1)]
+    return [start for start in months if start not in existing]
+
+
+def expired_partitions(connection: Connection, today: date, retention_months: int) -> List[Partition]:
+    """List the partitions that end on or before the retention boundary."""
+    boundary = add_months(today.replace(day=1), -retention_months)
+    return [p for p in list_partitions(connection) if p.end <= boundary]
+
+
+def has_unrolled_logs(connection: Connection, partition: Partition) -> bool:
+    """Whether a partition holds logs the rollup compactor has not counted yet."""
+    return bool(connection.execute(text(
+        f"SELECT 1 FROM {partition.name} WHERE created_at >= COALESCE("
+        "(SELECT rolled_up_until FROM rollup_watermarks WHERE name = :watermark), "
+        "'-infinity'::timestamp) LIMIT 1"
+    ), {"watermark": PLAYBACK_WATERMARK}).first())
+
+
+def remove_partition(connection: Connection, partition: Partition, action: str) -> None:
+    """Detach a partition from playback_logs, dropping it if action is "drop".
+
+    A detached partition keeps copies of the parent's foreign keys, which
+    would stop devices, media and campaigns with old logs from being
+    deleted, so they are dropped.
+    """
+    if action not in RETENTION_ACTIONS:
+        raise ValueError(f"Unknown retention action: {action}")
+    connection.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {partition.name}"))
+    if action == "drop":
+        connection.execute(text(f"DROP TABLE {partition.name}"))
+        return
+
+    foreign_keys = connection.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+    ), {"table": partition.name}).scalars().all()
+    for name in foreign_keys:
+        connection.execute(text(f'ALTER TABLE {partition.name} DROP CONSTRAINT "{name}"'))
+
+
+def _lock(connection: Connection) -> None:
+    connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": _ADVISORY_LOCK_ID})
+
+
+def maintain_partitions(
+    today: Optional[date] = None,
+    retention_months: Optional[int] = None,
+    action: Optional[str] = None,
+) -> dict:
+    """Create upcoming partitions and remove expired ones.
+
+    Retention defaults to the PLAYBACK_LOG_RETENTION_* settings. Expired
+    partitions are only removed once every log in them has been rolled up,
+    so reports keep their daily counts after the raw logs are gone. Each
+    partition is created or removed in its own transaction; one that fails
+    is logged and listed as failed without holding back the others. Does
+    nothing unless playback_logs is partitioned.
+    """
+    today = today or datetime.utcnow().date()
+    if retention_months is None:
+        retention_months = settings.playback_log_retention_months
+    action = action or settings.playback_log_retention_action
+    result = {"created": [], "removed": [], "skipped": [], "failed": []}
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            return result
+        months = missing_partitions(connection, today, settings.playback_log_partition_months_ahead)
+        expired = expired_partitions(connection, today, retention_months) if retention_months > 0 else []
+
+    for month in months:
+        try:
+            with engine.begin() as connection:
+                _lock(connection)
+                # Another worker may have created it meanwhile
+                if month not in {p.start for p in list_partitions(connection)}:
+                    result["created"].append(create_partition(connection, month).name)
+        except Exception:
+            logger.exception("Failed to create the playback log partition for %s", month)
+            result["failed"].append(partition_name(month))
+
+    for partition in expired:
+        try:
+            with engine.begin() as connection:
+                _lock(connection)
+                if partition not in list_partitions(connection):
+                    continue
+                if has_unrolled_logs(connection, partition):
+                    result["skipped"].append(partition.name)
+                    continue
+                remove_partition(connection, partition, action)
+                result["removed"].append(partition.name)
+        except Exception:
+            logger.exception("Failed to remove playback log partition %s", partition.name)
+            result["failed"].append(partition.name)
+
+    if result["created"] or result["removed"]:
+        logger.info("Playback log partitions: %s", result)
+    if result["skipped"]:
+        logger.warning("Expired partitions with logs not rolled up yet: %s", result["skipped"])
+    return result
+
+
+async def run_partition_maintenance() -> None:
+    """Maintain playback_logs partitions every PLAYBACK_LOG_PARTITION_INTERVAL_HOURS until cancelled."""
+    while True:
+        try:
+            await run_io(maintain_partitions)
+        except Exception:
+            logger.exception("Failed to maintain playback log partitions")
+        await asyncio.sleep(settings.playback_log_partition_interval_hours * 3600)
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.campaign import CampaignArea
+from app.utils.playlist_compiler import CompiledPlaylist, compile_playlist, get_url_epoch
+
+
+class PlaylistCache:
+    """In-process cache of compiled playlists keyed by (area_id, date, URL epoch).
+
+    Only one (date, epoch) period is kept per area, so entries are replaced
+    on the first poll after midnight or after the media URL epoch changes.
+    Entries are dropped by the admin routers whenever they change an input
+    of the area's playlist.
+
+    The last few compiled versions of each area are also remembered, so
+    devices can be sent the changes since the version they already have.
+    """
+
+    def __init__(self, history_size: int = 20):
+        self.history_size = history_size
+        self._entries: Dict[UUID, Tuple[Tuple[date, int], CompiledPlaylist]] = {}
+        self._generations: Dict[UUID, int] = {}
+        self._history: Dict[UUID, "OrderedDict[str, CompiledPlaylist]"] = {}
+        self._listeners: List[Callable[[List[UUID]], None]] = []
+        self._lock = threading.Lock()
+
+    def get_or_build(
+        self,
+        area_id: UUID,
+        period: Tuple[date, int],
+        build: Callable[[], CompiledPlaylist],
+    ) -> CompiledPlaylist:
+        """Return the cached playlist, building and storing it on a miss."""
+        with self._lock:
+            entry = self._entries.get(area_id)
+            generation = self._generations.get(area_id, 0)
+        if entry is not None and entry[0] == period:
+            return entry[1]
+
+        playlist = build()
+
+        with self._lock:
+            # Skip storing if the area was invalidated while building,
+            # otherwise a pre-change playlist could stick in the cache.
+            if self._generations.get(area_id, 0) == generation:
+                self._entries[area_id] = (period, playlist)
+                self._remember(area_id, playlist)
+        return playlist
+
+    def _remember(self, area_id: UUID, playlist: CompiledPlaylist) -> None:
+        history = self._history.setdefault(area_id, OrderedDict())
+        history[playlist.version] = playlist
+        history.move_to_end(playlist.version)
+        while len(history) > self.history_size:
+            history.popitem(last=False)
+
+    def get_version(self, area_id: UUID, version: str) -> Optional[CompiledPlaylist]:
+        """Get a previously compiled version of an area's playlist, if still known."""
+        with self._lock:
+            history = self._history.get(area_id)
+            if history is None:
+                return None
+            return history.get(version)
+
+    def add_listener(self, listener: Callable[[List[UUID]], None]) -> None:
+        """Register a callback receiving the area IDs of every invalidation."""
+        self._listeners.append(listener)
+
+    def invalidate_areas(self, area_ids: Iterable[UUID]) -> None:
+        """Drop cached playlists for the given areas."""
+        area_ids = list(area_ids)
+        with self._lock:
+            for area_id in area_ids:
+                self._generations[area_id] = self._generations.get(area_id, 0) + 1
+                self._entries.pop(area_id, None)
+        for listener in self._listeners:
+            listener(area_ids)
+
+    def clear(self) -> None:
+        """Drop all cached playlists."""
+        with self._lock:
+            for area_id in self._entries:
+                self._generations[area_id] = self._generations.get(area_id, 0) + 1
+            self._entries.clear()
+
+
+# Singleton cache instance
+_playlist_cache: Optional[PlaylistCache] = None
+
+
+def get_playlist_cache() -> PlaylistCache:
+    """Get the process-wide playlist cache."""
+    global _playlist_cache
+    if _playlist_cache is None:
+        _playlist_cache = PlaylistCache(history_size=settings.playlist_history_size)
+    return _playlist_cache
+
+
+def get_area_playlist(db: Session, area_id: UUID) -> CompiledPlaylist:
+    """Get today's compiled playlist for an area, compiling it on a cache miss."""
+    # Devices in the same area share one compiled playlist per day and URL epoch
+    today = date.today()
+    url_epoch = get_url_epoch(datetime.utcnow())
+    return get_playlist_cache().get_or_build(
+        area_id, (today, url_epoch), lambda: compile_playlist(db, area_id, today, url_epoch)
+    )
+
+
+def get_campaign_area_ids(db: Session, campaign_id: UUID) -> List[UUID]:
+    """Get the IDs of the areas a campaign is delivered to."""
+    rows = db.query(CampaignArea.area_id).filter(
+        CampaignArea.campaign_id == campaign_id
+    ).all()
+    return [row[0] for row in rows]
+
+
+def invalidate_areas(area_ids: Iterable[UUID]) -> None:
+    """Invalidate cached playlists for the given areas.
+
+    Call after the change has been committed.
+    """
+    get_playlist_cache().invalidate_areas(area_ids)
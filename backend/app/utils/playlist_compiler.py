@@ -0,0 +1,212 @@
+import hashlib
+from datetime import date, datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.campaign import Campaign, CampaignArea
+from app.models.media import Media, MediaType
+from app.models.media_rendition import MediaRendition
+from app.schemas.playlist import PlaylistResponse, PlaylistItem
+from app.utils.storage import get_file_url, get_storage
+
+_UNIX_EPOCH = datetime(1970, 1, 1)
+
+
+class Rendition(NamedTuple):
+    width: int
+    height: int
+    storage_path: str
+
+
+class PlaylistEntry(NamedTuple):
+    """A playlist item before its media URL has been generated."""
+    media_id: UUID
+    campaign_id: UUID
+    gcs_path: str
+    type: MediaType
+    duration_seconds: int
+    filename: str
+    content_hash: Optional[str] = None
+    renditions: Tuple[Rendition, ...] = ()  # Smallest first
+
+    def storage_path_for(self, width: Optional[int] = None, height: Optional[int] = None) -> str:
+        """Get the smallest rendition that fills a screen of the given size, else the original.
+
+        Players show media scaled to fit (object-fit: contain), so a
+        rendition is large enough once it covers the screen in either
+        dimension.
+        """
+        for rendition in self.renditions:
+            if (width is not None and rendition.width >= width) or (
+                height is not None and rendition.height >= height
+            ):
+                return rendition.storage_path
+        return self.gcs_path
+
+
+def get_url_epoch_seconds() -> Optional[int]:
+    """Get how long a media URL epoch lasts, or None if URLs do not expire.
+
+    A cached signed URL can already be SIGNED_URL_REFRESH_FRACTION of its
+    lifetime old when it is put in a playlist, so it has
+    lifetime * (1 - refresh_fraction) left. Epochs last half of that; the
+    other half covers devices that keep an epoch's playlist until their
+    next poll after it ends.
+    """
+    lifetime = get_storage().url_lifetime
+    if lifetime is None:
+        return None
+    remaining = lifetime.total_seconds() * (1 - settings.signed_url_refresh_fraction)
+    return max(int(remaining / 2), 1)
+
+
+def get_url_epoch(now: datetime) -> int:
+    """Get the media URL epoch at a UTC time.
+
+    The epoch is part of the playlist version, so devices are moved to
+    fresh URLs before the ones they have expire.
+    """
+    period = get_url_epoch_seconds()
+    if period is None:
+        return 0
+    return int((now - _UNIX_EPOCH).total_seconds()) // period
+
+
+class CompiledPlaylist:
+    """Playlist entries for an area together with their content version.
+
+    The version is known as soon as the entries are, so unchanged checks do
+    not need URLs. A response is rendered on first use for each choice of
+    renditions (which depends on the screen size) and reused.
+    """
+
+    def __init__(self, entries: List[PlaylistEntry], url_epoch: int = 0):
+        self.entries = entries
+        self.url_epoch = url_epoch
+        self.version = self._compute_version(entries, url_epoch)
+        self._responses: Dict[Tuple[str, ...], PlaylistResponse] = {}
+
+    @staticmethod
+    def _compute_version(entries: List[PlaylistEntry], url_epoch: int) -> str:
+        # Content-based hash so the version stays stable while nothing changes
+        content_data = f"{url_epoch}|" + "-".join(
+            f"{e.media_id}:{e.campaign_id}:{e.type.value}:{e.duration_seconds}:{e.filename}:{e.gcs_path}"
+            + "".join(f":{r.storage_path}" for r in e.renditions)
+            for e in entries
+        )
+        return hashlib.md5(content_data.encode()).hexdigest()[:8]
+
+    def _storage_paths(self, width: Optional[int], height: Optional[int]) -> Tuple[str, ...]:
+        return tuple(e.storage_path_for(width, height) for e in self.entries)
+
+    def is_rendered(self, width: Optional[int] = None, height: Optional[int] = None) -> bool:
+        return self._storage_paths(width, height) in self._responses
+
+    def render(self, width: Optional[int] = None, height: Optional[int] = None) -> PlaylistResponse:
+        """Get the playlist response with media URLs for a screen of the given size."""
+        storage_paths = self._storage_paths(width, height)
+        response = self._responses.get(storage_paths)
+        if response is None:
+            response = PlaylistResponse(
+                version=self.version,
+                items=[
+                    PlaylistItem(
+                        media_id=e.media_id,
+                        campaign_id=e.campaign_id,
+                        url=get_file_url(storage_path),
+                        type=e.type,
+                        duration_seconds=e.duration_seconds,
+                        filename=e.filename,
+                        content_hash=e.content_hash,
+                    )
+                    for e, storage_path in zip(self.entries, storage_paths)
+                ],
+                generated_at=datetime.utcnow(),
+            )
+            self._responses[storage_paths] = response
+        return response
+
+
+def playlist_query(area_id: UUID, today: date):
+    """Build the query returning an area's playlist rows in playback order.
+
+    Campaigns are ordered by weight (descending), media within each campaign
+    by sort_order (ascending). Campaign ID breaks weight ties so media of one
+    campaign always stay together.
+    """
+    area_campaign_ids = select(CampaignArea.campaign_id).where(
+        CampaignArea.area_id == area_id
+    )
+
+    return select(
+        Media.id,
+        Media.campaign_id,
+        Media.gcs_path,
+        Media.type,
+        Media.duration_seconds,
+        Media.filename,
+        Media.content_hash,
+    ).join(
+        Campaign, Campaign.id == Media.campaign_id
+    ).where(
+        Campaign.id.in_(area_campaign_ids),
+        Campaign.is_active == True,
+        Campaign.start_date <= today,
+        Campaign.end_date >= today,
+    ).order_by(
+        Campaign.weight.desc(),
+        Campaign.id,
+        Media.sort_order,
+        Media.id,
+    )
+
+
+def iter_playlist_entries(db: Session, area_id: UUID, today: date) -> Iterator[PlaylistEntry]:
+    """Stream an area's playlist entries from a single query."""
+    for row in db.execute(playlist_query(area_id, today)):
+        yield PlaylistEntry(*row)
+
+
+def attach_renditions(db: Session, entries: List[PlaylistEntry]) -> List[PlaylistEntry]:
+    """Add the image renditions of the entries' media with one query."""
+    content_hashes = {e.content_hash for e in entries if e.content_hash is not None}
+    if not content_hashes:
+        return entries
+
+    renditions: Dict[str, List[Rendition]] = {}
+    for content_hash, width, height, storage_path in db.execute(
+        select(
+            MediaRendition.content_hash,
+            MediaRendition.width,
+            MediaRendition.height,
+            MediaRendition.storage_path,
+        ).where(
+            MediaRendition.content_hash.in_(content_hashes)
+        ).order_by(MediaRendition.width)
+    ):
+        renditions.setdefault(content_hash, []).append(Rendition(width, height, storage_path))
+
+    return [
+        e._replace(renditions=tuple(renditions[e.content_hash])) if e.content_hash in renditions else e
+        for e in entries
+    ]
+
+
+def compile_playlist(
+    db: Session,
+    area_id: UUID,
+    today: date,
+    url_epoch: Optional[int] = None,
+) -> CompiledPlaylist:
+    """Compile the playlist delivered to devices in an area on the given day.
+
+    url_epoch defaults to the current media URL epoch.
+    """
+    if url_epoch is None:
+        url_epoch = get_url_epoch(datetime.utcnow())
+    entries = attach_renditions(db, list(iter_playlist_entries(db, area_id, today)))
+    return CompiledPlaylist(entries, url_epoch=url_epoch)
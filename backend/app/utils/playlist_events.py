@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+from uuid import UUID
+
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal
+from app.utils.playlist_cache import get_playlist_cache, get_area_playlist
+from app.utils.playlist_compiler import get_url_epoch_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class PlaylistEventBroker:
+    """Notifies connected players when their area's playlist changes.
+
+    Each subscriber gets a one-slot queue holding the latest version, so a
+    slow client only ever sees the newest change. When areas are invalidated
+    the new playlist is compiled once per area, and only areas that have
+    subscribers are compiled.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[UUID, Set[asyncio.Queue]] = {}
+        self._versions: Dict[UUID, str] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self, area_id: UUID, version: str) -> asyncio.Queue:
+        """Subscribe to an area that is currently at the given version."""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.setdefault(area_id, set()).add(queue)
+        self._versions.setdefault(area_id, version)
+        return queue
+
+    def unsubscribe(self, area_id: UUID, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(area_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[area_id]
+            self._versions.pop(area_id, None)
+
+    def notify_areas(self, area_ids: List[UUID]) -> None:
+        """Schedule change announcements for areas; safe to call from any thread."""
+        if self._loop is None or not any(a in self._subscribers for a in area_ids):
+            return
+        self._loop.call_soon_threadsafe(
+            lambda: self._loop.create_task(self.announce(area_ids))
+        )
+
+    async def announce(self, area_ids: Iterable[UUID]) -> None:
+        """Compile the current playlist of each area and push changed versions."""
+        for area_id in area_ids:
+            if area_id not in self._subscribers:
+                continue
+            try:
+                version = await self.current_version(area_id)
+            except Exception:
+                logger.exception("Failed to compile playlist for area %s", area_id)
+                continue
+            if self._versions.get(area_id) == version:
+                continue
+            self._versions[area_id] = version
+            for queue in self._subscribers.get(area_id, ()):
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(version)
+
+    async def current_version(self, area_id: UUID) -> str:
+        """Get the current playlist version of an area without blocking the loop."""
+        return await run_in_threadpool(_current_version, area_id)
+
+    def subscribed_areas(self) -> List[UUID]:
+        return list(self._subscribers)
+
+    def stats(self) -> dict:
+        """Get subscription counters."""
+        return {
+            "areas": len(self._subscribers),
+            "connections": sum(len(s) for s in self._subscribers.values()),
+        }
+
+
+def _current_version(area_id: UUID) -> str:
+    db = SessionLocal()
+    try:
+        return get_area_playlist(db, area_id).version
+    finally:
+        db.close()
+
+
+# Singleton broker instance
+_playlist_broker: Optional[PlaylistEventBroker] = None
+
+
+def get_playlist_broker() -> PlaylistEventBroker:
+    """Get the process-wide playlist event broker."""
+    global _playlist_broker
+    if _playlist_broker is None:
+        _playlist_broker = PlaylistEventBroker()
+        get_playlist_cache().add_listener(_playlist_broker.notify_areas)
+    return _playlist_broker
+
+
+def seconds_until_rollover(now: datetime, timestamp: float) -> float:
+    """Get the time until playlists next change without an admin edit.
+
+    That is local midnight (now), when date-bound campaigns start and end,
+    or the next media URL epoch (timestamp is the Unix time), when every
+    playlist version changes so devices get fresh signed URLs.
+    """
+    next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    delay = (next_midnight - now).total_seconds()
+    period = get_url_epoch_seconds()
+    if period is not None:
+        delay = min(delay, period - timestamp % period)
+    return delay
+
+
+async def run_playlist_rollover() -> None:
+    """Re-announce subscribed areas after midnight and at every media URL epoch."""
+    broker = get_playlist_broker()
+    while True:
+        await asyncio.sleep(seconds_until_rollover(datetime.now(), time.time()) + 1)
+        await broker.announce(broker.subscribed_areas())
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.device import Device, DeviceStatus
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    """Records when devices were last seen and writes it back in batches.
+
+    Heartbeats and playlist polls only touch memory; flush() applies the
+    latest timestamp per device with one bulk UPDATE. The tracker also
+    remembers each known device's area, which doubles as the existence check
+    for incoming device IDs.
+    """
+
+    def __init__(self):
+        self._device_areas: Dict[UUID, UUID] = {}
+        self._last_seen: Dict[UUID, datetime] = {}
+        self._lock = threading.Lock()
+        self.flush_count = 0
+        self.flushed_devices = 0
+        self.last_flush_seconds = 0.0
+
+    def get_area_id(self, db: Session, device_id: UUID) -> Optional[UUID]:
+        """Get a device's area ID, or None if the device does not exist."""
+        with self._lock:
+            area_id = self._device_areas.get(device_id)
+        if area_id is not None:
+            return area_id
+
+        row = db.query(Device.area_id).filter(Device.id == device_id).first()
+        if row is None:
+            return None
+
+        with self._lock:
+            self._device_areas[device_id] = row[0]
+        return row[0]
+
+    def peek_area_id(self, device_id: UUID) -> Optional[UUID]:
+        """Get a device's remembered area ID without querying the database."""
+        with self._lock:
+            return self._device_areas.get(device_id)
+
+    def touch(self, device_id: UUID, seen_at: Optional[datetime] = None) -> None:
+        """Record that a device was seen."""
+        seen_at = seen_at or datetime.utcnow()
+        with self._lock:
+            previous = self._last_seen.get(device_id)
+            if previous is None or previous < seen_at:
+                self._last_seen[device_id] = seen_at
+
+    def move(self, device_id: UUID, area_id: UUID) -> None:
+        """Update the remembered area of a device."""
+        with self._lock:
+            if device_id in self._device_areas:
+                self._device_areas[device_id] = area_id
+
+    def forget(self, device_ids: Iterable[UUID]) -> None:
+        """Forget deleted devices."""
+        with self._lock:
+            for device_id in device_ids:
+                self._device_areas.pop(device_id, None)
+                self._last_seen.pop(device_id, None)
+
+    def forget_areas(self, area_ids: Iterable[UUID]) -> None:
+        """Forget all devices of deleted areas."""
+        area_ids = set(area_ids)
+        with self._lock:
+            device_ids = [d for d, a in self._device_areas.items() if a in area_ids]
+        self.forget(device_ids)
+
+    def flush(self, db: Session) -> int:
+        """Write pending last-seen timestamps to the devices table."""
+        with self._lock:
+            pending = self._last_seen
+            self._last_seen = {}
+        if not pending:
+            return 0
+
+        started = time.perf_counter()
+        # Devices deleted since they were seen are filtered out here so the
+        # bulk UPDATE only targets existing rows.
+        existing = {
+            row[0]
+            for row in db.query(Device.id).filter(Device.id.in_(list(pending.keys()))).all()
+        }
+        rows = [
+            {"id": device_id, "status": DeviceStatus.ONLINE, "last_sync_at": seen_at}
+            for device_id, seen_at in pending.items()
+            if device_id in existing
+        ]
+        try:
+            if rows:
+                db.execute(update(Device), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the timestamps back so the next flush retries them
+            for device_id, seen_at in pending.items():
+                self.touch(device_id, seen_at)
+            raise
+
+        with self._lock:
+            self.flush_count += 1
+            self.flushed_devices += len(rows)
+            self.last_flush_seconds = time.perf_counter() - started
+        return len(rows)
+
+    def stats(self) -> dict:
+        """Get tracker counters."""
+        with self._lock:
+            return {
+                "known_devices": len(self._device_areas),
+                "pending_devices": len(self._last_seen),
+                "flush_count": self.flush_count,
+                "flushed_devices": self.flushed_devices,
+                "last_flush_seconds": self.last_flush_seconds,
+            }
+
+
+# Singleton tracker instance
+_presence_tracker: Optional[PresenceTracker] = None
+
+
+def get_presence_tracker() -> PresenceTracker:
+    """Get the process-wide presence tracker."""
+    global _presence_tracker
+    if _presence_tracker is None:
+        _presence_tracker = PresenceTracker()
+    return _presence_tracker
+
+
+def flush_presence() -> int:
+    """Flush pending presence updates using a new session."""
+    db = SessionLocal()
+    try:
+        return get_presence_tracker().flush(db)
+    finally:
+        db.close()
+
+
+async def run_presence_flusher() -> None:
+    """Flush presence updates every PRESENCE_FLUSH_INTERVAL_SECONDS until cancelled."""
+    while True:
+        await asyncio.sleep(settings.presence_flush_interval_seconds)
+        try:
+            await run_in_threadpool(flush_presence)
+        except Exception:
+            logger.exception("Failed to flush device presence")
@@ -0,0 +1,118 @@
+import io
+import logging
+import uuid
+from typing import List, Sequence, Tuple
+
+from PIL import Image, ImageOps
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.media_blob import MediaBlob
+from app.models.media_rendition import MediaRendition
+from app.utils.executors import run_cpu, run_io
+from app.utils.media_blobs import BLOB_PREFIX, lock_blob, set_lock_timeout
+from app.utils.storage import read_file, upload_file, delete_file
+
+logger = logging.getLogger(__name__)
+
+# GIFs are left alone so animations keep playing
+RENDITION_SOURCE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+RENDITION_FORMATS = {
+    "webp": ("WEBP", "webp", "image/webp"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+}
+
+
+def render_image_renditions(
+    data: bytes,
+    sizes: Sequence[int],
+    image_format: str,
+    quality: int,
+) -> List[Tuple[int, int, bytes]]:
+    """Resize an image to fit each longest-edge size below the original's.
+
+    Runs in the CPU process pool. Returns (width, height, encoded image) in
+    ascending size, leaving out renditions that would not be smaller than
+    the original file.
+    """
+    pil_format = RENDITION_FORMATS[image_format][0]
+    renditions = []
+    with Image.open(io.BytesIO(data)) as source:
+        if getattr(source, "is_animated", False):
+            return []
+        image = ImageOps.exif_transpose(source)
+        if pil_format == "JPEG" or image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha and pil_format != "JPEG" else "RGB")
+
+        for size in sorted(set(sizes)):
+            if size >= max(image.size):
+                break
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, format=pil_format, quality=quality)
+            encoded = buffer.getvalue()
+            if len(encoded) < len(data):
+                renditions.append((resized.width, resized.height, encoded))
+    return renditions
+
+
+async def create_renditions(db: Session, blob: MediaBlob) -> List[MediaRendition]:
+    """Generate display renditions for an image blob that has none yet, and commit.
+
+    The image is decoded and resized in the CPU pool at the configured
+    IMAGE_RENDITION_SIZES and uploaded without holding the blob's row lock.
+    The renditions are then added under the lock unless a concurrent upload
+    of the same image added its own first, or the blob was released
+    meanwhile; the unused files are deleted. A failure is logged and leaves
+    the blob without renditions, so players get the original.
+    """
+    if blob.mime_type not in RENDITION_SOURCE_TYPES or blob.renditions:
+        return blob.renditions
+
+    image_format = settings.image_rendition_format.lower()
+    _, extension, mime_type = RENDITION_FORMATS[image_format]
+    content_hash = blob.content_hash
+    # Paths are unique per attempt so discarding these never deletes files
+    # of renditions another request stored
+    path_prefix = f"{BLOB_PREFIX}/{content_hash[:2]}/{content_hash}-{uuid.uuid4().hex[:8]}"
+    renditions: List[MediaRendition] = []
+    locked = None
+    try:
+        data = await run_io(read_file, blob.storage_path)
+        rendered = await run_cpu(
+            render_image_renditions,
+            data,
+            settings.image_rendition_sizes,
+            image_format,
+            settings.image_rendition_quality,
+        )
+        for width, height, encoded in rendered:
+            path = f"{path_prefix}-{width}x{height}.{extension}"
+            storage_path = await run_io(upload_file, encoded, path, mime_type)
+            renditions.append(MediaRendition(
+                width=width,
+                height=height,
+                storage_path=storage_path,
+                file_size=len(encoded),
+                mime_type=mime_type,
+            ))
+
+        set_lock_timeout(db)
+        locked = lock_blob(db, content_hash)
+        if locked is not None and not locked.renditions:
+            locked.renditions.extend(renditions)
+            unused = []
+        else:
+            unused = renditions
+        db.commit()
+    except Exception:
+        logger.exception("Failed to create renditions for blob %s", content_hash)
+        db.rollback()
+        locked = None
+        unused = renditions
+
+    for rendition in unused:
+        await run_io(delete_file, rendition.storage_path)
+    return [] if locked is None else locked.renditions
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+ReportKey = Tuple[str, Tuple[Hashable, ...]]
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value: Any, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class ReportCache:
+    """In-process cache of report results keyed by endpoint and parameters.
+
+    Ranges that include today can still change with every uploaded log and
+    are kept for `ttl` seconds; ranges that ended before today only change
+    with late uploads and are kept for `historical_ttl` seconds. For
+    `stale_seconds` after that an expired result is still returned while
+    one background task recomputes it. Concurrent misses for the same key
+    share one computation. invalidate() drops everything, e.g. after a
+    store or campaign is renamed.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, historical_ttl: float, stale_seconds: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.historical_ttl = historical_ttl
+        self.stale_seconds = stale_seconds
+        self._entries: "OrderedDict[ReportKey, _Entry]" = OrderedDict()
+        self._pending: Dict[ReportKey, "asyncio.Future"] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        # endpoint -> [hits, stale hits, misses]
+        self._counts: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])
+        self.refreshes = 0
+        self.failed_refreshes = 0
+        self.evictions = 0
+
+    def ttl_for(self, end_date: date, today: date) -> float:
+        return self.ttl if end_date >= today else self.historical_ttl
+
+    async def get_or_compute(
+        self,
+        endpoint: str,
+        params: Tuple[Hashable, ...],
+        end_date: date,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Return the cached report, computing it on a miss and refreshing it when stale."""
+        key = (endpoint, params)
+        now = time.monotonic()
+        with self._lock:
+            counts = self._counts[endpoint]
+            entry = self._entries.get(key)
+            if entry is not None and now < entry.fresh_until:
+                self._entries.move_to_end(key)
+                counts[0] += 1
+                return entry.value
+            stale = entry is not None and now < entry.stale_until
+            if stale:
+                self._entries.move_to_end(key)
+                counts[1] += 1
+            else:
+                counts[2] += 1
+
+        pending = self._pending.get(key)
+        if stale:
+            if pending is None:
+                with self._lock:
+                    self.refreshes += 1
+                self._start(key, end_date, compute).add_done_callback(self._log_failed_refresh)
+            return entry.value
+
+        if pending is None:
+            pending = self._start(key, end_date, compute)
+        # A cancelled request must not cancel the computation others wait for
+        return await asyncio.shield(pending)
+
+    def _start(self, key: ReportKey, end_date: date, compute: Callable[[], Awaitable[Any]]) -> "asyncio.Future":
+        # Read the generation now: the task may only start after an invalidation
+        task = asyncio.ensure_future(self._compute(key, end_date, compute, self._generation))
+        self._pending[key] = task
+        return task
+
+    async def _compute(
+        self,
+        key: ReportKey,
+        end_date: date,
+        compute: Callable[[], Awaitable[Any]],
+        generation: int,
+    ) -> Any:
+        try:
+            value = await compute()
+        finally:
+            self._pending.pop(key, None)
+
+        now = time.monotonic()
+        fresh_until = now + self.ttl_for(end_date, date.today())
+        with self._lock:
+            # Skip storing if invalidated while computing, otherwise a result
+            # with pre-change names could stick in the cache.
+            if generation == self._generation:
+                self._entries[key] = _Entry(value, fresh_until, fresh_until + self.stale_seconds)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def _log_failed_refresh(self, task: "asyncio.Future") -> None:
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            with self._lock:
+                self.failed_refreshes += 1
+            logger.error("Failed to refresh cached report", exc_info=task.exception())
+
+    def invalidate(self) -> None:
+        """Drop all cached reports."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Get cache counters and hit ratios (stale hits count as hits)."""
+        with self._lock:
+            endpoints = {}
+            total = [0, 0, 0]
+            for endpoint, (hits, stale_hits, misses) in sorted(self._counts.items()):
+                lookups = hits + stale_hits + misses
+                endpoints[endpoint] = {
+                    "hits": hits,
+                    "stale_hits": stale_hits,
+                    "misses": misses,
+                    "hit_ratio": (hits + stale_hits) / lookups if lookups else 0.0,
+                }
+                total = [total[0] + hits, total[1] + stale_hits, total[2] + misses]
+            lookups = sum(total)
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": total[0],
+                "stale_hits": total[1],
+                "misses": total[2],
+                "hit_ratio": (total[0] + total[1]) / lookups if lookups else 0.0,
+                "refreshes": self.refreshes,
+                "failed_refreshes": self.failed_refreshes,
+                "evictions": self.evictions,
+                "endpoints": endpoints,
+            }
+
+
+# Singleton cache instance
+_report_cache: Optional[ReportCache] = None
+
+
+def get_report_cache() -> ReportCache:
+    """Get the process-wide report cache."""
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache(
+            max_entries=settings.report_cache_max_entries,
+            ttl=settings.report_cache_ttl_seconds,
+            historical_ttl=settings.report_cache_historical_ttl_seconds,
+            stale_seconds=settings.report_cache_stale_seconds,
+        )
+    return _report_cache
+
+
+async def cached_report(
+    endpoint: str,
+    params: Tuple[Hashable, ...],
+    end_date: date,
+    build: Callable[[AsyncSession], Awaitable[Any]],
+) -> Any:
+    """Get a report from the cache, building it with a new session when needed.
+
+    params must hold every argument the report depends on, with defaults
+    already applied, so equivalent requests share one entry.
+    """
+    async def compute():
+        async with AsyncSessionLocal() as db:
+            return await build(db)
+
+    return await get_report_cache().get_or_compute(endpoint, params, end_date, compute)
+
+
+def invalidate_reports() -> None:
+    """Drop cached reports; call after committing a change to names or inventory."""
+    get_report_cache().invalidate()
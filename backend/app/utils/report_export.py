@@ -0,0 +1,236 @@
+import codecs
+import csv
+import io
+from datetime import date, datetime
+from typing import AsyncIterator, Iterable, List, NamedTuple, Optional, Sequence
+from uuid import UUID
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import DateTime, Integer, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.area import Area
+from app.models.campaign import Campaign
+from app.models.device import Device
+from app.models.media import Media
+from app.models.playback_log import PlaybackLog
+from app.models.store import Store
+from app.utils.executors import run_io
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+class ExportColumn(NamedTuple):
+    name: str
+    kind: str  # "string", "int" or "timestamp"
+
+
+def statement_columns(stmt) -> List[ExportColumn]:
+    """Get the export columns of a select statement from its column types."""
+    columns = []
+    for column in stmt.selected_columns:
+        if isinstance(column.type, DateTime):
+            kind = "timestamp"
+        elif isinstance(column.type, Integer):
+            kind = "int"
+        else:
+            kind = "string"
+        columns.append(ExportColumn(column.name, kind))
+    return columns
+
+
+def playback_log_export_query(
+    start_date: date,
+    end_date: date,
+    store_id: Optional[UUID] = None,
+    area_id: Optional[UUID] = None,
+    campaign_id: Optional[UUID] = None,
+):
+    """Build the query for raw playback logs joined with their names (proof of play).
+
+    Rows are not sorted: sorting would make PostgreSQL read the whole range
+    before sending the first row.
+    """
+    stmt = select(
+        PlaybackLog.id.label("log_id"),
+        PlaybackLog.event_id,
+        PlaybackLog.played_at,
+        Store.code.label("store_code"),
+        Store.name.label("store_name"),
+        Area.code.label("area_code"),
+        Area.name.label("area_name"),
+        PlaybackLog.device_id,
+        Device.device_code,
+        Device.name.label("device_name"),
+        PlaybackLog.campaign_id,
+        Campaign.name.label("campaign_name"),
+        PlaybackLog.media_id,
+        Media.filename.label("media_filename"),
+    ).join(
+        Device, PlaybackLog.device_id == Device.id
+    ).join(
+        Area, Device.area_id == Area.id
+    ).join(
+        Store, Area.store_id == Store.id
+    ).join(
+        Campaign, PlaybackLog.campaign_id == Campaign.id
+    ).join(
+        Media, PlaybackLog.media_id == Media.id
+    ).where(
+        PlaybackLog.played_at >= datetime.combine(start_date, datetime.min.time()),
+        PlaybackLog.played_at <= datetime.combine(end_date, datetime.max.time()),
+    )
+
+    if store_id:
+        stmt = stmt.where(Store.id == store_id)
+    if area_id:
+        stmt = stmt.where(Area.id == area_id)
+    if campaign_id:
+        stmt = stmt.where(PlaybackLog.campaign_id == campaign_id)
+    return stmt
+
+
+async def stream_query(db: AsyncSession, stmt) -> AsyncIterator[Sequence]:
+    """Run a query with a server-side cursor, yielding REPORT_EXPORT_CHUNK_ROWS rows at a time."""
+    result = await db.stream(stmt.execution_options(yield_per=settings.report_export_chunk_rows))
+    async for rows in result.partitions():
+        yield rows
+
+
+async def stream_statement(stmt) -> AsyncIterator[Sequence]:
+    """Like stream_query, with a session of its own that lives as long as the stream.
+
+    A request's session dependency is closed before a StreamingResponse body
+    is sent, so exports cannot use it.
+    """
+    async with AsyncSessionLocal() as db:
+        async for rows in stream_query(db, stmt):
+            yield rows
+
+
+async def in_chunks(rows: Sequence) -> AsyncIterator[Sequence]:
+    """Split rows that are already in memory into export chunks."""
+    size = settings.report_export_chunk_rows
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _encode_csv(rows: Iterable[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def csv_chunks(columns: List[ExportColumn], chunks: AsyncIterator[Sequence]) -> AsyncIterator[bytes]:
+    """Encode rows as CSV, one output chunk per row chunk.
+
+    Chunks are encoded in the IO pool; a chunk of REPORT_EXPORT_CHUNK_ROWS
+    rows takes long enough to delay other requests on the event loop.
+    """
+    # BOM so Excel opens Japanese names as UTF-8
+    yield codecs.BOM_UTF8 + _encode_csv([[column.name for column in columns]])
+    async for rows in chunks:
+        yield await run_io(_encode_csv, rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain()."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # The Parquet writer records column chunk offsets from tell()
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_schema(pa, columns: List[ExportColumn]):
+    types = {
+        "string": pa.string(),
+        "int": pa.int64(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(column.name, types[column.kind]) for column in columns])
+
+
+def _arrow_values(kind: str, values: Iterable) -> list:
+    if kind == "string":
+        return [None if value is None else str(value) for value in values]
+    return list(values)
+
+
+def parquet_chunks(columns: List[ExportColumn], chunks: AsyncIterator[Sequence]) -> AsyncIterator[bytes]:
+    """Encode rows as Parquet, one row group per row chunk.
+
+    pyarrow is imported here rather than in the generator, so a missing
+    package fails the request before the response starts. Row groups are
+    encoded and compressed in the IO pool, like CSV chunks.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(pa, columns)
+
+    def write_row_group(writer, sink: _ChunkSink, rows: Sequence) -> bytes:
+        values = list(zip(*rows))
+        writer.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(_arrow_values(column.kind, values[i]), type=schema.field(i).type)
+             for i, column in enumerate(columns)],
+            schema=schema,
+        ))
+        return sink.drain()
+
+    async def encode():
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        async for rows in chunks:
+            if rows:
+                yield await run_io(write_row_group, writer, sink, rows)
+        # Writes the footer. A writer left open because the client went away
+        # only holds the in-memory sink and is closed when collected; closing
+        # it here could race with a row group still being written.
+        await run_io(writer.close)
+        yield sink.drain()
+
+    return encode()
+
+
+def export_response(
+    columns: List[ExportColumn],
+    chunks: AsyncIterator[Sequence],
+    format: str,
+    filename: str,
+) -> StreamingResponse:
+    """Stream rows as a CSV or Parquet download."""
+    media_type, extension = EXPORT_FORMATS[format]
+    encode = parquet_chunks if format == "parquet" else csv_chunks
+    return StreamingResponse(
+        encode(columns, chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'},
+    )
@@ -0,0 +1,405 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import LargeBinary, cast, func, null, select, text, union_all
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.area import Area
+from app.models.device import Device
+from app.models.playback_log import PlaybackLog, utcnow
+from app.models.playback_rollup import (
+    PlaybackHourly, PlaybackDaily, CampaignReachDaily, StoreReachDaily, RollupWatermark,
+)
+from app.utils import hll
+from app.utils.executors import run_io
+
+logger = logging.getLogger(__name__)
+
+PLAYBACK_WATERMARK = "playback_logs"
+UPSERT_BATCH_ROWS = 5000
+# Reach sketch rows (4 KiB each) merged at a time
+REACH_CHUNK_ROWS = 1000
+# Tail start while nothing has been rolled up yet
+_BEGINNING = datetime(1970, 1, 1)
+
+
+def _truncate_to_hour(dialect_name: str, column):
+    if dialect_name == "postgresql":
+        return func.date_trunc("hour", column)
+    return func.strftime("%Y-%m-%d %H:00:00", column)
+
+
+def _upsert(db: Session, table, key_columns: List[str], rows: List[dict], update) -> None:
+    """Insert rows, updating existing ones with the columns update(stmt) returns."""
+    dialect_name = db.connection().dialect.name
+    insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    for i in range(0, len(rows), UPSERT_BATCH_ROWS):
+        stmt = insert(table).values(rows[i:i + UPSERT_BATCH_ROWS])
+        db.execute(stmt.on_conflict_do_update(index_elements=key_columns, set_=update(stmt)))
+
+
+def _add_counts(db: Session, table, key_columns: List[str], rows: List[dict]) -> None:
+    """Insert rollup rows, adding play_count to rows that already exist."""
+    _upsert(db, table, key_columns, rows, lambda stmt: {
+        "play_count": table.c.play_count + stmt.excluded.play_count,
+    })
+
+
+def _merge_sketches(db: Session, model, key_name: str, devices: Iterable[Tuple[Tuple[date, UUID], UUID]]) -> None:
+    """Add devices to the daily reach sketches of ((day, key_id), device_id) pairs."""
+    devices = list(devices)
+    if not devices:
+        return
+    keys = sorted({key for key, _ in devices})
+    position = {key: i for i, key in enumerate(keys)}
+    sketches = hll.empty(len(keys))
+    hll.add_hashes(
+        sketches,
+        np.array([position[key] for key, _ in devices], dtype=np.intp),
+        hll.hash_uuids([device_id for _, device_id in devices]),
+    )
+
+    key_column = getattr(model, key_name)
+    stored = db.execute(select(model.day, key_column, model.sketch).where(
+        model.day.in_({day for day, _ in keys}),
+        key_column.in_({key_id for _, key_id in keys}),
+    )).all()
+    for day, key_id, sketch in stored:
+        i = position.get((day, key_id))
+        if i is not None:
+            np.maximum(sketches[i], hll.from_bytes(sketch), out=sketches[i])
+
+    _upsert(db, model.__table__, ["day", key_name], [
+        {"day": day, key_name: key_id, "sketch": hll.to_bytes(sketches[i])}
+        for (day, key_id), i in position.items()
+    ], lambda stmt: {"sketch": stmt.excluded.sketch})
+
+
+def add_reach(db: Session, plays: Iterable[Tuple[date, UUID, UUID]]) -> None:
+    """Add (day, device_id, campaign_id) plays to the campaign and store reach sketches.
+
+    Sketches are read, merged and written back, so callers must hold the
+    playback watermark lock like the compactor does.
+    """
+    plays = list(plays)
+    if not plays:
+        return
+    stores = dict(db.execute(
+        select(Device.id, Area.store_id).join(Area, Device.area_id == Area.id).where(
+            Device.id.in_({device_id for _, device_id, _ in plays})
+        )
+    ).all())
+    _merge_sketches(db, CampaignReachDaily, "campaign_id", (
+        ((day, campaign_id), device_id) for day, device_id, campaign_id in plays
+    ))
+    _merge_sketches(db, StoreReachDaily, "store_id", {
+        ((day, stores[device_id]), device_id) for day, device_id, _ in plays if device_id in stores
+    })
+
+
+class PlaybackRollupCompactor:
+    """Adds new playback logs to the hourly and daily rollup tables.
+
+    Logs are picked up by creation time, not play time, so logs uploaded
+    days late are still counted. Each run rolls up the logs created between
+    the watermark and PLAYBACK_ROLLUP_LAG_SECONDS ago, adds their counts to
+    the rollups and their devices to the daily reach sketches, and advances
+    the watermark in the same transaction. The
+    watermark row stays locked meanwhile, so with several workers only one
+    compacts at a time and no log is counted twice.
+
+    created_at is the start of the inserting transaction on the database
+    clock, so on PostgreSQL the cutoff is also kept at or before the start
+    of the oldest open transaction: logs it has not committed yet cannot be
+    stamped below the watermark, however long it runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.rolled_up_logs = 0
+        self.rolled_up_until: Optional[datetime] = None
+        self.last_run_seconds = 0.0
+
+    def _ensure_watermark(self, db: Session) -> None:
+        if db.get(RollupWatermark, PLAYBACK_WATERMARK) is not None:
+            return
+        db.add(RollupWatermark(name=PLAYBACK_WATERMARK))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+
+    def compact(self, db: Session) -> int:
+        """Roll up logs until the watermark reaches the lag cutoff; returns the logs rolled up."""
+        started = time.perf_counter()
+        self._ensure_watermark(db)
+        cutoff = self._cutoff(db)
+        rolled_up = 0
+        while True:
+            logs = self._compact_window(db, cutoff)
+            if logs is None:
+                break
+            rolled_up += logs
+
+        with self._lock:
+            self.runs += 1
+            self.rolled_up_logs += rolled_up
+            self.last_run_seconds = time.perf_counter() - started
+        return rolled_up
+
+    def _cutoff(self, db: Session) -> datetime:
+        """Get the creation time below which no more logs can be committed."""
+        cutoff = db.scalar(select(utcnow())) - timedelta(seconds=settings.playback_rollup_lag_seconds)
+        if db.connection().dialect.name == "postgresql":
+            # Only transactions of the same role (or with pg_read_all_stats)
+            # show their start time here
+            oldest = db.scalar(text(
+                "SELECT timezone('utc', min(xact_start)) FROM pg_stat_activity "
+                "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+            ))
+            if oldest is not None and oldest < cutoff:
+                cutoff = oldest
+        db.rollback()
+        return cutoff
+
+    def _compact_window(self, db: Session, cutoff: datetime) -> Optional[int]:
+        """Roll up one window of at most PLAYBACK_ROLLUP_MAX_WINDOW_HOURS; None when there is nothing to do."""
+        watermark = db.query(RollupWatermark).filter(
+            RollupWatermark.name == PLAYBACK_WATERMARK
+        ).with_for_update(skip_locked=True).first()
+        if watermark is None:
+            # Another worker is compacting
+            db.rollback()
+            return None
+
+        window_start = watermark.rolled_up_until
+        if window_start is None:
+            window_start = db.scalar(select(func.min(PlaybackLog.created_at)))
+        if window_start is None or window_start >= cutoff:
+            db.rollback()
+            return None
+        window_end = min(cutoff, window_start + timedelta(hours=settings.playback_rollup_max_window_hours))
+
+        hour = _truncate_to_hour(db.connection().dialect.name, PlaybackLog.played_at).label("hour")
+        results = db.execute(
+            select(
+                hour,
+                PlaybackLog.device_id,
+                PlaybackLog.campaign_id,
+                PlaybackLog.media_id,
+                func.count(),
+            ).where(
+                PlaybackLog.created_at >= window_start,
+                PlaybackLog.created_at < window_end,
+            ).group_by(
+                hour,
+                PlaybackLog.device_id,
+                PlaybackLog.campaign_id,
+                PlaybackLog.media_id,
+            )
+        ).all()
+
+        hourly = []
+        daily: Dict[Tuple[date, UUID, UUID], int] = defaultdict(int)
+        for hour_start, device_id, campaign_id, media_id, play_count in results:
+            if isinstance(hour_start, str):
+                hour_start = datetime.fromisoformat(hour_start)
+            hourly.append({
+                "hour": hour_start,
+                "device_id": device_id,
+                "campaign_id": campaign_id,
+                "media_id": media_id,
+                "play_count": play_count,
+            })
+            daily[(hour_start.date(), device_id, campaign_id)] += play_count
+
+        try:
+            _add_counts(db, PlaybackHourly.__table__, ["hour", "device_id", "campaign_id", "media_id"], hourly)
+            _add_counts(db, PlaybackDaily.__table__, ["day", "device_id", "campaign_id"], [
+                {"day": day, "device_id": device_id, "campaign_id": campaign_id, "play_count": play_count}
+                for (day, device_id, campaign_id), play_count in daily.items()
+            ])
+            add_reach(db, daily.keys())
+            watermark.rolled_up_until = window_end
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        with self._lock:
+            self.rolled_up_until = window_end
+        return sum(row["play_count"] for row in hourly)
+
+    def stats(self) -> dict:
+        """Get compactor counters."""
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "rolled_up_logs": self.rolled_up_logs,
+                "rolled_up_until": self.rolled_up_until.isoformat() if self.rolled_up_until else None,
+                "last_run_seconds": self.last_run_seconds,
+            }
+
+
+# Singleton compactor instance
+_rollup_compactor: Optional[PlaybackRollupCompactor] = None
+
+
+def get_rollup_compactor() -> PlaybackRollupCompactor:
+    """Get the process-wide rollup compactor."""
+    global _rollup_compactor
+    if _rollup_compactor is None:
+        _rollup_compactor = PlaybackRollupCompactor()
+    return _rollup_compactor
+
+
+def compact_playback_rollups() -> int:
+    """Roll up new playback logs using a new session."""
+    db = SessionLocal()
+    try:
+        return get_rollup_compactor().compact(db)
+    finally:
+        db.close()
+
+
+async def run_rollup_compactor() -> None:
+    """Roll up new playback logs every PLAYBACK_ROLLUP_INTERVAL_SECONDS until cancelled."""
+    while True:
+        try:
+            await run_io(compact_playback_rollups)
+        except Exception:
+            logger.exception("Failed to roll up playback logs")
+        await asyncio.sleep(settings.playback_rollup_interval_seconds)
+
+
+def playback_counts(start_date: date, end_date: date):
+    """Build a subquery of play counts per device and campaign over a date range.
+
+    Combines the daily rollups with the tail of logs created at or after the
+    watermark. Both are read in one statement, so a compaction committing
+    meanwhile cannot make logs count twice or not at all.
+    Rollup rows of deleted devices are skipped, as their logs are deleted
+    along with them; every report then counts the same plays.
+    Columns: device_id, campaign_id, play_count.
+    """
+    watermark = select(RollupWatermark.rolled_up_until).where(
+        RollupWatermark.name == PLAYBACK_WATERMARK
+    ).scalar_subquery()
+
+    rolled_up = select(
+        PlaybackDaily.device_id,
+        PlaybackDaily.campaign_id,
+        PlaybackDaily.play_count,
+    ).where(
+        PlaybackDaily.day >= start_date,
+        PlaybackDaily.day <= end_date,
+        PlaybackDaily.device_id.in_(select(Device.id)),
+    )
+
+    tail = select(
+        PlaybackLog.device_id,
+        PlaybackLog.campaign_id,
+        func.count().label("play_count"),
+    ).where(
+        PlaybackLog.created_at >= func.coalesce(watermark, _BEGINNING),
+        PlaybackLog.played_at >= datetime.combine(start_date, datetime.min.time()),
+        PlaybackLog.played_at <= datetime.combine(end_date, datetime.max.time()),
+    ).group_by(
+        PlaybackLog.device_id,
+        PlaybackLog.campaign_id,
+    )
+
+    return union_all(rolled_up, tail).subquery("playback_counts")
+
+
+def reach_sketches(by: str, start_date: date, end_date: date, key_id: Optional[UUID] = None):
+    """Build a query for estimating unique devices per campaign or store over a date range.
+
+    by is "campaign" or "store". Returns the daily sketches in the range
+    and the distinct devices of the tail, like playback_counts in one
+    statement. Feed the rows to ReachEstimator. Devices cannot be removed
+    from a sketch, so deleted devices stay in the estimates of the days
+    they played on.
+    Columns: key_id, sketch (tail rows: NULL), device_id (sketch rows: NULL).
+    """
+    model = CampaignReachDaily if by == "campaign" else StoreReachDaily
+    model_key = model.campaign_id if by == "campaign" else model.store_id
+    sketches = select(
+        model_key.label("key_id"),
+        model.sketch,
+        cast(null(), PGUUID(as_uuid=True)).label("device_id"),
+    ).where(
+        model.day >= start_date,
+        model.day <= end_date,
+    )
+
+    watermark = select(RollupWatermark.rolled_up_until).where(
+        RollupWatermark.name == PLAYBACK_WATERMARK
+    ).scalar_subquery()
+    tail_key = PlaybackLog.campaign_id if by == "campaign" else Area.store_id
+    tail = select(
+        tail_key,
+        cast(null(), LargeBinary),
+        PlaybackLog.device_id,
+    ).distinct().where(
+        PlaybackLog.created_at >= func.coalesce(watermark, _BEGINNING),
+        PlaybackLog.played_at >= datetime.combine(start_date, datetime.min.time()),
+        PlaybackLog.played_at <= datetime.combine(end_date, datetime.max.time()),
+    )
+    if by == "store":
+        tail = tail.join(Device, PlaybackLog.device_id == Device.id).join(Area, Device.area_id == Area.id)
+
+    if key_id:
+        sketches = sketches.where(model_key == key_id)
+        tail = tail.where(tail_key == key_id)
+    return union_all(sketches, tail)
+
+
+class ReachEstimator:
+    """Merges reach_sketches rows into one HyperLogLog sketch per key.
+
+    Rows can be added in chunks, so a long range is never held in memory
+    as one sketch per row.
+    """
+
+    def __init__(self):
+        self._keys: Dict[UUID, int] = {}
+        self._sketches = hll.empty(0)
+
+    def add(self, rows: Iterable[Tuple[UUID, Optional[bytes], Optional[UUID]]]) -> None:
+        sketches, sketch_keys, device_ids, device_keys = [], [], [], []
+        for key_id, sketch, device_id in rows:
+            i = self._keys.setdefault(key_id, len(self._keys))
+            if sketch is not None:
+                sketches.append(hll.from_bytes(sketch))
+                sketch_keys.append(i)
+            else:
+                device_ids.append(device_id)
+                device_keys.append(i)
+
+        if len(self._keys) > len(self._sketches):
+            grown = hll.empty(max(len(self._keys), 2 * len(self._sketches)))
+            grown[:len(self._sketches)] = self._sketches
+            self._sketches = grown
+        if sketches:
+            np.maximum.at(self._sketches, np.array(sketch_keys, dtype=np.intp), np.stack(sketches))
+        if device_ids:
+            hll.add_hashes(self._sketches, np.array(device_keys, dtype=np.intp), hll.hash_uuids(device_ids))
+
+    def estimates(self) -> Dict[UUID, int]:
+        """Get the estimated number of unique devices per key."""
+        estimates = hll.estimate(self._sketches[:len(self._keys)]) if self._keys else []
+        return {key_id: int(round(estimates[i])) for key_id, i in self._keys.items()}
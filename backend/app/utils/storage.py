@@ -1,20 +1,123 @@
+import asyncio
+import io
 import os
+import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from datetime import timedelta
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Callable, Optional, Tuple
 
 from app.config import settings
+from app.utils.executors import run_io, run_upload
+
+
+class FileTooLargeError(Exception):
+    """Raised when a streamed upload exceeds its size limit."""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"File exceeds {max_size} bytes")
+        self.max_size = max_size
+
+
+class SignedURLCache:
+    """Thread-safe LRU cache of signed URLs keyed by storage path.
+
+    A URL is reused until refresh_fraction of its lifetime has passed, so a
+    cached URL always has the remaining part of its lifetime left.
+    """
+
+    def __init__(self, max_size: int, lifetime: timedelta, refresh_fraction: float):
+        self.max_size = max_size
+        self.reuse_seconds = lifetime.total_seconds() * refresh_fraction
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_sign(self, storage_path: str, sign: Callable[[], str]) -> str:
+        """Return a cached URL for the path, signing a new one when needed."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(storage_path)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(storage_path)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Sign outside the lock; concurrent misses for one path are harmless
+        url = sign()
+
+        with self._lock:
+            self._entries[storage_path] = (url, now + self.reuse_seconds)
+            self._entries.move_to_end(storage_path)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return url
+
+    def invalidate(self, storage_path: str) -> None:
+        """Drop the cached URL for a path."""
+        with self._lock:
+            self._entries.pop(storage_path, None)
+
+    def stats(self) -> dict:
+        """Get cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
 
 
 class StorageBackend(ABC):
     """Abstract base class for storage backends."""
 
+    # How long URLs returned by get_file_url stay valid (None = no expiry)
+    url_lifetime: Optional[timedelta] = None
+    # Cache of generated URLs, for backends where generating them is costly
+    url_cache: Optional[SignedURLCache] = None
+
     @abstractmethod
     def upload_file(self, file_content: bytes, destination_path: str, content_type: Optional[str] = None) -> str:
         """Upload a file and return the storage path."""
         pass
 
+    @abstractmethod
+    async def upload_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        destination_path: str,
+        content_type: Optional[str] = None,
+        max_size: Optional[int] = None,
+    ) -> Tuple[str, int]:
+        """Upload a file from an async chunk iterator without buffering it whole.
+
+        Returns the storage path and the number of bytes written. Raises
+        FileTooLargeError as soon as more than max_size bytes have been
+        received; nothing is stored in that case.
+        """
+        pass
+
+    @abstractmethod
+    def read_file(self, storage_path: str) -> bytes:
+        """Read a stored file's content."""
+        pass
+
+    @abstractmethod
+    def move_file(self, storage_path: str, destination_path: str) -> str:
+        """Move a stored file to a new path, replacing any file there; returns the new storage path."""
+        pass
+
     @abstractmethod
     def get_file_url(self, storage_path: str) -> str:
         """Get a URL to access the file."""
@@ -44,6 +147,53 @@ class LocalStorage(StorageBackend):
 
         return destination_path
 
+    async def upload_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        destination_path: str,
+        content_type: Optional[str] = None,
+        max_size: Optional[int] = None,
+    ) -> Tuple[str, int]:
+        """Stream a file to a temp file next to the destination, then rename it into place."""
+        file_path = self.base_path / destination_path
+        await run_io(file_path.parent.mkdir, parents=True, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=file_path.parent, prefix=".upload-")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if max_size is not None and size > max_size:
+                        raise FileTooLargeError(max_size)
+                    await run_io(f.write, chunk)
+            # Readers never see a partially written file
+            await run_io(os.replace, temp_path, file_path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+
+        return destination_path, size
+
+    def read_file(self, storage_path: str) -> bytes:
+        """Read a file from local storage."""
+        if storage_path.startswith("local://"):
+            storage_path = storage_path[8:]
+        return (self.base_path / storage_path).read_bytes()
+
+    def move_file(self, storage_path: str, destination_path: str) -> str:
+        """Move a file within local storage."""
+        if storage_path.startswith("local://"):
+            storage_path = storage_path[8:]
+
+        file_path = self.base_path / destination_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.base_path / storage_path, file_path)
+        return destination_path
+
     def get_file_url(self, storage_path: str) -> str:
         """Get a URL to access the file from local storage."""
         # Remove any prefix like "local://" if present
@@ -78,6 +228,12 @@ class GCSStorage(StorageBackend):
         else:
             self.client = gcs_storage.Client(project=settings.gcs_project_id)
         self.bucket_name = settings.gcs_bucket_name
+        self.url_lifetime = timedelta(hours=settings.signed_url_expiration_hours)
+        self.url_cache = SignedURLCache(
+            max_size=settings.signed_url_cache_size,
+            lifetime=self.url_lifetime,
+            refresh_fraction=settings.signed_url_refresh_fraction,
+        )
 
     def upload_file(self, file_content: bytes, destination_path: str, content_type: Optional[str] = None) -> str:
         """Upload a file to GCS and return the GCS path."""
@@ -86,7 +242,55 @@ class GCSStorage(StorageBackend):
         blob.upload_from_string(file_content, content_type=content_type)
         return f"gs://{self.bucket_name}/{destination_path}"
 
+    async def upload_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        destination_path: str,
+        content_type: Optional[str] = None,
+        max_size: Optional[int] = None,
+    ) -> Tuple[str, int]:
+        """Stream a file to GCS with a resumable upload of GCS_UPLOAD_CHUNK_SIZE chunks.
+
+        The upload runs in the upload pool and pulls chunks from the iterator
+        as it goes, so at most one upload chunk is held in memory. Its thread
+        waits on the client for the whole transfer, which is why it does not
+        share the IO pool with short storage calls. If reading
+        fails or the size limit is exceeded the final chunk is never sent
+        and no object is created.
+        """
+        bucket = self.client.bucket(self.bucket_name)
+        blob = bucket.blob(destination_path, chunk_size=settings.gcs_upload_chunk_size)
+        reader = _AsyncChunkReader(chunks, asyncio.get_running_loop(), max_size)
+        await run_upload(blob.upload_from_file, reader, content_type=content_type)
+        return f"gs://{self.bucket_name}/{destination_path}", reader.size
+
+    def read_file(self, storage_path: str) -> bytes:
+        """Download a GCS object."""
+        if storage_path.startswith("gs://"):
+            path_without_prefix = storage_path[5:]
+            bucket_name, blob_path = path_without_prefix.split("/", 1)
+        else:
+            bucket_name = self.bucket_name
+            blob_path = storage_path
+
+        return self.client.bucket(bucket_name).blob(blob_path).download_as_bytes()
+
+    def move_file(self, storage_path: str, destination_path: str) -> str:
+        """Move an object within the bucket (server-side copy, then delete)."""
+        if storage_path.startswith("gs://"):
+            storage_path = storage_path[5:].split("/", 1)[1]
+
+        bucket = self.client.bucket(self.bucket_name)
+        bucket.rename_blob(bucket.blob(storage_path), destination_path)
+        return f"gs://{self.bucket_name}/{destination_path}"
+
     def get_file_url(self, storage_path: str) -> str:
+        """Get a signed URL for a GCS object, reusing a cached one while still fresh."""
+        return self.url_cache.get_or_sign(
+            storage_path, lambda: self._generate_signed_url(storage_path)
+        )
+
+    def _generate_signed_url(self, storage_path: str) -> str:
         """Generate a signed URL for a GCS object."""
         if storage_path.startswith("gs://"):
             path_without_prefix = storage_path[5:]
@@ -100,7 +304,7 @@ class GCSStorage(StorageBackend):
 
         url = blob.generate_signed_url(
             version="v4",
-            expiration=timedelta(hours=24 * 7),
+            expiration=self.url_lifetime,
             method="GET",
         )
         return url
@@ -116,6 +320,8 @@ class GCSStorage(StorageBackend):
             bucket_name = self.bucket_name
             blob_path = storage_path
 
+        self.url_cache.invalidate(storage_path)
+
         try:
             bucket = self.client.bucket(bucket_name)
             blob = bucket.blob(blob_path)
@@ -125,6 +331,41 @@ class GCSStorage(StorageBackend):
             return False
 
 
+class _AsyncChunkReader(io.RawIOBase):
+    """Blocking file object over an async chunk iterator, read from a worker thread."""
+
+    def __init__(self, chunks: AsyncIterator[bytes], loop: asyncio.AbstractEventLoop, max_size: Optional[int]):
+        self._chunks = chunks.__aiter__()
+        self._loop = loop
+        self._max_size = max_size
+        self._pending = memoryview(b"")
+        self._eof = False
+        self.size = 0
+
+    def readable(self) -> bool:
+        return True
+
+    async def _next_chunk(self) -> bytes:
+        return await self._chunks.__anext__()
+
+    def readinto(self, buffer) -> int:
+        while not self._pending and not self._eof:
+            try:
+                chunk = asyncio.run_coroutine_threadsafe(self._next_chunk(), self._loop).result()
+            except StopAsyncIteration:
+                self._eof = True
+                break
+            self.size += len(chunk)
+            if self._max_size is not None and self.size > self._max_size:
+                raise FileTooLargeError(self._max_size)
+            self._pending = memoryview(chunk)
+
+        n = min(len(buffer), len(self._pending))
+        buffer[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
 # Singleton storage instance
 _storage: Optional[StorageBackend] = None
 
@@ -149,6 +390,26 @@ def upload_file(file_content: bytes, destination_path: str, content_type: Option
     return get_storage().upload_file(file_content, destination_path, content_type)
 
 
+async def upload_stream(
+    chunks: AsyncIterator[bytes],
+    destination_path: str,
+    content_type: Optional[str] = None,
+    max_size: Optional[int] = None,
+) -> Tuple[str, int]:
+    """Stream a file to the configured storage backend."""
+    return await get_storage().upload_stream(chunks, destination_path, content_type, max_size)
+
+
+def read_file(storage_path: str) -> bytes:
+    """Read a file using the configured storage backend."""
+    return get_storage().read_file(storage_path)
+
+
+def move_file(storage_path: str, destination_path: str) -> str:
+    """Move a file using the configured storage backend."""
+    return get_storage().move_file(storage_path, destination_path)
+
+
 def get_file_url(storage_path: str) -> str:
     """Get a URL for a file using the configured storage backend."""
     return get_storage().get_file_url(storage_path)
@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, List, NamedTuple, Optional, Set, Tuple
+from uuid import UUID
+
+from app.config import settings
+from app.utils.executors import run_io
+from app.utils.storage import FileTooLargeError
+
+_MANIFEST = "session.json"
+_PART_PREFIX = "part-"
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadSession(NamedTuple):
+    id: UUID
+    campaign_id: UUID
+    filename: str
+    content_type: str
+    duration_seconds: int
+    created_at: datetime
+
+
+class UploadSessionStore:
+    """Multi-part upload sessions staged on local disk.
+
+    Each session is a directory holding a JSON manifest and one file per
+    received part. Parts are written to a temp file and renamed into place,
+    so they can be uploaded in parallel and re-sent after a failure; the
+    directory listing is the record of which parts have arrived. Sessions
+    survive restarts and are removed on completion, abort, or once no part
+    has arrived for the expiry period.
+    """
+
+    def __init__(self, base_path: str, expiry: timedelta):
+        self.base_path = Path(base_path)
+        self.expiry = expiry
+        self._completing: Set[UUID] = set()
+        self._lock = threading.Lock()
+
+    def _session_dir(self, session_id: UUID) -> Path:
+        return self.base_path / str(session_id)
+
+    def create(
+        self,
+        campaign_id: UUID,
+        filename: str,
+        content_type: str,
+        duration_seconds: int,
+    ) -> UploadSession:
+        self.remove_expired()
+        session = UploadSession(
+            id=uuid.uuid4(),
+            campaign_id=campaign_id,
+            filename=filename,
+            content_type=content_type,
+            duration_seconds=duration_seconds,
+            created_at=datetime.utcnow(),
+        )
+        session_dir = self._session_dir(session.id)
+        session_dir.mkdir(parents=True)
+        (session_dir / _MANIFEST).write_text(json.dumps({
+            "id": str(session.id),
+            "campaign_id": str(session.campaign_id),
+            "filename": session.filename,
+            "content_type": session.content_type,
+            "duration_seconds": session.duration_seconds,
+            "created_at": session.created_at.isoformat(),
+        }))
+        return session
+
+    def get(self, session_id: UUID) -> Optional[UploadSession]:
+        """Get a session, or None if it does not exist or has expired."""
+        try:
+            data = json.loads((self._session_dir(session_id) / _MANIFEST).read_text())
+        except (OSError, ValueError):
+            return None
+        session = UploadSession(
+            id=UUID(data["id"]),
+            campaign_id=UUID(data["campaign_id"]),
+            filename=data["filename"],
+            content_type=data["content_type"],
+            duration_seconds=data["duration_seconds"],
+            created_at=datetime.fromisoformat(data["created_at"]),
+        )
+        if self.expires_at(session) <= datetime.utcnow():
+            return None
+        return session
+
+    def expires_at(self, session: UploadSession) -> datetime:
+        """Get when the session expires unless another part arrives."""
+        # Adding a part renames a file into the directory, updating its mtime
+        last_activity = datetime.utcfromtimestamp(self._session_dir(session.id).stat().st_mtime)
+        return last_activity + self.expiry
+
+    def list_parts(self, session: UploadSession) -> List[Tuple[int, int]]:
+        """Get (part number, size) of the parts received so far, in order."""
+        parts = []
+        for entry in os.scandir(self._session_dir(session.id)):
+            if entry.name.startswith(_PART_PREFIX):
+                parts.append((int(entry.name[len(_PART_PREFIX):]), entry.stat().st_size))
+        return sorted(parts)
+
+    async def write_part(
+        self,
+        session: UploadSession,
+        part_number: int,
+        chunks: AsyncIterator[bytes],
+        max_size: int,
+    ) -> int:
+        """Store one part, replacing an earlier copy; returns its size."""
+        session_dir = self._session_dir(session.id)
+        fd, temp_path = tempfile.mkstemp(dir=session_dir, prefix=".incoming-")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_size:
+                        raise FileTooLargeError(max_size)
+                    await run_io(f.write, chunk)
+            await run_io(os.replace, temp_path, session_dir / f"{_PART_PREFIX}{part_number:05d}")
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        return size
+
+    async def iter_parts(self, session: UploadSession, part_numbers: List[int]) -> AsyncIterator[bytes]:
+        """Read the given parts back in order as one stream of chunks."""
+        session_dir = self._session_dir(session.id)
+        for part_number in part_numbers:
+            with open(session_dir / f"{_PART_PREFIX}{part_number:05d}", "rb") as f:
+                while True:
+                    chunk = await run_io(f.read, _READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+
+    def begin_completion(self, session: UploadSession) -> bool:
+        """Mark a session as being completed; False if another request already is."""
+        with self._lock:
+            if session.id in self._completing:
+                return False
+            self._completing.add(session.id)
+            return True
+
+    def end_completion(self, session: UploadSession) -> None:
+        with self._lock:
+            self._completing.discard(session.id)
+
+    def delete(self, session_id: UUID) -> None:
+        shutil.rmtree(self._session_dir(session_id), ignore_errors=True)
+
+    def remove_expired(self) -> int:
+        """Delete sessions that have been inactive for the expiry period."""
+        if not self.base_path.exists():
+            return 0
+        cutoff = (datetime.utcnow() - self.expiry).timestamp()
+        removed = 0
+        for entry in os.scandir(self.base_path):
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+# Singleton store instance
+_upload_session_store: Optional[UploadSessionStore] = None
+
+
+def get_upload_session_store() -> UploadSessionStore:
+    """Get the process-wide upload session store."""
+    global _upload_session_store
+    if _upload_session_store is None:
+        _upload_session_store = UploadSessionStore(
+            base_path=settings.upload_staging_path,
+            expiry=timedelta(hours=settings.upload_session_expiry_hours),
+        )
+    return _upload_session_store
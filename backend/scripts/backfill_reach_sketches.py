@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Build the daily reach sketches (campaign_reach_daily, store_reach_daily)
+from playback_daily, for logs rolled up before the sketches existed.
+Sketches merge by register-wise maximum, so running it again or while the
+rollup compactor runs never counts a device twice.
+Usage: python -m scripts.backfill_reach_sketches [--start-date 2024-01-01] [--end-date 2024-12-31]
+"""
+import argparse
+import sys
+import os
+from datetime import date, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models.playback_rollup import PlaybackDaily, RollupWatermark
+from app.utils.rollups import PLAYBACK_WATERMARK, add_reach
+
+
+def backfill_day(db, day: date) -> int:
+    """Add one day of playback_daily to the sketches; returns the rows read."""
+    # Wait for the compactor instead of skipping: both read-modify-write
+    # the same sketches.
+    db.query(RollupWatermark).filter(
+        RollupWatermark.name == PLAYBACK_WATERMARK
+    ).with_for_update().first()
+    plays = db.execute(
+        select(PlaybackDaily.day, PlaybackDaily.device_id, PlaybackDaily.campaign_id).where(
+            PlaybackDaily.day == day
+        )
+    ).all()
+    add_reach(db, [tuple(row) for row in plays])
+    db.commit()
+    return len(plays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start-date", type=date.fromisoformat, help="Defaults to the first rolled-up day")
+    parser.add_argument("--end-date", type=date.fromisoformat, help="Defaults to the last rolled-up day")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        first_day, last_day = db.execute(select(func.min(PlaybackDaily.day), func.max(PlaybackDaily.day))).one()
+        db.rollback()
+        if first_day is None:
+            print("playback_daily is empty")
+            return
+        day = max(args.start_date or first_day, first_day)
+        end_date = min(args.end_date or last_day, last_day)
+        total = 0
+        while day <= end_date:
+            rows = backfill_day(db, day)
+            total += rows
+            print(f"{day}: {rows} device/campaign rows")
+            day += timedelta(days=1)
+        print(f"Done: {total} rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
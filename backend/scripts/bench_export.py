@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory of the playback log export: fetching all rows into
+one CSV string vs. streaming CSV / Parquet chunks from a server-side cursor.
+Fixtures and logs are written inside a transaction that is rolled back at the end.
+Usage: python -m scripts.bench_export [--sizes 10000 100000 1000000]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import sys
+import os
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+from app.database import AsyncSessionLocal
+from app.models.store import Store
+from app.models.area import Area
+from app.models.device import Device
+from app.models.campaign import Campaign
+from app.models.media import Media, MediaType
+from app.models.playback_log import PlaybackLog
+from app.utils.report_export import (
+    csv_chunks, parquet_chunks, playback_log_export_query, statement_columns, stream_query,
+)
+
+INSERT_BATCH_ROWS = 10000
+
+
+async def buffered_csv(db, stmt):
+    """Fetch every row, then write one CSV string (what a non-streaming export would do)."""
+    rows = (await db.execute(stmt)).all()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in statement_columns(stmt)])
+    writer.writerows(rows)
+    return len(buffer.getvalue().encode())
+
+
+async def streamed(encode, db, stmt):
+    size = 0
+    async for chunk in encode(statement_columns(stmt), stream_query(db, stmt)):
+        size += len(chunk)
+    return size
+
+
+async def create_fixtures(db):
+    store = Store(name="bench", code="BENCH-EXPORT")
+    db.add(store)
+    await db.flush()
+    area = Area(store_id=store.id, name="bench", code="BENCH")
+    db.add(area)
+    await db.flush()
+    device = Device(device_code="BENCH-EXPORT", area_id=area.id)
+    campaign = Campaign(
+        store_id=store.id, name="bench",
+        start_date=date.today(), end_date=date.today(),
+    )
+    db.add_all([device, campaign])
+    await db.flush()
+    media = Media(
+        campaign_id=campaign.id, type=MediaType.IMAGE,
+        filename="bench.png", gcs_path="bench.png",
+    )
+    db.add(media)
+    await db.flush()
+    return store.id, device.id, campaign.id, media.id
+
+
+async def run(sizes):
+    async with AsyncSessionLocal() as db:
+        try:
+            store_id, device_id, campaign_id, media_id = await create_fixtures(db)
+            started_at = datetime.utcnow() - timedelta(days=1)
+            end_date = date.today()
+            stmt = playback_log_export_query(end_date - timedelta(days=30), end_date, store_id=store_id)
+
+            print(f"{'rows':>8} | {'impl':>15} | {'peak MB':>8} | {'output MB':>9} | {'seconds':>7}")
+            inserted = 0
+            for size in sorted(sizes):
+                while inserted < size:
+                    count = min(INSERT_BATCH_ROWS, size - inserted)
+                    await db.execute(insert(PlaybackLog), [
+                        {
+                            "id": uuid.uuid4(), "device_id": device_id, "media_id": media_id,
+                            "campaign_id": campaign_id, "played_at": started_at + timedelta(milliseconds=inserted + i),
+                            "created_at": started_at,
+                        }
+                        for i in range(count)
+                    ])
+                    inserted += count
+
+                for name, export in (
+                    ("buffered csv", buffered_csv),
+                    ("streamed csv", lambda db, stmt: streamed(csv_chunks, db, stmt)),
+                    ("streamed parquet", lambda db, stmt: streamed(parquet_chunks, db, stmt)),
+                ):
+                    tracemalloc.start()
+                    started = time.perf_counter()
+                    output_size = await export(db, stmt)
+                    elapsed = time.perf_counter() - started
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    print(f"{size:>8} | {name:>15} | {peak / 1024 / 1024:>8.1f} | "
+                          f"{output_size / 1024 / 1024:>9.1f} | {elapsed:>7.2f}")
+        finally:
+            await db.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes))
+
+
+if __name__ == "__main__":
+    main()
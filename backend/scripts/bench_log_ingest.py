@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark playback log ingestion: ORM objects vs. the bulk row path.
+Fixtures and logs are written inside a transaction that is rolled back at the end.
+Usage: python -m scripts.bench_log_ingest [--sizes 100 10000 100000] [--skip-orm-above 10000]
+"""
+import argparse
+import sys
+import os
+import time
+from datetime import date, datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.models.store import Store
+from app.models.area import Area
+from app.models.device import Device
+from app.models.campaign import Campaign
+from app.models.media import Media, MediaType
+from app.models.playback_log import PlaybackLog
+from app.schemas.playback_log import PlaybackLogCreate
+from app.utils.log_ingest import build_playback_log_rows, insert_playback_log_rows
+
+
+def orm_ingest(db, logs, device_id, synced_at):
+    """Previous implementation: one ORM object per log."""
+    for log_data in logs:
+        db.add(PlaybackLog(
+            device_id=log_data.device_id,
+            media_id=log_data.media_id,
+            campaign_id=log_data.campaign_id,
+            played_at=log_data.played_at,
+            synced_at=synced_at,
+        ))
+    db.flush()
+    return len(logs)
+
+
+def bulk_ingest(db, logs, device_id, synced_at):
+    return insert_playback_log_rows(db, build_playback_log_rows(logs, device_id, synced_at))
+
+
+def create_fixtures(db):
+    store = Store(name="bench", code="BENCH-LOGS")
+    db.add(store)
+    db.flush()
+    area = Area(store_id=store.id, name="bench", code="BENCH")
+    db.add(area)
+    db.flush()
+    device = Device(device_code="BENCH-LOGS", area_id=area.id)
+    campaign = Campaign(
+        store_id=store.id, name="bench",
+        start_date=date.today(), end_date=date.today(),
+    )
+    db.add_all([device, campaign])
+    db.flush()
+    media = Media(
+        campaign_id=campaign.id, type=MediaType.IMAGE,
+        filename="bench.png", gcs_path="bench.png",
+    )
+    db.add(media)
+    db.flush()
+    return device.id, campaign.id, media.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--skip-orm-above", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        device_id, campaign_id, media_id = create_fixtures(db)
+
+        print(f"{'rows':>7} | {'impl':>4} | {'seconds':>8} | {'rows/s':>10}")
+        for size in args.sizes:
+            started_at = datetime.utcnow() - timedelta(days=1)
+            logs = [
+                PlaybackLogCreate(
+                    device_id=device_id, media_id=media_id, campaign_id=campaign_id,
+                    played_at=started_at + timedelta(seconds=i),
+                )
+                for i in range(size)
+            ]
+
+            for name, fn in (("orm", orm_ingest), ("bulk", bulk_ingest)):
+                if name == "orm" and args.skip_orm_above and size > args.skip_orm_above:
+                    continue
+                savepoint = db.begin_nested()
+                started = time.perf_counter()
+                fn(db, logs, device_id, datetime.utcnow())
+                db.flush()
+                elapsed = time.perf_counter() - started
+                savepoint.rollback()
+                print(f"{size:>7} | {name:>4} | {elapsed:>8.3f} | {size / elapsed:>10.0f}")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
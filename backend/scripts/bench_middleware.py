@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark the media CORS middleware: BaseHTTPMiddleware vs. pure ASGI.
+Requests are sent straight to the ASGI app (no sockets), so only the app
+and middleware stack is measured: large media file throughput and the
+latency of small API requests, which the middleware also wraps.
+Usage: python -m scripts.bench_middleware [--file-mb 200] [--small-requests 5000]
+"""
+import argparse
+import asyncio
+import sys
+import os
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middleware import MediaCORSMiddleware
+from app.utils.executors import shutdown_executors
+from app.utils.media_files import MediaFiles
+
+
+class BaseHTTPMediaCORSMiddleware(BaseHTTPMiddleware):
+    """Previous implementation: add CORS headers in BaseHTTPMiddleware.dispatch."""
+
+    async def dispatch(self, request: Request, call_next):
+        response = await call_next(request)
+        if request.url.path.startswith("/media"):
+            response.headers["Access-Control-Allow-Origin"] = "*"
+            response.headers["Access-Control-Allow-Methods"] = "GET, OPTIONS"
+            response.headers["Access-Control-Allow-Headers"] = "*"
+        return response
+
+
+def build_app(media_dir, middleware):
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    app.mount("/media", MediaFiles(media_dir))
+    app.add_middleware(middleware)
+    return app
+
+
+async def request(app, path):
+    """Send a GET request to the app; returns (status, body bytes received)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    status = None
+    received = 0
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, received
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return status, received
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as media_dir:
+        with open(os.path.join(media_dir, "video.mp4"), "wb") as f:
+            for _ in range(args.file_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        print(f"{'middleware':>12} | {'file MB/s':>9} | {'small p50 us':>12} | {'small p99 us':>12}")
+        for name, middleware in (("BaseHTTP", BaseHTTPMediaCORSMiddleware), ("pure ASGI", MediaCORSMiddleware)):
+            app = build_app(media_dir, middleware)
+
+            # Warm up the ETag cache and the IO pool
+            await request(app, "/media/video.mp4")
+
+            started = time.perf_counter()
+            total = 0
+            for _ in range(args.file_requests):
+                status, received = await request(app, "/media/video.mp4")
+                assert status == 200
+                total += received
+            throughput = total / 1024 / 1024 / (time.perf_counter() - started)
+
+            latencies = []
+            for _ in range(args.small_requests):
+                started = time.perf_counter()
+                status, _ = await request(app, "/health")
+                latencies.append((time.perf_counter() - started) * 1_000_000)
+                assert status == 200
+
+            print(
+                f"{name:>12} | {throughput:>9.0f} | "
+                f"{percentile(latencies, 0.5):>12.0f} | {percentile(latencies, 0.99):>12.0f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--file-mb", type=int, default=200, help="Size of the media file")
+    parser.add_argument("--file-requests", type=int, default=5, help="Downloads of the media file")
+    parser.add_argument("--small-requests", type=int, default=5000, help="Small API requests")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    finally:
+        shutdown_executors()
+
+
+if __name__ == "__main__":
+    main()
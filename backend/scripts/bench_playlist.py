@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark playlist compilation: per-campaign queries vs. the single joined query.
+Synthetic areas are created inside a transaction that is rolled back at the end.
+Usage: python -m scripts.bench_playlist [--media-per-campaign 5] [--repeat 50]
+"""
+import argparse
+import sys
+import os
+import time
+from datetime import date, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app.database import SessionLocal, engine
+from app.models.store import Store
+from app.models.area import Area
+from app.models.campaign import Campaign, CampaignArea
+from app.models.media import Media, MediaType
+from app.utils.playlist_compiler import PlaylistEntry, compile_playlist
+
+CAMPAIGN_COUNTS = [1, 20, 200]
+
+
+def legacy_compile(db, area_id, today):
+    """Previous implementation: one media query per active campaign."""
+    campaign_ids = [
+        ca.campaign_id
+        for ca in db.query(CampaignArea).filter(CampaignArea.area_id == area_id).all()
+    ]
+    active_campaigns = db.query(Campaign).filter(
+        Campaign.id.in_(campaign_ids),
+        Campaign.is_active == True,
+        Campaign.start_date <= today,
+        Campaign.end_date >= today,
+    ).order_by(Campaign.weight.desc()).all()
+
+    entries = []
+    for campaign in active_campaigns:
+        media_items = db.query(Media).filter(
+            Media.campaign_id == campaign.id
+        ).order_by(Media.sort_order).all()
+        for media in media_items:
+            entries.append(PlaylistEntry(
+                media.id, campaign.id, media.gcs_path, media.type,
+                media.duration_seconds, media.filename, media.content_hash,
+            ))
+    return entries
+
+
+def create_area(db, store, campaign_count, media_per_campaign, today):
+    area = Area(store_id=store.id, name=f"bench-{campaign_count}", code=f"BENCH{campaign_count}")
+    db.add(area)
+    db.flush()
+
+    for i in range(campaign_count):
+        campaign = Campaign(
+            store_id=store.id,
+            name=f"bench-{campaign_count}-{i}",
+            weight=(i % 10) + 1,
+            start_date=today - timedelta(days=1),
+            end_date=today + timedelta(days=1),
+        )
+        db.add(campaign)
+        db.flush()
+        db.add(CampaignArea(campaign_id=campaign.id, area_id=area.id))
+        for j in range(media_per_campaign):
+            db.add(Media(
+                campaign_id=campaign.id,
+                type=MediaType.IMAGE,
+                filename=f"{i}-{j}.png",
+                gcs_path=f"campaigns/{campaign.id}/{j}.png",
+                sort_order=j,
+            ))
+    db.flush()
+    return area
+
+
+def measure(db, compile_fn, area_id, today, repeat):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            compile_fn(db, area_id, today)
+            db.expire_all()
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    return len(statements) // repeat, elapsed / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--media-per-campaign", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    today = date.today()
+    db = SessionLocal()
+    try:
+        store = Store(name="bench", code="BENCH-PLAYLIST")
+        db.add(store)
+        db.flush()
+
+        print(f"{'campaigns':>9} | {'impl':>7} | {'queries':>7} | {'ms/compile':>10}")
+        for campaign_count in CAMPAIGN_COUNTS:
+            area = create_area(db, store, campaign_count, args.media_per_campaign, today)
+
+            legacy = legacy_compile(db, area.id, today)
+            joined = compile_playlist(db, area.id, today).entries
+            assert {e.media_id for e in legacy} == {e.media_id for e in joined}
+
+            for name, fn in (("legacy", legacy_compile), ("joined", compile_playlist)):
+                queries, ms = measure(db, fn, area.id, today, args.repeat)
+                print(f"{campaign_count:>9} | {name:>7} | {queries:>7} | {ms:>10.2f}")
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
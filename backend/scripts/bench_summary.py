@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark /reports/summary: separate queries vs. the single statement.
+Counts the statements each implementation issues and fails unless the
+current one issues exactly one and matches the previous results.
+Usage: python -m scripts.bench_summary [--days 30] [--repeat 20]
+"""
+import argparse
+import asyncio
+import sys
+import os
+import time
+from datetime import date, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func, select
+
+from app.database import AsyncSessionLocal, async_engine
+from app.models.campaign import Campaign
+from app.models.device import Device
+from app.models.area import Area
+from app.models.store import Store
+from app.routers.reports import _build_summary
+from app.utils.rollups import playback_counts
+
+
+async def legacy_summary(db, start_date, end_date, exact):
+    """Previous implementation: three playback aggregates and four table counts."""
+    total_plays = await db.scalar(
+        select(func.sum(playback_counts(start_date, end_date).c.play_count))
+    ) or 0
+    active_devices = await db.scalar(
+        select(func.count(func.distinct(playback_counts(start_date, end_date).c.device_id)))
+    ) or 0
+    active_campaigns = await db.scalar(
+        select(func.count(func.distinct(playback_counts(start_date, end_date).c.campaign_id)))
+    ) or 0
+    inventory = {
+        f"total_{name}": await db.scalar(select(func.count(model.id))) or 0
+        for name, model in (("stores", Store), ("areas", Area), ("devices", Device), ("campaigns", Campaign))
+    }
+    return {
+        "playback": {
+            "total_plays": int(total_plays),
+            "active_devices": active_devices,
+            "active_campaigns": active_campaigns,
+        },
+        "inventory": inventory,
+    }
+
+
+async def measure(build, start_date, end_date, exact, repeat):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count)
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            async with AsyncSessionLocal() as db:
+                result = await build(db, start_date, end_date, exact)
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count)
+
+    return result, len(statements) // repeat, elapsed / repeat * 1000
+
+
+async def run(args):
+    end_date = date.today()
+    start_date = end_date - timedelta(days=args.days)
+
+    print(f"{'impl':>16} | {'queries':>7} | {'ms/summary':>10}")
+    results = {}
+    for name, build, exact in (
+        ("legacy", legacy_summary, True),
+        ("single (exact)", _build_summary, True),
+        ("single (estim.)", _build_summary, False),
+    ):
+        results[name], queries, ms = await measure(build, start_date, end_date, exact, args.repeat)
+        print(f"{name:>16} | {queries:>7} | {ms:>10.2f}")
+        if build is _build_summary:
+            assert queries == 1, f"{name} issued {queries} queries"
+
+    legacy, single = results["legacy"], results["single (exact)"]
+    assert single["playback"] == legacy["playback"], (single["playback"], legacy["playback"])
+    assert {k: v for k, v in single["inventory"].items() if k != "exact"} == legacy["inventory"]
+    print("estimated inventory:", results["single (estim.)"]["inventory"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=30, help="Length of the report range")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
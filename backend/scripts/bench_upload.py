@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory of media uploads: whole-file bytes vs. streamed chunks.
+Files are written under bench/ in the configured storage and deleted afterwards.
+Usage: python -m scripts.bench_upload [--sizes-mb 10 50 100]
+"""
+import argparse
+import asyncio
+import sys
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.storage import get_storage
+
+CHUNK_SIZE = 1024 * 1024
+
+
+async def buffered_upload(source_path, destination_path):
+    """Previous implementation: read the whole file, then upload the bytes."""
+    with open(source_path, "rb") as f:
+        content = f.read()
+    return get_storage().upload_file(content, destination_path, "video/mp4")
+
+
+async def streamed_upload(source_path, destination_path):
+    async def chunks():
+        with open(source_path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    storage_path, _ = await get_storage().upload_stream(chunks(), destination_path, "video/mp4")
+    return storage_path
+
+
+async def measure(upload, source_path):
+    destination_path = f"bench/{uuid.uuid4().hex}.mp4"
+    tracemalloc.start()
+    started = time.perf_counter()
+    storage_path = await upload(source_path, destination_path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    get_storage().delete_file(storage_path)
+    return peak / 1024 / 1024, elapsed
+
+
+async def run(sizes_mb):
+    print(f"{'size MB':>7} | {'impl':>8} | {'peak MB':>8} | {'seconds':>7}")
+    for size_mb in sizes_mb:
+        with tempfile.NamedTemporaryFile(suffix=".mp4") as source:
+            for _ in range(size_mb):
+                source.write(os.urandom(CHUNK_SIZE))
+            source.flush()
+
+            for name, upload in (("buffered", buffered_upload), ("streamed", streamed_upload)):
+                peak_mb, elapsed = await measure(upload, source.name)
+                print(f"{size_mb:>7} | {name:>8} | {peak_mb:>8.1f} | {elapsed:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[10, 50, 100])
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes_mb))
+
+
+if __name__ == "__main__":
+    main()
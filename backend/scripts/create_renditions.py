@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Create display renditions for stored images that have none,
+e.g. images uploaded before renditions were introduced.
+Usage: python -m scripts.create_renditions
+"""
+import asyncio
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+from app.models.media_blob import MediaBlob
+from app.utils.executors import shutdown_executors
+from app.utils.renditions import RENDITION_SOURCE_TYPES, create_renditions
+
+
+async def create_missing_renditions():
+    db = SessionLocal()
+    try:
+        blobs = db.query(MediaBlob).filter(
+            MediaBlob.mime_type.in_(RENDITION_SOURCE_TYPES),
+            ~MediaBlob.renditions.any(),
+        ).all()
+        print(f"{len(blobs)} images without renditions")
+
+        for blob in blobs:
+            renditions = await create_renditions(db, blob)
+            sizes = ", ".join(f"{r.width}x{r.height}" for r in renditions) or "none"
+            print(f"{blob.storage_path}: {sizes}")
+    finally:
+        db.close()
+
+
+def main():
+    try:
+        asyncio.run(create_missing_renditions())
+    finally:
+        shutdown_executors()
+
+
+if __name__ == "__main__":
+    main()
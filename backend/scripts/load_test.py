@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Mixed player/report load test against a running API server.
+Simulated devices poll /player/playlist and send heartbeats while admin
+clients request reports; latency percentiles are printed per endpoint.
+Device IDs are read from DATABASE_URL. Nothing is written except device presence.
+Usage: python -m scripts.load_test --email admin@example.com --password xxx
+           [--base-url http://localhost:8000] [--devices 200] [--report-clients 4] [--duration 60]
+"""
+import argparse
+import asyncio
+import sys
+import os
+import time
+from collections import defaultdict
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.device import Device
+
+REPORT_PATHS = ["/reports/summary", "/reports/campaigns", "/reports/stores", "/reports/devices"]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(len(ordered) * fraction), len(ordered) - 1)
+    return ordered[index]
+
+
+async def timed_request(client, latencies, errors, name, path, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await client.request(kwargs.pop("method", "GET"), path, **kwargs)
+        if response.status_code >= 400:
+            errors[name] += 1
+    except httpx.HTTPError:
+        errors[name] += 1
+        return
+    latencies[name].append((time.perf_counter() - started) * 1000)
+
+
+async def device_loop(client, device_id, deadline, interval, latencies, errors):
+    etag = None
+    while time.monotonic() < deadline:
+        headers = {"If-None-Match": etag} if etag else {}
+        started = time.perf_counter()
+        try:
+            response = await client.get(
+                "/player/playlist", params={"device_id": device_id}, headers=headers,
+            )
+            etag = response.headers.get("etag", etag)
+            if response.status_code >= 400:
+                errors["playlist"] += 1
+            else:
+                latencies["playlist"].append((time.perf_counter() - started) * 1000)
+        except httpx.HTTPError:
+            errors["playlist"] += 1
+
+        await timed_request(
+            client, latencies, errors, "heartbeat", "/player/heartbeat",
+            method="POST", params={"device_id": device_id},
+        )
+        await asyncio.sleep(interval)
+
+
+async def report_loop(client, index, deadline, latencies, errors):
+    i = index
+    while time.monotonic() < deadline:
+        path = REPORT_PATHS[i % len(REPORT_PATHS)]
+        await timed_request(client, latencies, errors, path.rsplit("/", 1)[-1] + " report", path)
+        i += 1
+
+
+async def run(args, device_ids):
+    base_url = args.base_url.rstrip("/") + settings.api_v1_prefix
+    limits = httpx.Limits(max_connections=args.devices + args.report_clients)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        login = await client.post("/auth/login", json={"email": args.email, "password": args.password})
+        login.raise_for_status()
+        token = login.json()["access_token"]
+
+        async with httpx.AsyncClient(
+            base_url=base_url, limits=limits, timeout=30,
+            headers={"Authorization": f"Bearer {token}"},
+        ) as admin_client:
+            deadline = time.monotonic() + args.duration
+            tasks = [
+                device_loop(client, device_ids[i % len(device_ids)], deadline, args.interval, latencies, errors)
+                for i in range(args.devices)
+            ]
+            tasks += [
+                report_loop(admin_client, i, deadline, latencies, errors)
+                for i in range(args.report_clients)
+            ]
+            await asyncio.gather(*tasks)
+
+    print(f"{'endpoint':>18} | {'requests':>8} | {'errors':>6} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    for name in sorted(set(latencies) | set(errors)):
+        values = latencies.get(name) or [0.0]
+        print(
+            f"{name:>18} | {len(latencies.get(name, [])):>8} | {errors.get(name, 0):>6} | "
+            f"{percentile(values, 0.5):>8.1f} | {percentile(values, 0.95):>8.1f} | "
+            f"{percentile(values, 0.99):>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--devices", type=int, default=200, help="Concurrent simulated devices")
+    parser.add_argument("--report-clients", type=int, default=4, help="Concurrent report clients")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between device polls")
+    parser.add_argument("--duration", type=float, default=60.0, help="Test duration in seconds")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        device_ids = [str(row[0]) for row in db.query(Device.id).limit(args.devices).all()]
+    finally:
+        db.close()
+    if not device_ids:
+        print("Error: No devices registered")
+        sys.exit(1)
+
+    asyncio.run(run(args, device_ids))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Manage the monthly partitions of playback_logs (PostgreSQL).
+  list           partitions with their estimated row counts
+  maintain       create upcoming partitions and remove expired ones
+  check-pruning  EXPLAIN the report queries and fail unless they only
+                 scan the partitions overlapping the requested dates
+Usage: python -m scripts.manage_partitions list
+       python -m scripts.manage_partitions maintain [--retention-months 13] [--action drop]
+       python -m scripts.manage_partitions check-pruning
+"""
+import argparse
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text
+
+from app.config import settings
+from app.database import engine
+from app.utils.partitions import (
+    DEFAULT_PARTITION, PARENT_TABLE, RETENTION_ACTIONS, add_months, expired_partitions, is_partitioned,
+    list_partitions, maintain_partitions,
+)
+from app.utils.rollups import playback_counts
+
+def list_command(connection, args):
+    today = datetime.utcnow().date()
+    expired = set()
+    if settings.playback_log_retention_months > 0:
+        expired = {p.name for p in expired_partitions(connection, today, settings.playback_log_retention_months)}
+    estimates = dict(connection.execute(text(
+        "SELECT c.relname, c.reltuples::bigint FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass)"
+    ), {"table": PARENT_TABLE}).all())
+
+    for partition in list_partitions(connection):
+        note = "  (expired)" if partition.name in expired else ""
+        rows = max(estimates.get(partition.name, 0), 0)
+        print(f"{partition.name:<28} {partition.start} .. {partition.end}  ~{rows} rows{note}")
+    if DEFAULT_PARTITION in estimates:
+        print(f"{DEFAULT_PARTITION:<28} (other dates)             ~{max(estimates[DEFAULT_PARTITION], 0)} rows")
+
+
+def _relations(plan: dict):
+    # Scan nodes name their table in "Relation Name" (and an index scan's
+    # index separately), subplans are listed under "Plans"
+    if "Relation Name" in plan:
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from _relations(child)
+
+
+def scanned_partitions(connection, start_date, end_date):
+    """EXPLAIN the report aggregate over a date range; returns the partitions it scans."""
+    counts = playback_counts(start_date, end_date)
+    stmt = select(
+        func.sum(counts.c.play_count),
+        func.count(func.distinct(counts.c.device_id)),
+    )
+    compiled = stmt.compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar_one()
+    return {name for name in _relations(plan[0]["Plan"]) if name.startswith(f"{PARENT_TABLE}_")}
+
+
+def check_pruning_command(connection, args):
+    today = datetime.utcnow().date()
+    partitions = list_partitions(connection)
+    ranges = [
+        ("default report range", today - timedelta(days=30), today),
+        ("today", today, today),
+        ("previous month", add_months(today.replace(day=1), -1), today.replace(day=1) - timedelta(days=1)),
+    ]
+
+    starts = {p.start for p in partitions}
+    failed = False
+    for label, start_date, end_date in ranges:
+        expected = {p.name for p in partitions if p.start <= end_date and p.end > start_date}
+        month = start_date.replace(day=1)
+        while month <= end_date:
+            if month not in starts:
+                # Dates without a monthly partition are stored in the default one
+                expected.add(DEFAULT_PARTITION)
+            month = add_months(month, 1)
+        scanned = scanned_partitions(connection, start_date, end_date)
+        extra = scanned - expected
+        status = "ok" if not extra else "NOT PRUNED"
+        failed = failed or bool(extra)
+        print(f"{label:<22} {start_date} .. {end_date}: scans {len(scanned)} of {len(partitions)} partitions  {status}")
+        if extra:
+            print(f"  unexpected: {', '.join(sorted(extra))}")
+
+    if failed:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("list")
+    maintain = subcommands.add_parser("maintain")
+    maintain.add_argument("--retention-months", type=int, help="Defaults to PLAYBACK_LOG_RETENTION_MONTHS")
+    maintain.add_argument("--action", choices=RETENTION_ACTIONS, help="Defaults to PLAYBACK_LOG_RETENTION_ACTION")
+    subcommands.add_parser("check-pruning")
+    args = parser.parse_args()
+
+    if args.command == "maintain":
+        result = maintain_partitions(retention_months=args.retention_months, action=args.action)
+        for key, names in result.items():
+            print(f"{key}: {', '.join(names) or '-'}")
+        return
+
+    with engine.connect() as connection:
+        if not is_partitioned(connection):
+            print(f"{PARENT_TABLE} is not partitioned")
+            sys.exit(1)
+        if args.command == "list":
+            list_command(connection, args)
+        else:
+            check_pruning_command(connection, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+import app.models  # noqa: F401
+from app.models.store import Store
+from app.models.area import Area
+from app.models.device import Device
+from app.models.campaign import Campaign
+from app.models.media import Media, MediaType
+
+# Tests that need PostgreSQL run against this database; its public schema
+# is dropped and recreated for every test.
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+@pytest.fixture
+def pg_engine():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP SCHEMA public CASCADE")
+        connection.exec_driver_sql("CREATE SCHEMA public")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        # Migration 007 creates this one along with the monthly partitions
+        connection.exec_driver_sql("CREATE TABLE playback_logs_default PARTITION OF playback_logs DEFAULT")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+async def pg_async_engine(pg_engine):
+    url = make_url(TEST_DATABASE_URL).set(drivername="postgresql+asyncpg")
+    engine = create_async_engine(url)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def pg_fixtures(pg_engine):
+    """A device with a campaign and media to log plays for."""
+    with Session(pg_engine) as db:
+        store = Store(name="test", code="TEST")
+        db.add(store)
+        db.flush()
+        area = Area(store_id=store.id, name="test", code="TEST")
+        db.add(area)
+        db.flush()
+        device = Device(device_code="TEST", area_id=area.id)
+        campaign = Campaign(store_id=store.id, name="test", start_date=date.today(), end_date=date.today())
+        db.add_all([device, campaign])
+        db.flush()
+        media = Media(campaign_id=campaign.id, type=MediaType.IMAGE, filename="test.png", gcs_path="test.png")
+        db.add(media)
+        db.commit()
+        return {"device_id": device.id, "campaign_id": campaign.id, "media_id": media.id}
@@ -0,0 +1,56 @@
+import uuid
+
+import numpy as np
+import pytest
+
+from app.utils import hll
+
+
+def _ids(count):
+    return [uuid.uuid4() for _ in range(count)]
+
+
+@pytest.mark.parametrize("count", [0, 1, 100, 5000, 50000, 200000])
+def test_estimate_is_within_error_bounds(count):
+    estimate = hll.estimate(hll.sketch_of(_ids(count)))[0]
+    # 4 standard errors; linear counting is exact to within a few IDs
+    assert abs(estimate - count) <= max(4 * hll.RELATIVE_ERROR * count, 2)
+
+
+def test_adding_ids_again_does_not_change_the_sketch():
+    ids = _ids(1000)
+    sketch = hll.sketch_of(ids)
+    assert np.array_equal(hll.sketch_of(ids + ids[:500]), sketch)
+
+
+def test_merge_is_the_sketch_of_the_union():
+    shared = _ids(20000)
+    a = shared + _ids(10000)
+    b = shared + _ids(30000)
+    sketches = np.stack([hll.sketch_of(a), hll.sketch_of(b), hll.sketch_of(_ids(10))])
+
+    merged = hll.merge(sketches, np.array([0, 0, 1]), 2)
+
+    assert np.array_equal(merged[0], hll.sketch_of(a + b))
+    estimate = hll.estimate(merged)[0]
+    assert abs(estimate - 60000) <= 4 * hll.RELATIVE_ERROR * 60000
+    assert abs(hll.estimate(merged[1])[0] - 10) <= 2
+
+
+def test_add_hashes_fills_each_indexed_sketch():
+    a, b = _ids(300), _ids(3000)
+    sketches = hll.empty(2)
+    hll.add_hashes(
+        sketches,
+        np.array([0] * len(a) + [1] * len(b), dtype=np.intp),
+        hll.hash_uuids(a + b),
+    )
+    assert np.array_equal(sketches[0], hll.sketch_of(a))
+    assert np.array_equal(sketches[1], hll.sketch_of(b))
+
+
+def test_bytes_round_trip():
+    sketch = hll.sketch_of(_ids(100))
+    data = hll.to_bytes(sketch)
+    assert len(data) == hll.REGISTERS
+    assert np.array_equal(hll.from_bytes(data), sketch)
@@ -0,0 +1,171 @@
+import gzip
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+from starlette.requests import Request
+
+from app.utils.log_formats import (
+    LogBodyTooLarge, LogFormatError, LogValidationError, iter_lines, iter_request_body, read_compact_logs,
+    read_json_logs,
+)
+
+SYNCED_AT = datetime(2026, 3, 1, 12, 0)
+
+
+def _request(body: bytes, chunk_size: int = 1024, encoding: str = None) -> Request:
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    headers = [(b"content-encoding", encoding.encode())] if encoding else []
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive)
+
+
+async def _read(body: bytes, max_bytes: int = 1 << 20, **kwargs) -> bytes:
+    return b"".join([chunk async for chunk in iter_request_body(_request(body, **kwargs), max_bytes)])
+
+
+async def _logs(*lines):
+    async def source():
+        for line in lines:
+            yield json.dumps(line).encode()
+    return await read_compact_logs(source(), SYNCED_AT)
+
+
+HEADER = {"device_id": str(uuid.uuid4()), "media": [str(uuid.uuid4())], "campaigns": [str(uuid.uuid4())]}
+
+
+async def test_gzip_body_is_decoded():
+    body = b"line\n" * 10000
+    assert await _read(gzip.compress(body), chunk_size=100, encoding="gzip") == body
+
+
+async def test_gzip_body_is_capped_while_decoding():
+    # 10 MB of zeros compresses to about 10 KB
+    with pytest.raises(LogBodyTooLarge):
+        await _read(gzip.compress(bytes(10 << 20)), max_bytes=1 << 20, encoding="gzip")
+    with pytest.raises(LogBodyTooLarge):
+        await _read(b"x" * 2000, max_bytes=1000)
+
+
+@pytest.mark.parametrize("body, encoding", [
+    (b"not gzip", "gzip"),
+    (gzip.compress(b"line\n")[:-10], "gzip"),
+    (b"line\n", "br"),
+])
+async def test_bad_encodings_are_rejected(body, encoding):
+    with pytest.raises(LogFormatError):
+        await _read(body, encoding=encoding)
+
+
+async def test_iter_lines_joins_chunks():
+    async def chunks():
+        for chunk in (b"a", b"b\n\nc", b"d\n", b"e"):
+            yield chunk
+    assert [line async for line in iter_lines(chunks())] == [b"ab", b"cd", b"e"]
+
+
+async def test_compact_logs():
+    event_id = str(uuid.uuid4())
+    device_id, rows = await _logs(
+        HEADER,
+        [0, 0, 1772366400],
+        [0, 0, "2026-03-01T21:00:00+09:00", event_id],
+    )
+    assert device_id == uuid.UUID(HEADER["device_id"])
+    assert [row.played_at for row in rows] == [datetime(2026, 3, 1, 12, 0)] * 2
+    assert rows[0].event_id is None
+    assert rows[1].event_id == uuid.UUID(event_id)
+    assert rows[0].media_id == uuid.UUID(HEADER["media"][0])
+
+
+@pytest.mark.parametrize("played_at", [
+    float("nan"), float("inf"), -float("inf"), 1e20, -1e20, 10 ** 400,
+    "0001-01-01T00:00:00+01:00", "not a date", True, None,
+])
+async def test_invalid_played_at_is_a_format_error(played_at):
+    with pytest.raises(LogFormatError):
+        await _logs(HEADER, [0, 0, played_at])
+
+
+@pytest.mark.parametrize("lines", [
+    [[0, 0, 0]],
+    [{"device_id": "x"}],
+    [{**HEADER, "media": 5}],
+    [HEADER, [1, 0, 0]],
+    [HEADER, [0, 0]],
+    [HEADER, [0, 0, 0, "not a uuid"]],
+    [HEADER, [True, 0, 0]],
+    [HEADER, [0, False, 0]],
+])
+async def test_invalid_lines_are_format_errors(lines):
+    with pytest.raises(LogFormatError):
+        await _logs(*lines)
+
+
+async def _json_logs(body: bytes, chunk_size: int = 1024):
+    async def chunks():
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+    return await read_json_logs(chunks(), SYNCED_AT)
+
+
+def _json_log(device_id, **fields):
+    return {
+        "device_id": device_id, "media_id": HEADER["media"][0],
+        "campaign_id": HEADER["campaigns"][0], "played_at": "2026-03-01T12:00:00", **fields,
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024])
+async def test_json_logs_are_read_across_chunks(chunk_size):
+    device_id = HEADER["device_id"]
+    event_id = str(uuid.uuid4())
+    body = json.dumps([
+        _json_log(device_id),
+        _json_log(str(uuid.uuid4())),
+        _json_log(device_id, event_id=event_id, note="日本語"),
+    ], indent=1).encode()
+
+    read_device_id, rows = await _json_logs(body, chunk_size)
+
+    assert read_device_id == uuid.UUID(device_id)
+    # The second log belongs to another device
+    assert [row.event_id for row in rows] == [None, uuid.UUID(event_id)]
+    assert {row.played_at for row in rows} == {datetime(2026, 3, 1, 12, 0)}
+    assert {row.synced_at for row in rows} == {SYNCED_AT}
+
+
+async def test_empty_json_array():
+    assert await _json_logs(b" [ ] ") == (None, [])
+
+
+@pytest.mark.parametrize("body", [
+    b"",
+    b"{}",
+    b"[",
+    b"[LOG",
+    b"[LOG, ]",
+    b"[LOG LOG]",
+    b"[LOG] []",
+    b"[\xff]",
+    b'[{"x": "' + b"a" * (100 * 1024) + b'"}]',
+])
+async def test_invalid_json_arrays_are_format_errors(body):
+    log = json.dumps(_json_log(HEADER["device_id"])).encode()
+    with pytest.raises(LogFormatError):
+        await _json_logs(body.replace(b"LOG", log), chunk_size=100)
+
+
+async def test_invalid_json_logs_are_located():
+    body = json.dumps([_json_log(HEADER["device_id"]), _json_log("x")]).encode()
+    with pytest.raises(LogValidationError) as e:
+        await _json_logs(body)
+    assert [error["loc"] for error in e.value.errors] == [(1, "device_id")]
@@ -0,0 +1,85 @@
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.playback_log import PlaybackLog
+from app.schemas.playback_log import PlaybackLogCreate
+from app.utils.log_ingest import (
+    RecentEventFilter, build_playback_log_rows, drop_unknown_references, insert_playback_log_rows_async,
+)
+
+
+def _logs(ids, count, event_ids=True, device_id=None):
+    played_at = datetime(2026, 1, 1)
+    return [
+        PlaybackLogCreate(
+            device_id=device_id or ids["device_id"],
+            media_id=ids["media_id"],
+            campaign_id=ids["campaign_id"],
+            played_at=played_at + timedelta(seconds=i),
+            event_id=uuid.uuid4() if event_ids else None,
+        )
+        for i in range(count)
+    ]
+
+
+def _rows(ids, logs):
+    return build_playback_log_rows(logs, ids["device_id"], datetime.utcnow())
+
+
+def test_build_rows_skips_other_devices():
+    ids = {"device_id": uuid.uuid4(), "media_id": uuid.uuid4(), "campaign_id": uuid.uuid4()}
+    logs = _logs(ids, 3) + _logs(ids, 2, device_id=uuid.uuid4())
+    assert len(_rows(ids, logs)) == 3
+
+
+def test_recent_event_filter_drops_repeats_and_evicts():
+    ids = {"device_id": uuid.uuid4(), "media_id": uuid.uuid4(), "campaign_id": uuid.uuid4()}
+    rows = _rows(ids, _logs(ids, 3))
+    event_filter = RecentEventFilter(max_size=2)
+
+    assert event_filter.drop_seen(rows + rows[:1]) == rows
+    event_filter.remember(rows)
+    # Only the two most recent IDs are remembered
+    assert event_filter.drop_seen(rows) == rows[:1]
+    assert event_filter.stats() == {"size": 2, "dropped": 3}
+
+    no_event = _rows(ids, _logs(ids, 2, event_ids=False))
+    event_filter.remember(no_event)
+    assert event_filter.drop_seen(no_event + no_event) == no_event + no_event
+
+
+async def test_async_insert_with_event_ids_in_fresh_session(pg_async_engine, pg_fixtures):
+    # Nothing has run on the session before the raw COPY, as when the
+    # presence cache already knows the device.
+    rows = _rows(pg_fixtures, _logs(pg_fixtures, 50))
+    async with AsyncSession(pg_async_engine) as db:
+        assert await insert_playback_log_rows_async(db, rows) == 50
+        await db.commit()
+
+    async with AsyncSession(pg_async_engine) as db:
+        # Retried batch: stored events are skipped, new ones inserted
+        retry = rows[:10] + _rows(pg_fixtures, _logs(pg_fixtures, 5))
+        assert await insert_playback_log_rows_async(db, retry) == 5
+        await db.commit()
+        assert await db.scalar(select(func.count()).select_from(PlaybackLog)) == 55
+
+
+async def test_async_insert_is_rolled_back_with_the_session(pg_async_engine, pg_fixtures):
+    for event_ids in (True, False):
+        rows = _rows(pg_fixtures, _logs(pg_fixtures, 20, event_ids=event_ids))
+        async with AsyncSession(pg_async_engine) as db:
+            assert await insert_playback_log_rows_async(db, rows) == 20
+            await db.rollback()
+
+    async with AsyncSession(pg_async_engine) as db:
+        assert await db.scalar(select(func.count()).select_from(PlaybackLog)) == 0
+
+
+async def test_drop_unknown_references(pg_async_engine, pg_fixtures):
+    rows = _rows(pg_fixtures, _logs(pg_fixtures, 3))
+    unknown = [rows[1]._replace(media_id=uuid.uuid4()), rows[2]._replace(campaign_id=uuid.uuid4())]
+    async with AsyncSession(pg_async_engine) as db:
+        assert await drop_unknown_references(db, rows[:1] + unknown) == rows[:1]
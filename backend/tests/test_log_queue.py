@@ -0,0 +1,92 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.playback_log import PlaybackLog
+from app.utils import log_queue
+from app.utils.log_ingest import PlaybackLogRow
+from app.utils.log_queue import PlaybackLogQueue
+
+
+def _rows(ids, count):
+    now = datetime.utcnow()
+    return [
+        PlaybackLogRow(
+            uuid.uuid4(), ids["device_id"], ids["media_id"], ids["campaign_id"],
+            datetime(2026, 1, 1) + timedelta(seconds=i), now, uuid.uuid4(),
+        )
+        for i in range(count)
+    ]
+
+
+class _FakeSession:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_rows_violating_constraints_are_dropped(pg_engine, pg_fixtures):
+    rows = _rows(pg_fixtures, 10)
+    # Media deleted after the logs were accepted
+    rows[3] = rows[3]._replace(media_id=uuid.uuid4())
+    rows[7] = rows[7]._replace(campaign_id=uuid.uuid4())
+    queue = PlaybackLogQueue(max_rows=100, batch_rows=10, max_retries=3)
+    assert queue.put(rows)
+
+    with Session(pg_engine) as db:
+        assert queue.flush(db) == 8
+        assert db.scalar(select(func.count()).select_from(PlaybackLog)) == 8
+
+    stats = queue.stats()
+    assert stats["depth_rows"] == 0
+    assert stats["dropped_rows"] == 2
+    assert stats["flushed_rows"] == 8
+
+
+def test_failing_batch_is_dropped_after_max_retries(monkeypatch):
+    def fail(db, rows):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(log_queue, "insert_playback_log_rows", fail)
+    ids = {"device_id": uuid.uuid4(), "media_id": uuid.uuid4(), "campaign_id": uuid.uuid4()}
+    queue = PlaybackLogQueue(max_rows=100, batch_rows=10, max_retries=3)
+    queue.put(_rows(ids, 5))
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            queue.flush(_FakeSession())
+        # Kept at the front for the next attempt
+        assert queue.depth() == 5
+
+    with pytest.raises(RuntimeError):
+        queue.flush(_FakeSession())
+    stats = queue.stats()
+    assert stats["depth_rows"] == 0
+    assert stats["dropped_rows"] == 5
+    assert stats["failed_flushes"] == 3
+
+
+def test_failed_rows_keep_their_order(monkeypatch):
+    calls = []
+
+    def fail_once(db, rows):
+        calls.append(rows)
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(log_queue, "insert_playback_log_rows", fail_once)
+    ids = {"device_id": uuid.uuid4(), "media_id": uuid.uuid4(), "campaign_id": uuid.uuid4()}
+    rows = _rows(ids, 6)
+    queue = PlaybackLogQueue(max_rows=100, batch_rows=4, max_retries=3)
+    queue.put(rows)
+
+    with pytest.raises(RuntimeError):
+        queue.flush(_FakeSession())
+    assert queue.flush(_FakeSession()) == 6
+    written = [row.id for batch in calls[1:] for row in batch]
+    assert written == [row.id for row in rows]
@@ -0,0 +1,90 @@
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.media_blob import MediaBlob
+from app.utils import storage
+from app.utils.media_blobs import blob_path_for, release_blob, store_blob
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "_storage", storage.LocalStorage(str(tmp_path), "http://test/media"))
+    return tmp_path
+
+
+async def _chunks(data: bytes):
+    yield data
+
+
+def _stored_files(root):
+    return sorted(p.relative_to(root).as_posix() for p in root.rglob("*") if p.is_file())
+
+
+def _row_is_locked(engine, content_hash: str) -> bool:
+    with engine.connect() as connection:
+        try:
+            connection.execute(
+                text("SELECT 1 FROM media_blobs WHERE content_hash = :hash FOR UPDATE NOWAIT"),
+                {"hash": content_hash},
+            )
+        except OperationalError:
+            return True
+        finally:
+            connection.rollback()
+    return False
+
+
+def test_blob_paths_are_unique_per_copy():
+    content_hash = "ab" * 32
+    first, second = blob_path_for(content_hash, "a.PNG"), blob_path_for(content_hash, "b.png")
+    assert first != second
+    assert first.startswith(f"blobs/ab/{content_hash}-") and first.endswith(".png")
+
+
+async def test_same_content_is_stored_once_and_released(pg_engine, local_storage):
+    with Session(pg_engine) as db:
+        first = await store_blob(db, _chunks(b"creative"), "a.mp4", "video/mp4")
+        second = await store_blob(db, _chunks(b"creative"), "b.mp4", "video/mp4")
+        assert first.content_hash == second.content_hash
+        assert db.get(MediaBlob, first.content_hash).ref_count == 2
+        assert _stored_files(local_storage) == [first.storage_path]
+
+        await release_blob(db, first.content_hash)
+        assert db.get(MediaBlob, first.content_hash).ref_count == 1
+        await release_blob(db, first.content_hash)
+        assert db.get(MediaBlob, first.content_hash) is None
+        assert _stored_files(local_storage) == []
+
+
+async def test_store_blob_commits_without_holding_the_lock(pg_engine, local_storage):
+    with Session(pg_engine) as db:
+        blob = await store_blob(db, _chunks(b"creative"), "a.mp4", "video/mp4")
+        assert not _row_is_locked(pg_engine, blob.content_hash)
+        blob = await store_blob(db, _chunks(b"creative"), "a.mp4", "video/mp4")
+        assert not _row_is_locked(pg_engine, blob.content_hash)
+
+
+async def test_store_blob_times_out_on_a_blob_locked_elsewhere(pg_engine, local_storage, monkeypatch):
+    monkeypatch.setattr(settings, "media_blob_lock_timeout_seconds", 0.2)
+    with Session(pg_engine) as db:
+        blob = await store_blob(db, _chunks(b"creative"), "a.mp4", "video/mp4")
+        content_hash = blob.content_hash
+
+    with pg_engine.connect() as other:
+        other.execute(
+            text("SELECT 1 FROM media_blobs WHERE content_hash = :hash FOR UPDATE"), {"hash": content_hash},
+        )
+        with Session(pg_engine) as db:
+            started = time.monotonic()
+            with pytest.raises(OperationalError, match="lock timeout"):
+                await store_blob(db, _chunks(b"creative"), "b.mp4", "video/mp4")
+            assert time.monotonic() - started < 5
+        other.rollback()
+
+    # The staged copy was cleaned up
+    assert _stored_files(local_storage) == [blob.storage_path]
@@ -0,0 +1,50 @@
+import hashlib
+
+import pytest
+
+from app.utils import media_files
+from app.utils.media_blobs import blob_path_for
+from app.utils.media_files import MediaFiles
+
+CONTENT = b"image bytes"
+CONTENT_HASH = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch):
+    """Store a file under the media root; returns its path and the hashed file names."""
+    hashed = []
+    real_hash_file = media_files._hash_file
+
+    def hash_file(path):
+        hashed.append(path)
+        return real_hash_file(path)
+
+    monkeypatch.setattr(media_files, "_hash_file", hash_file)
+
+    def store(relative):
+        path = tmp_path / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(CONTENT)
+        return path
+
+    yield MediaFiles(str(tmp_path)), store, hashed
+
+
+async def test_blob_etag_is_taken_from_its_name(served):
+    files, store, hashed = served
+    blob = store(blob_path_for(CONTENT_HASH, "photo.PNG"))
+    rendition = store(f"{blob.parent}/{blob.stem}-1280x720.webp")
+
+    for path in [blob, rendition]:
+        assert await files._etag(path, path.stat()) == f'"{path.stem}"'
+    assert hashed == []
+
+
+async def test_other_files_are_hashed_once(served):
+    files, store, hashed = served
+    path = store("0f2c1e8a-5d7b-4c1e-9a3f-6b8d2e4f1a7c.png")
+
+    assert await files._etag(path, path.stat()) == f'"{CONTENT_HASH}"'
+    assert await files._etag(path, path.stat()) == f'"{CONTENT_HASH}"'
+    assert hashed == [str(path)]
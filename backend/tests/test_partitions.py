@@ -0,0 +1,99 @@
+import uuid
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.models.playback_log import PlaybackLog
+from app.models.playback_rollup import RollupWatermark
+from app.utils import partitions
+from app.utils.partitions import DEFAULT_PARTITION, list_partitions, maintain_partitions
+from app.utils.rollups import PLAYBACK_WATERMARK
+from scripts.manage_partitions import scanned_partitions
+
+TODAY = date(2026, 3, 15)
+
+
+@pytest.fixture
+def partitioned(pg_engine, monkeypatch):
+    monkeypatch.setattr(partitions, "engine", pg_engine)
+    monkeypatch.setattr(partitions.settings, "playback_log_partition_months_ahead", 2)
+    return pg_engine
+
+
+def _add_log(db, ids, played_at):
+    db.add(PlaybackLog(
+        id=uuid.uuid4(), device_id=ids["device_id"], media_id=ids["media_id"],
+        campaign_id=ids["campaign_id"], played_at=played_at, created_at=datetime(2026, 1, 1),
+    ))
+    db.commit()
+
+
+def test_rows_in_default_partition_are_moved(partitioned, pg_fixtures):
+    with Session(partitioned) as db:
+        # Stored before April had a partition
+        _add_log(db, pg_fixtures, datetime(2026, 4, 2))
+        _add_log(db, pg_fixtures, datetime(2030, 1, 1))
+
+    result = maintain_partitions(today=TODAY, retention_months=0)
+    assert result["created"] == [
+        "playback_logs_p2026_03", "playback_logs_p2026_04", "playback_logs_p2026_05",
+    ]
+    assert result["failed"] == []
+
+    with Session(partitioned) as db:
+        tables = db.execute(text("SELECT tableoid::regclass::text FROM playback_logs ORDER BY played_at")).scalars().all()
+        assert tables == ["playback_logs_p2026_04", DEFAULT_PARTITION]
+        # The default partition is attached again
+        assert db.execute(text(
+            "SELECT count(*) FROM pg_inherits WHERE inhrelid = CAST(:name AS regclass)"
+        ), {"name": DEFAULT_PARTITION}).scalar_one() == 1
+
+
+def test_failed_partition_does_not_block_the_others(partitioned, monkeypatch):
+    create = partitions.create_partition
+
+    def create_except_april(connection, month):
+        if month == date(2026, 4, 1):
+            raise RuntimeError("lock timeout")
+        return create(connection, month)
+
+    monkeypatch.setattr(partitions, "create_partition", create_except_april)
+    result = maintain_partitions(today=TODAY, retention_months=0)
+    assert result["created"] == ["playback_logs_p2026_03", "playback_logs_p2026_05"]
+    assert result["failed"] == ["playback_logs_p2026_04"]
+
+    monkeypatch.setattr(partitions, "create_partition", create)
+    assert maintain_partitions(today=TODAY, retention_months=0)["created"] == ["playback_logs_p2026_04"]
+
+
+def test_detached_partition_has_no_foreign_keys(partitioned, pg_fixtures):
+    with partitioned.begin() as connection:
+        partitions.create_partition(connection, date(2025, 1, 1))
+    with Session(partitioned) as db:
+        _add_log(db, pg_fixtures, datetime(2025, 1, 10))
+        db.add(RollupWatermark(name=PLAYBACK_WATERMARK, rolled_up_until=datetime(2026, 2, 1)))
+        db.commit()
+
+    result = maintain_partitions(today=TODAY, retention_months=12, action="detach")
+    assert result["removed"] == ["playback_logs_p2025_01"]
+
+    with Session(partitioned) as db:
+        assert "playback_logs_p2025_01" not in {p.name for p in list_partitions(db.connection())}
+        assert db.execute(text(
+            "SELECT count(*) FROM pg_constraint WHERE conrelid = 'playback_logs_p2025_01'::regclass AND contype = 'f'"
+        )).scalar_one() == 0
+        assert db.execute(text("SELECT count(*) FROM playback_logs_p2025_01")).scalar_one() == 1
+        assert db.scalar(select(func.count()).select_from(PlaybackLog)) == 0
+
+
+@pytest.mark.parametrize("start_date, end_date, expected", [
+    (date(2026, 4, 1), date(2026, 4, 30), {"playback_logs_p2026_04"}),
+    (date(2026, 3, 20), date(2026, 4, 10), {"playback_logs_p2026_03", "playback_logs_p2026_04"}),
+    (date(2030, 1, 1), date(2030, 1, 31), {DEFAULT_PARTITION}),
+])
+def test_report_queries_scan_only_overlapping_partitions(partitioned, start_date, end_date, expected):
+    maintain_partitions(today=TODAY, retention_months=0)
+    with partitioned.connect() as connection:
+        assert scanned_partitions(connection, start_date, end_date) == expected
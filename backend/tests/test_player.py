@@ -0,0 +1,134 @@
+import json
+import uuid
+
+import pytest
+from starlette.requests import Request
+
+from app.models.media import MediaType
+from app.config import settings
+from app.routers import player
+from app.routers.player import etag_matches, get_playlist, get_playlist_delta, submit_playback_logs
+from app.utils.log_ingest import RecentEventFilter
+from app.utils.log_queue import PlaybackLogQueue
+from app.utils.playlist_cache import PlaylistCache
+from app.utils.playlist_compiler import CompiledPlaylist, PlaylistEntry
+
+AREA_ID = uuid.uuid4()
+DEVICE_ID = uuid.uuid4()
+
+
+def _entry(name, duration=10):
+    return PlaylistEntry(
+        media_id=uuid.uuid5(uuid.NAMESPACE_OID, name), campaign_id=AREA_ID,
+        gcs_path=f"media/{name}", type=MediaType.IMAGE, duration_seconds=duration,
+        filename=name,
+    )
+
+
+class _FakeSession:
+    async def run_sync(self, fn, *args):
+        return fn(self, *args)
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Serve the given playlist for the device's area, through a fresh cache."""
+    cache = PlaylistCache(history_size=5)
+
+    async def sync_device(db, device_id):
+        return AREA_ID
+
+    def use(playlist):
+        cache.get_or_build(AREA_ID, (None, playlist.url_epoch), lambda: playlist)
+        monkeypatch.setattr(player, "get_area_playlist", lambda db, area_id: playlist)
+        return playlist
+
+    monkeypatch.setattr(player, "sync_device", sync_device)
+    monkeypatch.setattr(player, "get_playlist_cache", lambda: cache)
+    yield use
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ('"x",W/"abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+    ("abc", False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+async def test_playlist_not_modified(serve):
+    playlist = serve(CompiledPlaylist([_entry("a")]))
+    response = await get_playlist(
+        player.Response(), DEVICE_ID, None, None, f'W/"{playlist.version}"', _FakeSession()
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == f'"{playlist.version}"'
+
+
+async def test_delta_lists_changes(serve):
+    base = serve(CompiledPlaylist([_entry("a"), _entry("b"), _entry("c")]))
+    current = serve(CompiledPlaylist([_entry("c"), _entry("a", duration=20), _entry("d")]))
+
+    delta = await get_playlist_delta(DEVICE_ID, base.version, None, None, _FakeSession())
+
+    assert (delta.full, delta.base_version, delta.version) == (False, base.version, current.version)
+    assert [item.filename for item in delta.added] == ["a", "d"]
+    assert delta.removed == [_entry("b").media_id]
+    assert delta.order == [e.media_id for e in current.entries]
+
+
+async def test_delta_without_changes(serve):
+    playlist = serve(CompiledPlaylist([_entry("a")]))
+    delta = await get_playlist_delta(DEVICE_ID, playlist.version, None, None, _FakeSession())
+    assert (delta.full, delta.added, delta.removed, delta.order) == (False, [], [], None)
+
+
+async def test_delta_falls_back_to_full_playlist(serve):
+    base = serve(CompiledPlaylist([_entry("a")], url_epoch=1))
+    current = serve(CompiledPlaylist([_entry("a"), _entry("b")], url_epoch=2))
+
+    for since in ["unknown", base.version]:
+        delta = await get_playlist_delta(DEVICE_ID, since, None, None, _FakeSession())
+        assert delta.full and delta.base_version is None
+        assert [item.media_id for item in delta.items] == [e.media_id for e in current.entries]
+
+
+async def test_queued_logs_are_accepted_without_querying(monkeypatch):
+    class _NoQuerySession(_FakeSession):
+        async def execute(self, *args, **kwargs):
+            raise AssertionError("queued logs must not query the database")
+
+    class _Presence:
+        def get_area_id(self, db, device_id):
+            return AREA_ID
+
+    queue = PlaybackLogQueue(max_rows=10, batch_rows=10, max_retries=1)
+    monkeypatch.setattr(settings, "playback_log_queue_enabled", True)
+    monkeypatch.setattr(player, "get_log_queue", lambda: queue)
+    monkeypatch.setattr(player, "get_presence_tracker", lambda: _Presence())
+    monkeypatch.setattr(player, "get_recent_event_filter", lambda: RecentEventFilter(10))
+
+    # Unknown media is left for the writer to drop
+    body = json.dumps([{
+        "device_id": str(DEVICE_ID), "media_id": str(uuid.uuid4()),
+        "campaign_id": str(uuid.uuid4()), "played_at": "2026-03-01T12:00:00",
+    }]).encode()
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        return messages.pop(0)
+
+    request = Request({"type": "http", "method": "POST", "headers": []}, receive)
+    response = player.Response()
+    result = await submit_playback_logs(request, response, _NoQuerySession())
+
+    assert response.status_code == 202
+    assert result == {"message": "Accepted 1 logs"}
+    assert queue.depth() == 1
@@ -0,0 +1,115 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+from app.utils import report_cache
+from app.utils.report_cache import ReportCache
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(report_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+class _Report:
+    def __init__(self):
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        return self.calls
+
+
+def _cache(**kwargs):
+    options = {"max_entries": 10, "ttl": 60, "historical_ttl": 3600, "stale_seconds": 300, **kwargs}
+    return ReportCache(**options)
+
+
+async def test_ttl_depends_on_the_range(clock):
+    cache = _cache(stale_seconds=0)
+    current, historical = _Report(), _Report()
+    yesterday = TODAY - timedelta(days=1)
+
+    assert await cache.get_or_compute("r", ("current",), TODAY, current) == 1
+    assert await cache.get_or_compute("r", ("old",), yesterday, historical) == 1
+    clock[0] += 61
+    assert await cache.get_or_compute("r", ("current",), TODAY, current) == 2
+    assert await cache.get_or_compute("r", ("old",), yesterday, historical) == 1
+    clock[0] += 3600
+    assert await cache.get_or_compute("r", ("old",), yesterday, historical) == 2
+
+
+async def test_stale_result_is_served_while_refreshing(clock):
+    cache = _cache()
+    report = _Report()
+    assert await cache.get_or_compute("r", (), TODAY, report) == 1
+
+    clock[0] += 61
+    report.release = asyncio.Event()
+    # Both get the stale value; only one refresh starts
+    assert await cache.get_or_compute("r", (), TODAY, report) == 1
+    assert await cache.get_or_compute("r", (), TODAY, report) == 1
+    report.release.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert report.calls == 2
+    assert await cache.get_or_compute("r", (), TODAY, report) == 2
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"], stats["refreshes"]) == (1, 2, 1, 1)
+
+    # Past the stale window the caller waits for a new result
+    clock[0] += 61 + 300
+    report.release = None
+    assert await cache.get_or_compute("r", (), TODAY, report) == 3
+
+
+async def test_concurrent_misses_share_one_computation(clock):
+    cache = _cache()
+    report = _Report()
+    report.release = asyncio.Event()
+    waiters = [asyncio.create_task(cache.get_or_compute("r", (), TODAY, report)) for _ in range(5)]
+    await asyncio.sleep(0)
+    report.release.set()
+    assert await asyncio.gather(*waiters) == [1] * 5
+    assert report.calls == 1
+
+
+async def test_result_computed_across_an_invalidation_is_not_stored(clock):
+    cache = _cache()
+    report = _Report()
+    report.release = asyncio.Event()
+    waiter = asyncio.create_task(cache.get_or_compute("r", (), TODAY, report))
+    await asyncio.sleep(0)
+    cache.invalidate()
+    report.release.set()
+    assert await waiter == 1
+
+    report.release = None
+    assert await cache.get_or_compute("r", (), TODAY, report) == 2
+    assert await cache.get_or_compute("r", (), TODAY, report) == 2
+    cache.invalidate()
+    assert await cache.get_or_compute("r", (), TODAY, report) == 3
+
+
+async def test_failed_computation_is_not_cached(clock):
+    cache = _cache()
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        raise RuntimeError("database unavailable")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("r", (), TODAY, failing)
+    assert len(attempts) == 2
+    assert cache.stats()["size"] == 0
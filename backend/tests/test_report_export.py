@@ -0,0 +1,63 @@
+import codecs
+import io
+import threading
+from datetime import datetime, timezone
+
+import pyarrow.parquet as pq
+import pytest
+
+from app.utils import executors, report_export
+from app.utils.report_export import ExportColumn, csv_chunks, in_chunks, parquet_chunks
+
+COLUMNS = [ExportColumn("name", "string"), ExportColumn("plays", "int"), ExportColumn("played_at", "timestamp")]
+ROWS = [
+    ("店舗A", 3, datetime(2026, 1, 1, 9, 30)),
+    ("b,\"c\"", None, None),
+    ("d", 5, datetime(2026, 1, 2)),
+]
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(report_export.settings, "report_export_chunk_rows", 2)
+    yield
+    executors.shutdown_executors()
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+async def test_csv_chunks(monkeypatch):
+    threads = set()
+    csv_value = report_export._csv_value
+
+    def recording_csv_value(value):
+        if isinstance(value, datetime):
+            threads.add(threading.current_thread().name)
+        return csv_value(value)
+
+    monkeypatch.setattr(report_export, "_csv_value", recording_csv_value)
+    chunks = await _collect(csv_chunks(COLUMNS, in_chunks(ROWS)))
+
+    assert len(chunks) == 3
+    assert chunks[0] == codecs.BOM_UTF8 + b"name,plays,played_at\r\n"
+    assert b"".join(chunks[1:]).decode() == (
+        "店舗A,3,2026-01-01T09:30:00\r\n"
+        "\"b,\"\"c\"\"\",,\r\n"
+        "d,5,2026-01-02T00:00:00\r\n"
+    )
+    # Rows are encoded in the IO pool, not on the event loop
+    assert threads and all(name.startswith("io") for name in threads)
+
+
+async def test_parquet_chunks():
+    chunks = await _collect(parquet_chunks(COLUMNS, in_chunks(ROWS)))
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert table.column_names == ["name", "plays", "played_at"]
+    assert table.column("name").to_pylist() == ["店舗A", "b,\"c\"", "d"]
+    assert table.column("plays").to_pylist() == [3, None, 5]
+    assert table.column("played_at").to_pylist()[0] == datetime(2026, 1, 1, 9, 30, tzinfo=timezone.utc)
@@ -0,0 +1,40 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.playback_log import PlaybackLog
+from app.routers.reports import _build_summary
+
+
+@pytest.mark.parametrize("exact", [True, False])
+async def test_summary_is_one_statement(pg_engine, pg_async_engine, pg_fixtures, exact):
+    with Session(pg_engine) as db:
+        db.add(PlaybackLog(
+            device_id=pg_fixtures["device_id"], media_id=pg_fixtures["media_id"],
+            campaign_id=pg_fixtures["campaign_id"], played_at=datetime(2026, 3, 1, 12),
+        ))
+        db.commit()
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with AsyncSession(pg_async_engine) as db:
+        # Connection setup queries are not part of the summary
+        await db.connection()
+        event.listen(pg_async_engine.sync_engine, "before_cursor_execute", count)
+        try:
+            summary = await _build_summary(db, date(2026, 3, 1), date(2026, 3, 31), exact)
+        finally:
+            event.remove(pg_async_engine.sync_engine, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    assert summary["playback"] == {"total_plays": 1, "active_devices": 1, "active_campaigns": 1}
+    if exact:
+        assert summary["inventory"] == {
+            "total_stores": 1, "total_areas": 1, "total_devices": 1, "total_campaigns": 1, "exact": True,
+        }
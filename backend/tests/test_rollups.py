@@ -0,0 +1,77 @@
+import time
+from datetime import date, datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.device import Device
+from app.models.playback_log import PlaybackLog
+from app.models.playback_rollup import PlaybackDaily, RollupWatermark
+from app.utils.log_ingest import build_playback_log_rows
+from app.utils.rollups import PLAYBACK_WATERMARK, PlaybackRollupCompactor, playback_counts
+from app.schemas.playback_log import PlaybackLogCreate
+
+
+def _insert_log(db, ids):
+    log = PlaybackLogCreate(
+        device_id=ids["device_id"], media_id=ids["media_id"],
+        campaign_id=ids["campaign_id"], played_at=datetime(2026, 1, 1),
+    )
+    rows = build_playback_log_rows([log], ids["device_id"], datetime.utcnow())
+    db.add(PlaybackLog(**rows[0]._asdict()))
+    db.flush()
+
+
+def _play_count(db):
+    return db.scalar(select(func.coalesce(func.sum(PlaybackDaily.play_count), 0)))
+
+
+def test_logs_committed_late_are_not_skipped(pg_engine, pg_fixtures, monkeypatch):
+    monkeypatch.setattr(settings, "playback_rollup_lag_seconds", 0)
+    compactor = PlaybackRollupCompactor()
+
+    with Session(pg_engine) as slow:
+        _insert_log(slow, pg_fixtures)
+        time.sleep(0.05)
+        with Session(pg_engine) as db:
+            _insert_log(db, pg_fixtures)
+            db.commit()
+
+        with Session(pg_engine) as db:
+            compactor.compact(db)
+            assert _play_count(db) == 0
+            watermark = db.get(RollupWatermark, PLAYBACK_WATERMARK).rolled_up_until
+            assert watermark is None or watermark <= db.scalar(select(func.min(PlaybackLog.created_at)))
+
+        # The log stamped at the start of the slow transaction becomes
+        # visible only now, after a later log was already committed
+        slow.commit()
+
+    with Session(pg_engine) as db:
+        compactor.compact(db)
+        assert _play_count(db) == 2
+
+
+def test_created_at_is_stamped_by_the_database(pg_engine, pg_fixtures):
+    with Session(pg_engine) as db:
+        _insert_log(db, pg_fixtures)
+        started = db.scalar(select(func.timezone("utc", func.now())))
+        assert db.scalar(select(PlaybackLog.created_at)) == started
+        db.rollback()
+
+
+def test_plays_of_deleted_devices_are_not_counted(pg_engine, pg_fixtures, monkeypatch):
+    monkeypatch.setattr(settings, "playback_rollup_lag_seconds", 0)
+    with Session(pg_engine) as db:
+        _insert_log(db, pg_fixtures)
+        db.commit()
+        PlaybackRollupCompactor().compact(db)
+        counts = playback_counts(date(2026, 1, 1), date(2026, 1, 1))
+        assert db.scalar(select(func.sum(counts.c.play_count))) == 1
+
+        # Deleting the device deletes its logs but not their rollups
+        db.delete(db.get(Device, pg_fixtures["device_id"]))
+        db.commit()
+        assert db.scalar(select(func.count()).select_from(PlaybackDaily)) == 1
+        assert db.scalar(select(func.count()).select_from(counts)) == 0
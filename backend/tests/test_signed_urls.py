@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings
+from app.utils import playlist_compiler, storage
+from app.utils.playlist_compiler import get_url_epoch, get_url_epoch_seconds
+from app.utils.playlist_events import seconds_until_rollover
+from app.utils.storage import SignedURLCache
+
+
+class _SignedStorage:
+    def __init__(self, hours):
+        self.url_lifetime = timedelta(hours=hours)
+
+
+@pytest.fixture
+def signed_storage(monkeypatch):
+    def use(hours, refresh_fraction):
+        monkeypatch.setattr(storage, "_storage", _SignedStorage(hours))
+        monkeypatch.setattr(playlist_compiler.settings, "signed_url_refresh_fraction", refresh_fraction)
+    yield use
+
+
+def test_cache_reuses_urls_until_refresh(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(storage.time, "monotonic", lambda: now[0])
+    signed = []
+
+    def sign():
+        signed.append(now[0])
+        return f"url-{len(signed)}"
+
+    cache = SignedURLCache(max_size=10, lifetime=timedelta(hours=2), refresh_fraction=0.25)
+    assert cache.get_or_sign("a", sign) == "url-1"
+    now[0] += 30 * 60 - 1
+    assert cache.get_or_sign("a", sign) == "url-1"
+    now[0] += 1
+    assert cache.get_or_sign("a", sign) == "url-2"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = SignedURLCache(max_size=2, lifetime=timedelta(hours=1), refresh_fraction=0.5)
+    for path in ("a", "b", "a", "c"):
+        cache.get_or_sign(path, lambda: path)
+    assert cache.evictions == 1
+    assert cache.get_or_sign("a", lambda: "new") == "a"
+    assert cache.get_or_sign("b", lambda: "new") == "new"
+
+
+@pytest.mark.parametrize("hours, refresh_fraction", [(1, 0.5), (12, 0.5), (24, 0.9), (47, 0.5), (168, 0.5), (168, 0.1)])
+def test_urls_in_a_playlist_outlive_its_epoch(signed_storage, hours, refresh_fraction):
+    signed_storage(hours, refresh_fraction)
+    lifetime = timedelta(hours=hours).total_seconds()
+    period = get_url_epoch_seconds()
+
+    # Worst case: a URL signed refresh_fraction of its lifetime before the
+    # epoch started, still held by a device one more period after it ended
+    assert period * 2 <= lifetime * (1 - refresh_fraction)
+
+    start = datetime(2026, 3, 1)
+    epoch = get_url_epoch(start)
+    assert get_url_epoch(start + timedelta(seconds=2 * period)) > epoch
+
+
+def test_local_storage_has_one_epoch(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "_storage", storage.LocalStorage(str(tmp_path), "http://localhost/media"))
+    assert get_url_epoch_seconds() is None
+    assert get_url_epoch(datetime(2026, 3, 1)) == get_url_epoch(datetime(2030, 3, 1)) == 0
+
+
+@pytest.mark.parametrize("field, value", [
+    ("signed_url_refresh_fraction", 0),
+    ("signed_url_refresh_fraction", 1),
+    ("signed_url_expiration_hours", 0),
+    ("signed_url_expiration_hours", 24 * 7 + 1),
+])
+def test_signed_url_settings_are_validated(field, value):
+    with pytest.raises(ValidationError):
+        Settings(**{field: value})
+
+
+def test_streams_roll_over_at_url_epochs(signed_storage):
+    signed_storage(1, 0.5)
+    period = get_url_epoch_seconds()
+    noon = datetime(2026, 3, 1, 12)
+    timestamp = 1772366400.0 + 100
+
+    delay = seconds_until_rollover(noon, timestamp)
+
+    assert delay == period - 100
+    assert get_url_epoch(datetime.utcfromtimestamp(timestamp + delay)) == get_url_epoch(
+        datetime.utcfromtimestamp(timestamp)
+    ) + 1
+    # Midnight comes first
+    assert seconds_until_rollover(datetime(2026, 3, 1, 23, 59, 30), timestamp) == 30
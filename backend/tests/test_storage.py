@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.utils import executors
+from app.utils.executors import run_io
+from app.utils.storage import FileTooLargeError, GCSStorage
+
+
+class _FakeBlob:
+    def __init__(self, uploads, path):
+        self._uploads = uploads
+        self._path = path
+
+    def upload_from_file(self, reader, content_type=None):
+        self._uploads[self._path] = reader.read()
+
+
+class _FakeBucket:
+    def __init__(self, uploads):
+        self._uploads = uploads
+
+    def blob(self, path, chunk_size=None):
+        return _FakeBlob(self._uploads, path)
+
+
+class _FakeClient:
+    def __init__(self):
+        self.uploads = {}
+
+    def bucket(self, name):
+        return _FakeBucket(self.uploads)
+
+
+@pytest.fixture
+def gcs(monkeypatch):
+    monkeypatch.setattr(executors.settings, "io_executor_workers", 1)
+    monkeypatch.setattr(executors.settings, "upload_executor_workers", 1)
+    storage = GCSStorage.__new__(GCSStorage)
+    storage.client = _FakeClient()
+    storage.bucket_name = "test"
+    yield storage
+    executors.shutdown_executors()
+
+
+async def test_slow_upload_does_not_hold_io_threads(gcs):
+    release = asyncio.Event()
+
+    async def slow_client():
+        yield b"first "
+        await release.wait()
+        yield b"second"
+
+    upload = asyncio.create_task(gcs.upload_stream(slow_client(), "a.bin"))
+    try:
+        await asyncio.sleep(0.1)
+        # The only IO thread is still free while the upload waits on the client
+        assert await asyncio.wait_for(run_io(sum, [1, 2]), timeout=2) == 3
+        assert executors.executor_stats()["upload"]["active"] == 1
+    finally:
+        release.set()
+    assert await asyncio.wait_for(upload, timeout=2) == ("gs://test/a.bin", 12)
+    assert gcs.client.uploads["a.bin"] == b"first second"
+
+
+async def test_upload_over_limit_fails(gcs):
+    async def client():
+        yield b"x" * 10
+        yield b"x" * 10
+
+    with pytest.raises(FileTooLargeError):
+        await gcs.upload_stream(client(), "b.bin", max_size=15)
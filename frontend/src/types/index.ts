@@ -143,6 +143,7 @@ export interface Media {
   duration_seconds: number;
   file_size: number | null;
   mime_type: string | null;
+  content_hash: string | null;
   sort_order: number;
   created_at: string;
   updated_at: string;
@@ -161,6 +162,7 @@ export interface PlaylistItem {
   type: MediaType;
   duration_seconds: number;
   filename: string;
+  content_hash: string | null;
 }
 
 export interface Playlist {
@@ -216,6 +218,7 @@ export interface ReportSummary {
     total_areas: number;
     total_devices: number;
     total_campaigns: number;
+    exact: boolean;
   };
 }
 